@@ -84,22 +84,160 @@
 
 
 import os
-from dotenv import load_dotenv
-load_dotenv()
+try:
+    from dotenv import load_dotenv
+    load_dotenv()
+except ImportError:
+    pass
 USE_TESTNET= os.getenv("USE_TESTNET", "false").lower() == "true"
+# "live" sends orders to Binance; "paper" fills them in-process (trading/paper_exchange.py)
+EXECUTION_MODE = os.getenv("EXECUTION_MODE", "live").lower()
 BINANCE_API_KEY = os.getenv("BINANCE_API_KEY")
 BINANCE_API_SECRET = os.getenv("BINANCE_API_SECRET")
 
-SYMBOLS = os.getenv("SYMBOLS").split(",")
-MARKET_TYPES = os.getenv("MARKET_TYPES").split(",")
-
-REDIS_HOST = os.getenv("REDIS_HOST")
-REDIS_PORT = int(os.getenv("REDIS_PORT"))
-
-MONGO_URI = os.getenv("MONGO_URI")
-MONGO_DB = os.getenv("MONGO_DB")
-
-TARGET_PERCENT = float(os.getenv("TARGET_PERCENT"))
-STOPLOSS_PERCENT = float(os.getenv("STOPLOSS_PERCENT"))
-MAX_HOLD_TIME_SEC = int(os.getenv("MAX_HOLD_TIME_SEC"))
-REFRESH_INTERVAL = int(os.getenv("REFRESH_INTERVAL"))
+SYMBOLS = os.getenv("SYMBOLS", "BTCUSDT").split(",")
+MARKET_TYPES = os.getenv("MARKET_TYPES", "spot").split(",")
+
+REDIS_HOST = os.getenv("REDIS_HOST", "localhost")
+REDIS_PORT = int(os.getenv("REDIS_PORT", 6379))
+
+MONGO_URI = os.getenv("MONGO_URI", "mongodb://localhost:27017")
+MONGO_DB = os.getenv("MONGO_DB", "trading_system")
+# Keep per-hour trade rollups (storage/trade_analytics.py) updated as trades are logged
+TRADE_ROLLUPS = os.getenv("TRADE_ROLLUPS", "true").lower() == "true"
+
+TARGET_PERCENT = float(os.getenv("TARGET_PERCENT", 0.4))
+STOPLOSS_PERCENT = float(os.getenv("STOPLOSS_PERCENT", 0.2))
+MAX_HOLD_TIME_SEC = int(os.getenv("MAX_HOLD_TIME_SEC", 60))
+REFRESH_INTERVAL = int(os.getenv("REFRESH_INTERVAL", 1))
+
+# ----------------- Exchange Endpoints -----------------
+SPOT_WS_URL = os.getenv("SPOT_WS_URL", "wss://stream.binance.com:9443/ws")
+FUTURES_WS_URL = os.getenv("FUTURES_WS_URL", "wss://fstream.binance.com/ws")
+SPOT_REST_URL = os.getenv("SPOT_REST_URL", "https://api.binance.com")
+FUTURES_REST_URL = os.getenv("FUTURES_REST_URL", "https://fapi.binance.com")
+
+# ----------------- Order Book -----------------
+ENABLE_DEPTH = os.getenv("ENABLE_DEPTH", "false").lower() == "true"
+DEPTH_SNAPSHOT_LIMIT = int(os.getenv("DEPTH_SNAPSHOT_LIMIT", 1000))
+# REST weight of one depth snapshot; the exchange scales it with the limit (these are the 1000-level costs)
+SPOT_DEPTH_WEIGHT = int(os.getenv("SPOT_DEPTH_WEIGHT", 50))
+FUTURES_DEPTH_WEIGHT = int(os.getenv("FUTURES_DEPTH_WEIGHT", 20))
+MAX_SLIPPAGE_BPS = float(os.getenv("MAX_SLIPPAGE_BPS", 10))
+
+# ----------------- Feed -----------------
+FEED_MODE = os.getenv("FEED_MODE", "kline")  # "kline" or "aggTrade"
+INGEST_MAX_EVENTS = int(os.getenv("INGEST_MAX_EVENTS", 10000))
+INGEST_MAX_TRADES = int(os.getenv("INGEST_MAX_TRADES", 100000))
+# A closed candle waiting longer than this for room in the full closed lane is logged (it still waits)
+INGEST_PUT_TIMEOUT_MS = int(os.getenv("INGEST_PUT_TIMEOUT_MS", 50))
+
+# ----------------- Backfill / REST limits -----------------
+BACKFILL_BARS = int(os.getenv("BACKFILL_BARS", 500))
+BACKFILL_WORKERS = int(os.getenv("BACKFILL_WORKERS", 8))
+CANDLE_CACHE_DIR = os.getenv("CANDLE_CACHE_DIR", "cache/candles")
+SPOT_WEIGHT_PER_MIN = int(os.getenv("SPOT_WEIGHT_PER_MIN", 5000))
+FUTURES_WEIGHT_PER_MIN = int(os.getenv("FUTURES_WEIGHT_PER_MIN", 2000))
+
+# ----------------- Risk Limits (quote notional, <= 0 disables) -----------------
+MAX_OPEN_POSITIONS = int(os.getenv("MAX_OPEN_POSITIONS", 0))
+MAX_SYMBOL_EXPOSURE = float(os.getenv("MAX_SYMBOL_EXPOSURE", 0))
+MAX_STRATEGY_EXPOSURE = float(os.getenv("MAX_STRATEGY_EXPOSURE", 0))
+MAX_TOTAL_EXPOSURE = float(os.getenv("MAX_TOTAL_EXPOSURE", 0))
+
+# ----------------- Exchange Brackets -----------------
+# Not simulated by the paper exchange, so paper runs always exit locally
+USE_EXCHANGE_BRACKETS = os.getenv("USE_EXCHANGE_BRACKETS", "false").lower() == "true" and EXECUTION_MODE == "live"
+STOP_LIMIT_OFFSET_PERCENT = float(os.getenv("STOP_LIMIT_OFFSET_PERCENT", 0.1))
+BINANCE_API_URL = os.getenv("BINANCE_API_URL")
+BINANCE_FUTURES_URL = os.getenv("BINANCE_FUTURES_URL")
+
+# ----------------- Order Sizing -----------------
+ORDER_QUANTITY = float(os.getenv("ORDER_QUANTITY", 0.001))   # fixed base qty when no sizing rule is set
+ORDER_NOTIONAL = float(os.getenv("ORDER_NOTIONAL", 0))       # quote notional per entry
+RISK_PER_TRADE = float(os.getenv("RISK_PER_TRADE", 0))       # quote lost if STOPLOSS_PERCENT is hit
+SYMBOL_INFO_CACHE_DIR = os.getenv("SYMBOL_INFO_CACHE_DIR", "cache")
+SYMBOL_INFO_TTL_SEC = int(os.getenv("SYMBOL_INFO_TTL_SEC", 6 * 3600))
+
+# ----------------- Distributed Mode (Redis Streams) -----------------
+NODE_ROLE = os.getenv("NODE_ROLE", "all")   # "all", "feed" (sockets -> streams) or "strategy" (streams -> orders)
+PUBLISH_STREAMS = os.getenv("PUBLISH_STREAMS", "true" if NODE_ROLE == "feed" else "false").lower() == "true"
+STREAM_MAXLEN = int(os.getenv("STREAM_MAXLEN", 10000))
+TICK_STREAM_MAXLEN = int(os.getenv("TICK_STREAM_MAXLEN", 100))
+STREAM_GROUP = os.getenv("STREAM_GROUP", "strategy")
+# Strategy nodes can split the universe: this node takes symbols where index % NODE_COUNT == NODE_INDEX.
+NODE_INDEX = int(os.getenv("NODE_INDEX", 0))
+# Defaults to a name that survives restarts ({hostname}-node{NODE_INDEX}), so pending entries are re-read
+STREAM_CONSUMER = os.getenv("STREAM_CONSUMER")
+# Pending entries idle this long under another consumer (e.g. a node that died) are claimed on start
+STREAM_CLAIM_IDLE_MS = int(os.getenv("STREAM_CLAIM_IDLE_MS", 60000))
+NODE_COUNT = int(os.getenv("NODE_COUNT", 1))
+
+# ----------------- Strategy Execution -----------------
+STRATEGY_EXECUTOR = os.getenv("STRATEGY_EXECUTOR", "inline")   # "inline", "thread" or "process"
+STRATEGY_WORKERS = int(os.getenv("STRATEGY_WORKERS", 4))
+STRATEGY_TIMEOUT_MS = float(os.getenv("STRATEGY_TIMEOUT_MS", 200))
+# Strategies enabled for every symbol, plus per-symbol overrides such as "ETHUSDT:breakout,reversal;SOLUSDT:reversal".
+STRATEGIES = os.getenv("STRATEGIES", "breakout").split(",")
+SYMBOL_STRATEGIES = {
+    sym.strip(): names.split(",")
+    for sym, names in (entry.split(":", 1) for entry in os.getenv("SYMBOL_STRATEGIES", "").split(";") if ":" in entry)
+}
+
+# ----------------- Reversal Strategy -----------------
+REVERSAL_RSI_PERIOD = int(os.getenv("REVERSAL_RSI_PERIOD", 14))
+REVERSAL_RSI_OVERSOLD = float(os.getenv("REVERSAL_RSI_OVERSOLD", 30))
+REVERSAL_RSI_OVERBOUGHT = float(os.getenv("REVERSAL_RSI_OVERBOUGHT", 70))
+REVERSAL_BB_PERIOD = int(os.getenv("REVERSAL_BB_PERIOD", 20))
+REVERSAL_BB_STD = float(os.getenv("REVERSAL_BB_STD", 2.0))
+REVERSAL_PIN_RATIO = float(os.getenv("REVERSAL_PIN_RATIO", 2.0))          # wick / body for a pin bar
+REVERSAL_MIN_CONFIRMATIONS = int(os.getenv("REVERSAL_MIN_CONFIRMATIONS", 2))   # of RSI, band re-entry, pattern
+
+# ----------------- Correlation -----------------
+CORR_MODE = os.getenv("CORR_MODE", "ew")                 # "ew" (exponentially weighted) or "window"
+CORR_HALFLIFE = float(os.getenv("CORR_HALFLIFE", 60))    # bars, for "ew"
+CORR_WINDOW = int(os.getenv("CORR_WINDOW", 240))         # bars, for "window"
+CORR_MIN_BARS = int(os.getenv("CORR_MIN_BARS", 30))      # bars before correlations are reported
+CORR_THRESHOLD = float(os.getenv("CORR_THRESHOLD", 0.7))
+# Cap on direction-adjusted exposure summed over symbols correlated above CORR_THRESHOLD (<= 0 disables).
+MAX_CORRELATED_EXPOSURE = float(os.getenv("MAX_CORRELATED_EXPOSURE", 0))
+
+# ----------------- Candle Archive -----------------
+ARCHIVE_ENABLED = os.getenv("ARCHIVE_ENABLED", "false").lower() == "true"
+ARCHIVE_DIR = os.getenv("ARCHIVE_DIR", "data/archive")
+ARCHIVE_FLUSH_SEC = float(os.getenv("ARCHIVE_FLUSH_SEC", 5))
+
+# ----------------- Profiling -----------------
+PROFILE_DIR = os.getenv("PROFILE_DIR", "profiles")
+PROFILE_SECONDS = float(os.getenv("PROFILE_SECONDS", 30))
+PROFILE_INTERVAL_MS = float(os.getenv("PROFILE_INTERVAL_MS", 5))
+PROFILE_SIGNALS = os.getenv("PROFILE_SIGNALS", "true").lower() == "true"   # SIGUSR1 sample, SIGUSR2 tracemalloc
+ADMIN_SOCKET = os.getenv("ADMIN_SOCKET", "")   # unix socket path for profiling commands (empty = off)
+
+# ----------------- Feed Watchdog -----------------
+FEED_STALE_SEC = float(os.getenv("FEED_STALE_SEC", 30))          # no event for this long = stale stream
+WATCHDOG_INTERVAL_SEC = float(os.getenv("WATCHDOG_INTERVAL_SEC", 5))
+WS_RECONNECT_BASE_SEC = float(os.getenv("WS_RECONNECT_BASE_SEC", 1))
+WS_RECONNECT_MAX_SEC = float(os.getenv("WS_RECONNECT_MAX_SEC", 60))
+
+# ----------------- Dynamic Universe -----------------
+UNIVERSE_TOP_N = int(os.getenv("UNIVERSE_TOP_N", 0))                    # 0 = fixed SYMBOLS list
+UNIVERSE_RANK_BY = os.getenv("UNIVERSE_RANK_BY", "volume")              # "volume" or "volatility"
+UNIVERSE_MARKET_TYPE = os.getenv("UNIVERSE_MARKET_TYPE", "spot")
+UNIVERSE_QUOTE = os.getenv("UNIVERSE_QUOTE", "USDT")
+UNIVERSE_MIN_QUOTE_VOLUME = float(os.getenv("UNIVERSE_MIN_QUOTE_VOLUME", 0))
+UNIVERSE_PINNED = [s for s in os.getenv("UNIVERSE_PINNED", "").split(",") if s]   # always traded
+UNIVERSE_REFRESH_SEC = int(os.getenv("UNIVERSE_REFRESH_SEC", 900))
+
+# ----------------- State Snapshots -----------------
+SNAPSHOT_ENABLED = os.getenv("SNAPSHOT_ENABLED", "false").lower() == "true"
+SNAPSHOT_DIR = os.getenv("SNAPSHOT_DIR", "cache/snapshot")
+SNAPSHOT_INTERVAL_SEC = float(os.getenv("SNAPSHOT_INTERVAL_SEC", 10))
+
+# ----------------- Paper Trading (EXECUTION_MODE=paper) -----------------
+PAPER_BALANCES = os.getenv("PAPER_BALANCES", "USDT:10000")
+PAPER_FEE_BPS = float(os.getenv("PAPER_FEE_BPS", 10))
+PAPER_SLIPPAGE_BPS = float(os.getenv("PAPER_SLIPPAGE_BPS", 1))
+PAPER_LATENCY_MS = float(os.getenv("PAPER_LATENCY_MS", 0))
+PAPER_LATENCY_JITTER_MS = float(os.getenv("PAPER_LATENCY_JITTER_MS", 0))
+PAPER_SEED = int(os.getenv("PAPER_SEED", 42))
@@ -0,0 +1,213 @@
+import os, signal, socket, sys, threading, time, tracemalloc
+from collections import Counter
+from core.config import PROFILE_DIR, PROFILE_SECONDS, PROFILE_INTERVAL_MS, PROFILE_SIGNALS, ADMIN_SOCKET
+from core.logger import get_logger
+logger = get_logger()
+
+# ----------------- On-demand profiling -----------------
+# Nothing runs until asked: a signal or an admin-socket command starts one
+# capture on its own thread and writes the result under PROFILE_DIR.
+#   SIGUSR1              sample all threads for PROFILE_SECONDS
+#   SIGUSR2              tracemalloc: first signal starts tracing, later ones write a diff
+#   admin socket lines   profile [secs] [interval_ms] | trace [secs] | mem start|snap|stop | status
+# Client: python -m core.profiler "profile 20"
+
+TOP_N = 40
+
+
+def _stamp():
+    return time.strftime("%Y%m%d-%H%M%S")
+
+def _output(name):
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    return os.path.join(PROFILE_DIR, f"{name}-{_stamp()}")
+
+def _frame_label(code):
+    return f"{os.path.basename(code.co_filename)}:{code.co_name}"
+
+
+class Profiler:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.busy = None          # name of the capture in progress
+        self._mem_baseline = None
+
+    def _start(self, name, target, *args):
+        with self.lock:
+            if self.busy:
+                return f"busy: {self.busy} in progress"
+            self.busy = name
+        threading.Thread(target=self._run, args=(target, args), name=f"profiler-{name}", daemon=True).start()
+        return f"started {name}"
+
+    def _run(self, target, args):
+        try:
+            path = target(*args)
+            logger.info(f"Profile written to {path}")
+        except Exception as e:
+            logger.error(f"Profiling failed: {e}")
+        finally:
+            with self.lock:
+                self.busy = None
+
+    # ---------------- Sampling (all threads, stdlib only) ----------------
+    def sample(self, seconds=PROFILE_SECONDS, interval_ms=PROFILE_INTERVAL_MS):
+        return self._start("sample", self._sample, seconds, interval_ms)
+
+    def _sample(self, seconds, interval_ms):
+        me = threading.get_ident()
+        stacks = Counter()
+        interval = interval_ms / 1000
+        deadline = time.monotonic() + seconds
+        ticks = 0
+        while time.monotonic() < deadline:
+            names = {t.ident: t.name for t in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == me:
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(_frame_label(frame.f_code))
+                    frame = frame.f_back
+                stack.append(names.get(ident, str(ident)))
+                stacks[tuple(reversed(stack))] += 1
+            ticks += 1
+            time.sleep(interval)
+
+        path = _output("sample")
+        # Collapsed stacks ("thread;outer;...;inner count"), loadable by flamegraph.pl / speedscope.
+        with open(f"{path}.collapsed", "w") as f:
+            for stack, count in stacks.most_common():
+                f.write(f"{';'.join(stack)} {count}\n")
+        own, inclusive = Counter(), Counter()
+        for stack, count in stacks.items():
+            own[stack[-1]] += count
+            for label in set(stack[1:]):
+                inclusive[label] += count
+        total = sum(stacks.values()) or 1
+        with open(f"{path}.txt", "w") as f:
+            f.write(f"{ticks} samples every {interval_ms}ms over {seconds}s, {total} thread-samples\n\n")
+            for title, counts in (("Self", own), ("Inclusive", inclusive)):
+                f.write(f"{title}:\n")
+                for label, count in counts.most_common(TOP_N):
+                    f.write(f"  {100 * count / total:6.2f}%  {count:8d}  {label}\n")
+                f.write("\n")
+        return f"{path}.txt"
+
+    # ---------------- Deterministic (needs yappi for multi-thread coverage) ----------------
+    def trace(self, seconds=PROFILE_SECONDS):
+        try:
+            import yappi
+        except ImportError:
+            return "error: deterministic profiling needs the optional 'yappi' package"
+        return self._start("trace", self._trace, yappi, seconds)
+
+    def _trace(self, yappi, seconds):
+        yappi.set_clock_type("wall")
+        yappi.start(profile_threads=True)
+        try:
+            time.sleep(seconds)
+        finally:
+            yappi.stop()
+        path = _output("trace")
+        stats = yappi.get_func_stats()
+        stats.save(f"{path}.pstat", type="pstat")
+        with open(f"{path}.txt", "w") as f:
+            stats.sort("ttot").print_all(out=f)
+            yappi.get_thread_stats().print_all(out=f)
+        yappi.clear_stats()
+        return f"{path}.txt"
+
+    # ---------------- Allocations ----------------
+    def mem(self, action="snap"):
+        if action == "start" or (action == "snap" and not tracemalloc.is_tracing()):
+            if not tracemalloc.is_tracing():
+                tracemalloc.start(25)
+            self._mem_baseline = tracemalloc.take_snapshot()
+            return "tracemalloc started; next snap writes the growth since now"
+        if action == "stop":
+            tracemalloc.stop()
+            self._mem_baseline = None
+            return "tracemalloc stopped"
+        if action == "snap":
+            return self._start("mem", self._mem_diff)
+        return f"error: unknown mem action '{action}'"
+
+    def _mem_diff(self):
+        snapshot = tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+        ))
+        baseline, self._mem_baseline = self._mem_baseline, snapshot
+        path = _output("mem")
+        current, peak = tracemalloc.get_traced_memory()
+        with open(f"{path}.txt", "w") as f:
+            f.write(f"traced {current / 1e6:.1f} MB (peak {peak / 1e6:.1f} MB)\n\n")
+            f.write("Growth by module since the previous snapshot:\n")
+            for stat in snapshot.compare_to(baseline, "filename")[:TOP_N]:
+                f.write(f"  {stat}\n")
+            f.write("\nGrowth by line:\n")
+            for stat in snapshot.compare_to(baseline, "lineno")[:TOP_N]:
+                f.write(f"  {stat}\n")
+            f.write("\nLargest current allocation sites:\n")
+            for stat in snapshot.statistics("traceback")[:5]:
+                f.write(f"  {stat}\n")
+                for line in stat.traceback.format():
+                    f.write(f"    {line}\n")
+        return f"{path}.txt"
+
+    # ---------------- Control surface ----------------
+    def command(self, line):
+        parts = line.split()
+        if not parts:
+            return "error: empty command"
+        cmd, args = parts[0], parts[1:]
+        try:
+            if cmd == "profile":
+                return self.sample(*(float(a) for a in args[:2]))
+            if cmd == "trace":
+                return self.trace(*(float(a) for a in args[:1]))
+            if cmd == "mem":
+                return self.mem(*args[:1])
+            if cmd == "status":
+                return f"busy: {self.busy or '-'} | tracemalloc: {'on' if tracemalloc.is_tracing() else 'off'}"
+        except ValueError as e:
+            return f"error: {e}"
+        return f"error: unknown command '{cmd}'"
+
+    def install(self, signals=PROFILE_SIGNALS, admin_socket=ADMIN_SOCKET):
+        """Hook up SIGUSR1/SIGUSR2 (main thread only) and the optional admin socket."""
+        if signals and hasattr(signal, "SIGUSR1") and threading.current_thread() is threading.main_thread():
+            signal.signal(signal.SIGUSR1, lambda *_: logger.info(f"SIGUSR1: {self.sample()}"))
+            signal.signal(signal.SIGUSR2, lambda *_: logger.info(f"SIGUSR2: {self.mem('snap')}"))
+        if admin_socket:
+            threading.Thread(target=self._serve, args=(admin_socket,), name="admin-socket", daemon=True).start()
+
+    def _serve(self, path):
+        try:
+            os.unlink(path)
+        except FileNotFoundError:
+            pass
+        server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        server.bind(path)
+        os.chmod(path, 0o600)
+        server.listen(4)
+        logger.info(f"Admin socket listening on {path}")
+        while True:
+            conn, _ = server.accept()
+            with conn:
+                try:
+                    line = conn.makefile().readline().strip()
+                    conn.sendall(f"{self.command(line)}\n".encode())
+                except Exception as e:
+                    logger.error(f"Admin socket error: {e}")
+
+
+profiler = Profiler()
+
+
+if __name__ == "__main__":
+    client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    client.connect(ADMIN_SOCKET or "crypto-bot.sock")
+    client.sendall(f"{' '.join(sys.argv[1:]) or 'status'}\n".encode())
+    print(client.makefile().readline().strip())
@@ -0,0 +1,101 @@
+import threading, time
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+from core import config
+from core.logger import get_logger
+logger = get_logger()
+
+
+def _make_redis():
+    import redis
+    return redis.Redis(host=config.REDIS_HOST, port=config.REDIS_PORT, db=0)
+
+def _make_mongo_db():
+    from pymongo import MongoClient
+    return MongoClient(config.MONGO_URI)[config.MONGO_DB]
+
+def _make_binance():
+    if config.EXECUTION_MODE == "paper":
+        from trading.paper_exchange import PaperExchange
+        return PaperExchange()
+    from binance.client import Client
+    client = Client(config.BINANCE_API_KEY, config.BINANCE_API_SECRET)
+    if config.USE_TESTNET:
+        client.FUTURES_URL = 'https://testnet.binancefuture.com/fapi'
+    # Overrides for pointing the client at a mock exchange.
+    if config.BINANCE_API_URL:
+        client.API_URL = config.BINANCE_API_URL
+    if config.BINANCE_FUTURES_URL:
+        client.FUTURES_URL = config.BINANCE_FUTURES_URL
+    return client
+
+# name -> (factory, warm-up call that forces the connection open)
+FACTORIES = {
+    "redis": (_make_redis, lambda c: c.ping()),
+    "mongo": (_make_mongo_db, lambda db: db.client.admin.command("ping")),
+    "binance": (_make_binance, lambda c: None),   # Client() already pings on construction
+}
+
+
+class Runtime:
+    """
+    Service container for the process-wide clients. Nothing connects at import
+    time: each client is built on first access, or up front (in parallel) by
+    warm_up() when the live bot starts. Offline tools that never touch a client
+    never pay for one.
+    """
+
+    def __init__(self):
+        self._clients = {}
+        self._locks = {name: threading.Lock() for name in FACTORIES}
+        self.timings = {}
+
+    def get(self, name):
+        client = self._clients.get(name)
+        if client is None:
+            with self._locks[name]:
+                client = self._clients.get(name)
+                if client is None:
+                    started = time.perf_counter()
+                    client = self._clients[name] = FACTORIES[name][0]()
+                    self.timings[f"client:{name}"] = time.perf_counter() - started
+        return client
+
+    @property
+    def redis(self):
+        return self.get("redis")
+
+    @property
+    def mongo_db(self):
+        return self.get("mongo")
+
+    @property
+    def binance(self):
+        return self.get("binance")
+
+    def warm_up(self, names=tuple(FACTORIES)):
+        """Build and connect the given clients concurrently; failures are logged, not raised."""
+        def connect(name):
+            try:
+                FACTORIES[name][1](self.get(name))
+            except Exception as e:
+                logger.error(f"Warm-up of {name} client failed: {e}")
+
+        with self.phase("warm_up"):
+            with ThreadPoolExecutor(max_workers=len(names)) as pool:
+                list(pool.map(connect, names))
+
+    @contextmanager
+    def phase(self, name):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.timings[name] = time.perf_counter() - started
+
+    def report(self):
+        parts = " | ".join(f"{name} {secs * 1000:.0f}ms" for name, secs in self.timings.items())
+        logger.info(f"Startup timings: {parts}")
+
+
+runtime = Runtime()
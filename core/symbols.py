@@ -0,0 +1,97 @@
+import sys, threading
+from core.config import SYMBOLS, MARKET_TYPES
+
+# ----------------- Symbol registry -----------------
+# Every traded symbol gets a dense integer id and a SymbolMeta holding what the hot
+# paths would otherwise rebuild or look up per message: stream names, Redis keys, the
+# market type and the exchange precision. The strategy engine's instances, the
+# position book's marks and the feed's last-price batches are indexed by that id.
+# Ids are never reused; a symbol that leaves the universe is only marked inactive,
+# so an id always means the same symbol for the life of the process.
+
+
+def _loaded_filters(symbol, market_type):
+    # symbol_info imports this module, so it is looked up lazily; until it has loaded
+    # there is nothing to take (load() pushes the filters to every registered symbol).
+    get = getattr(sys.modules.get("trading.symbol_info"), "get", None)
+    return get(symbol, market_type) if get else None
+
+
+class SymbolMeta:
+    __slots__ = ("id", "symbol", "market_type", "kline_stream", "trade_stream", "depth_stream",
+                 "ltp_key", "tick_stream", "candle_stream", "active",
+                 "filters", "tick", "step", "price_decimals", "qty_decimals")
+
+    def __init__(self, id, symbol, market_type):
+        lower = symbol.lower()
+        self.id = id
+        self.symbol = symbol
+        self.market_type = market_type
+        self.kline_stream = f"{lower}@kline_1m"
+        self.trade_stream = f"{lower}@aggTrade"
+        self.depth_stream = f"{lower}@depth@100ms"
+        self.ltp_key = f"LTP:{symbol}"
+        self.tick_stream = f"ticks:{symbol}"
+        self.candle_stream = f"candles:{symbol}"
+        self.active = True
+        self.set_filters(None)
+
+    def set_filters(self, filters):
+        """Take tick/step precision from the symbol_info filters (None until they load)."""
+        self.filters = filters
+        self.tick = filters.tick if filters else None
+        self.step = filters.step if filters else None
+        self.price_decimals = filters.price_decimals if filters else None
+        self.qty_decimals = filters.qty_decimals if filters else None
+
+
+class SymbolRegistry:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.by_id = []
+        self.by_symbol = {}
+        self.by_stream = {}    # Redis stream name -> (kind, SymbolMeta), for the stream consumer
+
+    def register(self, symbol, market_type):
+        """Id and metadata for symbol, creating them on first sight; re-registering reactivates."""
+        meta = self.by_symbol.get(symbol)
+        if meta is not None and meta.market_type == market_type:
+            meta.active = True
+            return meta
+        with self.lock:
+            meta = self.by_symbol.get(symbol)
+            if meta is None:
+                meta = SymbolMeta(len(self.by_id), symbol, market_type)
+                self.by_id.append(meta)
+            elif meta.market_type != market_type:
+                # Same id, new market: rebuild the metadata in place of the old one.
+                meta = self.by_id[meta.id] = SymbolMeta(meta.id, symbol, market_type)
+            meta.active = True
+            if meta.filters is None:
+                meta.set_filters(_loaded_filters(symbol, market_type))
+            self.by_symbol[symbol] = meta
+            self.by_stream[meta.tick_stream] = ("ticks", meta)
+            self.by_stream[meta.candle_stream] = ("candles", meta)
+        return meta
+
+    def apply_filters(self, market_type, table):
+        """Refresh the precision of every registered symbol of market_type (symbol_info.load)."""
+        for meta in list(self.by_id):
+            if meta.market_type == market_type:
+                meta.set_filters(table.get(meta.symbol))
+
+    def deactivate(self, symbol):
+        meta = self.by_symbol.get(symbol)
+        if meta is not None:
+            meta.active = False
+
+    def get(self, symbol):
+        return self.by_symbol.get(symbol)
+
+    def __len__(self):
+        return len(self.by_id)
+
+
+registry = SymbolRegistry()
+for _symbol, _market_type in zip(SYMBOLS, MARKET_TYPES):
+    registry.register(_symbol, _market_type)
@@ -0,0 +1,173 @@
+import os, queue, threading, time
+import numpy as np
+from core.config import ARCHIVE_DIR, ARCHIVE_FLUSH_SEC
+from data_feed import candle_store
+from core.logger import get_logger
+logger = get_logger()
+
+# ----------------- Layout -----------------
+# Closed candles, one directory per symbol and UTC day, one raw little-endian
+# column file per field:
+#   {ARCHIVE_DIR}/{symbol}/{YYYY-MM-DD}/{field}.bin
+# Columns are fixed-width and append-only, so a day is read with np.memmap and
+# no parsing, and a time range is cut with searchsorted on open_time.
+
+COLUMNS = {
+    "open_time": "<i8",
+    "open": "<f8",
+    "high": "<f8",
+    "low": "<f8",
+    "close": "<f8",
+    "volume": "<f8",
+    "quote_volume": "<f8",
+    "buy_volume": "<f8",
+    "sell_volume": "<f8",
+    "trades": "<i8",
+    "vwap": "<f8",
+}
+
+
+def day_of(open_time):
+    return time.strftime("%Y-%m-%d", time.gmtime(open_time / 1000))
+
+def day_dir(symbol, day):
+    return os.path.join(ARCHIVE_DIR, symbol, day)
+
+def _column_path(symbol, day, field):
+    return os.path.join(day_dir(symbol, day), f"{field}.bin")
+
+def _rows(symbol, day, fields=COLUMNS):
+    """Number of complete rows in a day partition (shortest column, in case a write was cut off)."""
+    counts = []
+    for field in fields:
+        try:
+            counts.append(os.path.getsize(_column_path(symbol, day, field)) // np.dtype(COLUMNS[field]).itemsize)
+        except OSError:
+            return 0
+    return min(counts) if counts else 0
+
+
+class ArchiveWriter:
+    """
+    Background writer for closed candles. on_close (a candle_store close
+    listener) only enqueues; a daemon thread drains the queue every
+    ARCHIVE_FLUSH_SEC and appends each (symbol, day) group to its column files.
+    """
+
+    def __init__(self, flush_sec=ARCHIVE_FLUSH_SEC):
+        self.flush_sec = flush_sec
+        self.queue = queue.SimpleQueue()
+        self.last_written = {}   # symbol -> open_time of the last archived bar
+        self._repaired = set()   # (symbol, day) partitions checked this run
+        self._thread = None
+
+    def on_close(self, symbol, candle):
+        self.queue.put((symbol, candle))
+
+    def start(self):
+        if self._thread is None:
+            candle_store.add_close_listener(self.on_close)
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+        return self._thread
+
+    def _run(self):
+        while True:
+            time.sleep(self.flush_sec)
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error(f"Archive flush failed: {e}")
+
+    def flush(self):
+        groups = {}
+        while True:
+            try:
+                symbol, candle = self.queue.get_nowait()
+            except queue.Empty:
+                break
+            groups.setdefault((symbol, day_of(candle['open_time'])), []).append(candle)
+        for (symbol, day), candles in groups.items():
+            self.write(symbol, day, candles)
+        return sum(len(c) for c in groups.values())
+
+    def _repair(self, symbol, day):
+        """Cut every column back to the common length and remember the last archived bar."""
+        rows = _rows(symbol, day)
+        for field, dtype in COLUMNS.items():
+            path = _column_path(symbol, day, field)
+            if os.path.exists(path) and os.path.getsize(path) != rows * np.dtype(dtype).itemsize:
+                with open(path, "r+b") as f:
+                    f.truncate(rows * np.dtype(dtype).itemsize)
+        if rows:
+            last = np.memmap(_column_path(symbol, day, "open_time"), dtype=COLUMNS["open_time"], mode="r")[rows - 1]
+            self.last_written[symbol] = max(self.last_written.get(symbol, -1), int(last))
+        self._repaired.add((symbol, day))
+
+    def write(self, symbol, day, candles):
+        if (symbol, day) not in self._repaired:
+            os.makedirs(day_dir(symbol, day), exist_ok=True)
+            self._repair(symbol, day)
+        last = self.last_written.get(symbol, -1)
+        fresh = []
+        for candle in sorted(candles, key=lambda c: c['open_time']):
+            if candle['open_time'] > last:
+                fresh.append(candle)
+                last = candle['open_time']
+        if not fresh:
+            return 0
+        for field, dtype in COLUMNS.items():
+            column = np.array([c[field] for c in fresh], dtype=dtype)
+            with open(_column_path(symbol, day, field), "ab") as f:
+                f.write(column.tobytes())
+        self.last_written[symbol] = last
+        return len(fresh)
+
+
+# ---------------- Reads ----------------
+def days(symbol):
+    try:
+        return sorted(os.listdir(os.path.join(ARCHIVE_DIR, symbol)))
+    except OSError:
+        return []
+
+def open_day(symbol, day, fields=tuple(COLUMNS)):
+    """{field: read-only memmap} for one day partition (empty dict if missing)."""
+    rows = _rows(symbol, day, set(fields) | {"open_time"})
+    if not rows:
+        return {}
+    return {field: np.memmap(_column_path(symbol, day, field), dtype=COLUMNS[field], mode="r", shape=(rows,))
+            for field in fields}
+
+def read_range(symbol, start_ms, end_ms, fields=("open_time", "open", "high", "low", "close", "volume")):
+    """
+    Bars with start_ms <= open_time < end_ms as {field: array}. A range inside
+    one day returns memmap slices (nothing is read until used); spanning
+    several days concatenates only the selected slices.
+    """
+    fields = tuple(fields)
+    first, last = day_of(start_ms), day_of(end_ms - 1)
+    parts = []
+    for day in days(symbol):
+        if day < first or day > last:
+            continue
+        cols = open_day(symbol, day, set(fields) | {"open_time"})
+        if not cols:
+            continue
+        open_time = cols["open_time"]
+        lo, hi = np.searchsorted(open_time, (start_ms, end_ms))
+        if hi > lo:
+            parts.append({field: cols[field][lo:hi] for field in fields})
+    if not parts:
+        return {field: np.empty(0, dtype=COLUMNS[field]) for field in fields}
+    if len(parts) == 1:
+        return parts[0]
+    return {field: np.concatenate([p[field] for p in parts]) for field in fields}
+
+def read_last(symbol, bars, end_ms=None, fields=("open_time", "open", "high", "low", "close", "volume")):
+    """Archived bars from the `bars` bar-widths before end_ms (default: now); gaps are not filled."""
+    end_ms = end_ms or int(time.time() * 1000)
+    return read_range(symbol, end_ms - bars * candle_store.BAR_MS, end_ms, fields)
+
+
+writer = ArchiveWriter()
@@ -0,0 +1,150 @@
+import os, time, threading
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from core.config import SPOT_REST_URL, FUTURES_REST_URL, BACKFILL_BARS, BACKFILL_WORKERS, CANDLE_CACHE_DIR
+from data_feed import candle_store
+from utils.helpers import rest_limiter
+from core.logger import get_logger
+logger = get_logger()
+
+BAR_MS = candle_store.BAR_MS
+KLINE_LIMIT = 1000
+# Columns of the cached array, in Binance REST kline order.
+FIELDS = ("open_time", "open", "high", "low", "close", "volume", "quote_volume", "trades", "buy_volume")
+_REST_COLUMNS = (0, 1, 2, 3, 4, 5, 7, 8, 9)
+
+_local = threading.local()
+
+def _session():
+    if not hasattr(_local, "session"):
+        import requests
+        _local.session = requests.Session()
+    return _local.session
+
+def klines_weight(market_type, limit):
+    if market_type == "spot":
+        return 2
+    return 1 if limit < 100 else 2 if limit < 500 else 5 if limit <= 1000 else 10
+
+def fetch_klines(symbol, market_type, start_time, limit=KLINE_LIMIT):
+    if market_type == "spot":
+        url = f"{SPOT_REST_URL}/api/v3/klines"
+    else:
+        url = f"{FUTURES_REST_URL}/fapi/v1/klines"
+    params = {"symbol": symbol, "interval": "1m", "startTime": start_time, "limit": limit}
+    limiter = rest_limiter(market_type)
+    while True:
+        limiter.acquire(klines_weight(market_type, limit))
+        resp = _session().get(url, params=params, timeout=10)
+        if resp.status_code in (418, 429):
+            retry_after = int(resp.headers.get("Retry-After", 5))
+            logger.warning(f"Kline fetch rate limited for {symbol}, backing off {retry_after}s")
+            limiter.pause(retry_after)
+            continue
+        resp.raise_for_status()
+        return resp.json()
+
+def _rows_to_array(rows):
+    if not rows:
+        return np.empty((0, len(FIELDS)))
+    return np.array([[float(row[i]) for i in _REST_COLUMNS] for row in rows])
+
+# ---------------- Cache ----------------
+def cache_path(symbol, market_type):
+    return os.path.join(CANDLE_CACHE_DIR, f"{market_type}_{symbol}_1m.npy")
+
+def load_cache(symbol, market_type):
+    path = cache_path(symbol, market_type)
+    try:
+        data = np.load(path)
+    except (OSError, ValueError):
+        return np.empty((0, len(FIELDS)))
+    if data.ndim != 2 or data.shape[1] != len(FIELDS):
+        logger.warning(f"Ignoring malformed candle cache {path}")
+        return np.empty((0, len(FIELDS)))
+    return data
+
+def save_cache(symbol, market_type, data):
+    path = cache_path(symbol, market_type)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.tmp"
+    with open(tmp, "wb") as f:
+        np.save(f, data)
+    os.replace(tmp, path)
+
+# ---------------- Backfill ----------------
+def backfill_symbol(symbol, market_type, bars=BACKFILL_BARS):
+    """
+    Return the last `bars` closed 1m klines for symbol as an array (columns FIELDS),
+    downloading only what the on-disk cache is missing.
+    """
+    now_ms = int(time.time() * 1000)
+    current_bar = now_ms - now_ms % BAR_MS
+    want_from = current_bar - bars * BAR_MS
+
+    cached = load_cache(symbol, market_type)
+    cached = cached[cached[:, 0] >= want_from]
+    start = int(cached[-1, 0]) + BAR_MS if len(cached) else want_from
+
+    rows = []
+    while start < current_bar:
+        batch = fetch_klines(symbol, market_type, start)
+        if not batch:
+            break
+        # The last REST kline is usually the still-open bar; only closed bars go to the cache.
+        rows.extend(row for row in batch if row[0] < current_bar)
+        start = batch[-1][0] + BAR_MS
+        if len(batch) < KLINE_LIMIT:
+            break
+
+    fresh = _rows_to_array(rows)
+    data = np.concatenate((cached, fresh)) if len(fresh) else cached
+    if len(fresh):
+        _, idx = np.unique(data[::-1, 0], return_index=True)
+        data = data[::-1][idx]
+        data = data[-bars:]
+        save_cache(symbol, market_type, data)
+    return data
+
+def fill_gap(symbol, market_type, since_ms):
+    """Closed klines from the bar opening at since_ms up to (not including) the current bar, as candles."""
+    now_ms = int(time.time() * 1000)
+    current_bar = now_ms - now_ms % BAR_MS
+    start = since_ms - since_ms % BAR_MS
+    rows = []
+    while start < current_bar:
+        batch = fetch_klines(symbol, market_type, start)
+        if not batch:
+            break
+        rows.extend(row for row in batch if row[0] < current_bar)
+        start = batch[-1][0] + BAR_MS
+        if len(batch) < KLINE_LIMIT:
+            break
+    return to_candles(_rows_to_array(rows))
+
+def to_candles(data):
+    return [candle_store.kline_candle(*row) for row in data.tolist()]
+
+def warm_up(symbols, market_types, bars=BACKFILL_BARS, workers=BACKFILL_WORKERS):
+    """Backfill every symbol concurrently and load the bars into candle_store."""
+    started = time.perf_counter()
+
+    def job(pair):
+        symbol, market_type = pair
+        try:
+            data = backfill_symbol(symbol, market_type, bars)
+        except Exception as e:
+            logger.error(f"Backfill failed for {symbol}: {e}")
+            return 0
+        candle_store.load_history(symbol, to_candles(data))
+        return len(data)
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        counts = list(pool.map(job, zip(symbols, market_types)))
+    logger.info(f"Backfilled {sum(counts)} candles for {len(symbols)} symbols in {time.perf_counter() - started:.2f}s")
+    return dict(zip(symbols, counts))
+
+
+if __name__ == "__main__":
+    from core.config import SYMBOLS, MARKET_TYPES
+    warm_up(SYMBOLS, MARKET_TYPES)
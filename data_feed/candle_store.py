@@ -134,13 +134,86 @@
 
 from core.logger import get_logger
 logger = get_logger()
+import threading, time
+from bisect import bisect_left
 from collections import deque
+from datetime import datetime
+import numpy as np
 
 CANDLES = {}
+MAX_CANDLES = 500
+BAR_MS = 60_000
+# Trade batches at least this long take the NumPy path in update_trades.
+VECTOR_BATCH_MIN = 256
+
+# fn(symbol, candle) called exactly once per closed bar, in bar order per symbol.
+CLOSE_LISTENERS = []
+LAST_CLOSED = {}
+
+def add_close_listener(fn):
+    CLOSE_LISTENERS.append(fn)
+
+def _mark_closed(symbol, candle):
+    open_time = candle.get('open_time')
+    if open_time is None or LAST_CLOSED.get(symbol, -1) >= open_time:
+        return
+    LAST_CLOSED[symbol] = open_time
+    for fn in CLOSE_LISTENERS:
+        try:
+            fn(symbol, candle)
+        except Exception as e:
+            logger.error(f"Candle close listener error for {symbol}: {e}")
+
+def _candles(symbol):
+    candles = CANDLES.get(symbol)
+    if candles is None:
+        candles = CANDLES[symbol] = deque(maxlen=MAX_CANDLES)
+    return candles
+
+# ---------------- Versioned reads (seqlock) ----------------
+# Each symbol has one writer at a time (the feed consumer, or the backfill before its
+# stream starts). Writers bump VERSIONS[symbol] to odd before touching the deque or
+# a candle dict and back to even when done; readers copy without any lock and retry
+# if the version was odd or moved while they copied. Writers never wait on readers.
+VERSIONS = {}
+_WRITERS = {}      # symbol -> thread ident of the writer while the version is odd
+READ_RETRIES = 1000
+
+def _begin_write(symbol):
+    _WRITERS[symbol] = threading.get_ident()
+    VERSIONS[symbol] = VERSIONS.get(symbol, 0) + 1
+
+def _end_write(symbol):
+    VERSIONS[symbol] += 1
+
+def _read(symbol, copy):
+    """Run copy(candles) until it completes against one even version of symbol."""
+    for attempt in range(READ_RETRIES):
+        before = VERSIONS.get(symbol, 0)
+        if before & 1 and _WRITERS.get(symbol) == threading.get_ident():
+            # A close listener reading its own symbol mid-write: the data is as the writer left it.
+            return copy(CANDLES.get(symbol, ()))
+        if not before & 1:
+            try:
+                result = copy(CANDLES.get(symbol, ()))
+            except (RuntimeError, IndexError):   # deque mutated under us
+                result = None
+            else:
+                if VERSIONS.get(symbol, 0) == before:
+                    return result
+        time.sleep(0 if attempt < 100 else 0.0001)
+    raise RuntimeError(f"candle read for {symbol} kept racing the writer")
 
 def update_candle(tick, symbol):
+    _begin_write(symbol)
+    try:
+        _update_candle(tick, symbol)
+    finally:
+        _end_write(symbol)
+
+def _update_candle(tick, symbol):
     if symbol not in CANDLES:
-        CANDLES[symbol] = deque(maxlen=500)
+        CANDLES[symbol] = deque(maxlen=MAX_CANDLES)
     
     candles = CANDLES[symbol]
     if not candles or tick['timestamp'].minute != candles[-1]['timestamp'].minute:
@@ -163,7 +236,245 @@ def update_candle(tick, symbol):
 
     # logger.info(f"Updated candle for {symbol}: {candle}")
 
+def new_candle(open_time, price):
+    return {
+        "open_time": open_time,
+        "timestamp": datetime.fromtimestamp(open_time / 1000),
+        "open": price,
+        "high": price,
+        "low": price,
+        "close": price,
+        "volume": 0.0,
+        "quote_volume": 0.0,
+        "buy_volume": 0.0,
+        "sell_volume": 0.0,
+        "trades": 0,
+        "vwap": price,
+    }
+
+def kline_candle(open_time, o, h, l, c, volume, quote_volume, trades, buy_volume):
+    """Build a candle from Binance kline fields (stream `k` payload or REST row); values may be strings."""
+    close, volume, quote_volume, buy_volume = float(c), float(volume), float(quote_volume), float(buy_volume)
+    return {
+        "open_time": int(open_time),
+        "timestamp": datetime.fromtimestamp(int(open_time) / 1000),
+        "open": float(o),
+        "high": float(h),
+        "low": float(l),
+        "close": close,
+        "volume": volume,
+        "quote_volume": quote_volume,
+        "buy_volume": buy_volume,
+        "sell_volume": volume - buy_volume,
+        "trades": int(trades),
+        "vwap": quote_volume / volume if volume else close,
+    }
+
+def restore_candle(fields):
+    """Rebuild a candle dict from its serialized numeric fields (adds the derived timestamp)."""
+    candle = dict(fields)
+    candle['timestamp'] = datetime.fromtimestamp(candle['open_time'] / 1000)
+    return candle
+
+def set_candle(symbol, candle):
+    """Store an exchange-built candle (e.g. a kline push): replaces the bar with the same open_time, else appends."""
+    _begin_write(symbol)
+    try:
+        _set_candle(symbol, candle)
+    finally:
+        _end_write(symbol)
+
+def _set_candle(symbol, candle):
+    candles = _candles(symbol)
+    if candles and candles[-1].get('open_time') == candle['open_time']:
+        candles[-1] = candle
+    elif not candles or candles[-1].get('open_time', 0) < candle['open_time']:
+        if candles:
+            _mark_closed(symbol, candles[-1])
+        candles.append(candle)
+
+def close_candle(symbol, candle):
+    """Store the final version of a bar and notify close listeners (once per bar)."""
+    _begin_write(symbol)
+    try:
+        _set_candle(symbol, candle)
+        _mark_closed(symbol, candle)
+    finally:
+        _end_write(symbol)
+
+def load_history(symbol, history):
+    """
+    Merge closed candles (e.g. from a REST backfill) with what is already held: older bars go under
+    whatever the live feed built, and bars newer than a restored snapshot extend it.
+    """
+    _begin_write(symbol)
+    try:
+        _load_history(symbol, history)
+    finally:
+        _end_write(symbol)
+
+def _load_history(symbol, history):
+    candles = _candles(symbol)
+    if candles:
+        last_open = candles[-1].get('open_time')
+        newer = [c for c in history if c['open_time'] >= last_open]
+        if newer and newer[0]['open_time'] == last_open:
+            candles[-1] = newer.pop(0)   # a closed version of a bar that was still open
+        candles.extend(newer)
+    first = candles[0].get('open_time') if candles else None
+    older = [c for c in history if first is None or c['open_time'] < first]
+    room = MAX_CANDLES - len(candles)
+    if older and room > 0:
+        # extendleft on a full deque would evict the newest bars, so only fill the free slots.
+        candles.extendleft(reversed(older[-room:]))
+    if history:
+        LAST_CLOSED[symbol] = max(LAST_CLOSED.get(symbol, -1), history[-1]['open_time'])
+
+def update_trades(symbol, trades):
+    """
+    Fold a batch of trades into 1m candles.
+    trades: sequence of (trade_time_ms, price, qty, is_buyer_maker), in exchange order.
+    """
+    if not trades:
+        return
+    _begin_write(symbol)
+    try:
+        if len(trades) >= VECTOR_BATCH_MIN:
+            _update_trades_np(symbol, trades)
+        else:
+            _update_trades(symbol, trades)
+    finally:
+        _end_write(symbol)
+
+def _update_trades(symbol, trades):
+    candles = _candles(symbol)
+    candle = candles[-1] if candles else None
+    bar = candle.get('open_time') if candle else None
+    for t, p, q, maker in trades:
+        start = t - t % BAR_MS
+        if start != bar:
+            if bar is not None and start < bar:
+                continue  # late trade for a bar already rolled over
+            if candle is not None:
+                if candle['volume']:
+                    candle['vwap'] = candle['quote_volume'] / candle['volume']
+                _mark_closed(symbol, candle)
+            bar = start
+            candle = new_candle(start, p)
+            candles.append(candle)
+        elif p > candle['high']:
+            candle['high'] = p
+        elif p < candle['low']:
+            candle['low'] = p
+        candle['close'] = p
+        candle['volume'] += q
+        candle['quote_volume'] += p * q
+        candle['trades'] += 1
+        if maker:
+            candle['sell_volume'] += q
+        else:
+            candle['buy_volume'] += q
+    if candle['volume']:
+        candle['vwap'] = candle['quote_volume'] / candle['volume']
+
+def _update_trades_np(symbol, trades):
+    arr = np.asarray(trades, dtype=np.float64)
+    t = arr[:, 0].astype(np.int64)
+    p, q, maker = arr[:, 1], arr[:, 2], arr[:, 3] != 0
+    starts = t - t % BAR_MS
+
+    candles = _candles(symbol)
+    last = candles[-1] if candles else None
+    if last is not None and 'open_time' in last:
+        keep = starts >= last['open_time']
+        if not keep.all():
+            t, p, q, maker, starts = t[keep], p[keep], q[keep], maker[keep], starts[keep]
+            if not len(t):
+                return
+
+    seg = np.flatnonzero(np.diff(starts)) + 1
+    seg = np.concatenate(([0], seg))
+    ends = np.concatenate((seg[1:], [len(p)])) - 1
+    highs = np.maximum.reduceat(p, seg)
+    lows = np.minimum.reduceat(p, seg)
+    vols = np.add.reduceat(q, seg)
+    quotes = np.add.reduceat(p * q, seg)
+    sells = np.add.reduceat(np.where(maker, q, 0.0), seg)
+    counts = np.diff(np.concatenate((seg, [len(p)])))
+
+    for i in range(len(seg)):
+        start = int(starts[seg[i]])
+        if last is not None and last.get('open_time') == start:
+            candle = last
+            candle['high'] = max(candle['high'], float(highs[i]))
+            candle['low'] = min(candle['low'], float(lows[i]))
+        else:
+            if candles:
+                _mark_closed(symbol, candles[-1])
+            candle = new_candle(start, float(p[seg[i]]))
+            candle['high'], candle['low'] = float(highs[i]), float(lows[i])
+            candles.append(candle)
+        candle['close'] = float(p[ends[i]])
+        candle['volume'] += float(vols[i])
+        candle['quote_volume'] += float(quotes[i])
+        candle['sell_volume'] += float(sells[i])
+        candle['buy_volume'] += float(vols[i] - sells[i])
+        candle['trades'] += int(counts[i])
+        if candle['volume']:
+            candle['vwap'] = candle['quote_volume'] / candle['volume']
+
 def get_last_candle(symbol):
     if symbol in CANDLES and CANDLES[symbol]:
         return CANDLES[symbol][-1]
     return None
+
+def _time_ms(t):
+    return int(t.timestamp() * 1000) if isinstance(t, datetime) else int(t)
+
+def _open_time(candle):
+    return candle['open_time']
+
+def get_window(symbol, n=None, closed_only=False):
+    """Copies of the last n bars of symbol (all held bars if n is None), oldest first."""
+    def copy(candles):
+        bars = [dict(c) for c in candles]
+        if closed_only and bars and bars[-1].get('open_time', -1) > LAST_CLOSED.get(symbol, -1):
+            bars.pop()
+        return bars[-n:] if n else bars
+    return _read(symbol, copy)
+
+def get_range(symbol, start=None, end=None):
+    """Copies of the bars with start <= open_time < end (ms or datetime; None = unbounded), by binary search."""
+    lo_key = None if start is None else _time_ms(start)
+    hi_key = None if end is None else _time_ms(end)
+    def copy(candles):
+        lo = 0 if lo_key is None else bisect_left(candles, lo_key, key=_open_time)
+        hi = len(candles) if hi_key is None else bisect_left(candles, hi_key, key=_open_time)
+        return [dict(candles[i]) for i in range(lo, hi)]
+    return _read(symbol, copy)
+
+def snapshot(symbols=None, n=1):
+    """
+    {symbol: copies of its last n bars} for the given symbols (default all). Each
+    symbol is always internally consistent; the whole set is one cut across
+    symbols unless writers keep moving underneath, in which case the last
+    attempt is returned.
+    """
+    symbols = list(CANDLES) if symbols is None else list(symbols)
+    for _ in range(10):
+        before = [VERSIONS.get(sym, 0) for sym in symbols]
+        result = {sym: get_window(sym, n) for sym in symbols}
+        if [VERSIONS.get(sym, 0) for sym in symbols] == before:
+            break
+    return result
+
+def latest_matrix(symbols, fields):
+    """Latest candle of each symbol as a (n, len(fields)) array; symbols without candles are left out."""
+    present, rows = [], []
+    for symbol in symbols:
+        candles = CANDLES.get(symbol)
+        if candles:
+            c = candles[-1]
+            present.append(symbol)
+            rows.append([c[f] for f in fields])
+    return present, np.array(rows, dtype=np.float64).reshape(len(rows), len(fields))
@@ -0,0 +1,191 @@
+import math, threading
+import numpy as np
+from core.config import SYMBOLS, CORR_MODE, CORR_HALFLIFE, CORR_WINDOW, CORR_MIN_BARS
+from data_feed import candle_store
+from core.logger import get_logger
+logger = get_logger()
+
+
+class RollingMoments:
+    """
+    Mean vector and covariance matrix of an N-dimensional series, updated one
+    observation at a time with a rank-1 update (O(N^2) per bar, no history scan).
+
+    mode "ew":     exponentially weighted with the given halflife (in bars)
+    mode "window": exact moments over the last `window` observations, kept as
+                   running sums plus a ring buffer of rows to subtract; the sums
+                   are rebuilt from the ring every `window` updates to stop
+                   floating-point drift.
+    """
+
+    def __init__(self, n, mode=CORR_MODE, halflife=CORR_HALFLIFE, window=CORR_WINDOW):
+        self.n = n
+        self.mode = mode
+        self.count = 0
+        self.mean = np.zeros(n)
+        if mode == "ew":
+            self.alpha = 1 - 0.5 ** (1 / halflife)
+            self._cov = np.zeros((n, n))
+        elif mode == "window":
+            self.window = window
+            self.ring = np.zeros((window, n))
+            self.sum = np.zeros(n)
+            self.cross = np.zeros((n, n))
+        else:
+            raise ValueError(f"Unknown CORR_MODE '{mode}' (expected 'ew' or 'window')")
+
+    def update(self, x):
+        if self.mode == "ew":
+            if self.count == 0:
+                self.mean[:] = x
+            else:
+                a = self.alpha
+                diff = x - self.mean
+                incr = a * diff
+                self.mean += incr
+                # cov <- (1 - a) * (cov + diff incr^T), in place
+                self._cov += np.outer(diff, incr)
+                self._cov *= 1 - a
+            self.count += 1
+            return
+
+        row = self.count % self.window
+        if self.count >= self.window:
+            old = self.ring[row]
+            self.sum -= old
+            self.cross -= np.outer(old, old)
+        self.ring[row] = x
+        self.sum += x
+        self.cross += np.outer(x, x)
+        self.count += 1
+        if self.count % self.window == 0:
+            self.sum = self.ring.sum(axis=0)
+            self.cross = self.ring.T @ self.ring
+        self.mean = self.sum / min(self.count, self.window)
+
+    @property
+    def size(self):
+        return self.count if self.mode == "ew" else min(self.count, self.window)
+
+    def cov(self):
+        if self.mode == "ew":
+            return self._cov.copy()
+        k = self.size
+        if k < 2:
+            return np.zeros((self.n, self.n))
+        return (self.cross - np.outer(self.sum, self.sum) / k) / (k - 1)
+
+
+class CorrelationTracker:
+    """
+    Cross-symbol return covariance / correlation plus log-price level moments
+    (for pair spreads), fed by candle_store close events.
+
+    Closes for one bar arrive symbol by symbol; they are gathered into one row
+    and applied when the row is complete or the first close of a newer bar
+    shows up. A symbol with no close in a bar contributes a zero return.
+    """
+
+    def __init__(self, symbols=SYMBOLS, min_bars=CORR_MIN_BARS, **kwargs):
+        self.symbols = list(symbols)
+        self.index = {sym: i for i, sym in enumerate(self.symbols)}
+        self.min_bars = min_bars
+        n = len(self.symbols)
+        self.returns = RollingMoments(n, **kwargs)
+        self.levels = RollingMoments(n, **kwargs)
+        self.lock = threading.Lock()
+        self.last_log_price = np.full(n, np.nan)
+        self._row = np.zeros(n)
+        self._row_seen = np.zeros(n, dtype=bool)
+        self._row_time = None
+        self._corr = None
+
+    def on_close(self, symbol, candle):
+        i = self.index.get(symbol)
+        if i is None or candle['close'] <= 0:
+            return
+        with self.lock:
+            open_time = candle['open_time']
+            if self._row_time is not None and open_time > self._row_time:
+                self._flush()
+            elif self._row_time is not None and open_time < self._row_time:
+                return   # late close of a bar already applied
+            self._row_time = open_time
+            log_price = math.log(candle['close'])
+            prev = self.last_log_price[i]
+            self._row[i] = 0.0 if np.isnan(prev) else log_price - prev
+            self._row_seen[i] = True
+            self.last_log_price[i] = log_price
+            if self._row_seen.all():
+                self._flush()
+
+    def _flush(self):
+        self.returns.update(self._row)
+        if not np.isnan(self.last_log_price).any():
+            self.levels.update(self.last_log_price)
+        self._row[:] = 0.0
+        self._row_seen[:] = False
+        self._row_time = None
+        self._corr = None
+
+    # ---------------- Queries ----------------
+    @property
+    def ready(self):
+        return self.returns.size >= self.min_bars
+
+    def covariance(self):
+        with self.lock:
+            return self.returns.cov()
+
+    def correlation_matrix(self):
+        """N x N return correlation (NaN where a symbol has no variance yet). Cached until the next bar."""
+        with self.lock:
+            if self._corr is None:
+                cov = self.returns.cov()
+                std = np.sqrt(np.diag(cov))
+                with np.errstate(divide="ignore", invalid="ignore"):
+                    self._corr = cov / np.outer(std, std)
+            return self._corr
+
+    def correlation(self, a, b):
+        i, j = self.index.get(a), self.index.get(b)
+        if i is None or j is None or not self.ready:
+            return None
+        value = self.correlation_matrix()[i, j]
+        return None if np.isnan(value) else float(value)
+
+    def correlations(self, symbol):
+        """{other symbol: correlation} for one symbol; empty until enough bars are in."""
+        i = self.index.get(symbol)
+        if i is None or not self.ready:
+            return {}
+        row = self.correlation_matrix()[i]
+        return {sym: float(row[j]) for sym, j in self.index.items() if not np.isnan(row[j])}
+
+    def pair_zscore(self, a, b):
+        """
+        Z-score of the log-price spread log(a) - beta * log(b), with beta the
+        rolling hedge ratio cov(a, b) / var(b). Returns (zscore, beta) or None.
+        """
+        i, j = self.index.get(a), self.index.get(b)
+        if i is None or j is None:
+            return None
+        with self.lock:
+            if self.levels.size < self.min_bars:
+                return None
+            cov = self.levels.cov()
+            mean = self.levels.mean
+            var_b = cov[j, j]
+            if var_b <= 0:
+                return None
+            beta = cov[i, j] / var_b
+            spread_var = cov[i, i] - beta * beta * var_b   # var(a - beta b) with beta = cov/var_b
+            if spread_var <= 0:
+                return None
+            spread = self.last_log_price[i] - beta * self.last_log_price[j]
+            spread_mean = mean[i] - beta * mean[j]
+        return float((spread - spread_mean) / math.sqrt(spread_var)), float(beta)
+
+
+correlations = CorrelationTracker()
+candle_store.add_close_listener(correlations.on_close)
@@ -0,0 +1,68 @@
+import threading, time
+from collections import deque
+import numpy as np
+from data_feed.ingest_queue import ingest_queue
+
+MAX_LAG_SAMPLES = 20000
+
+
+class FeedStats:
+    """
+    Throughput and socket-to-candle lag of the live feed. Socket threads call
+    on_message with the exchange event time ("E", epoch ms); the ingest consumer
+    calls on_applied once the batch is in candle_store, which turns the newest
+    pending event of each applied symbol into a lag sample. Lag therefore
+    includes exchange/network time and any clock skew against the exchange.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.messages = {}           # kind -> count since start
+        self._last_event = {}        # symbol -> event time of the newest unapplied message
+        self._lags = deque(maxlen=MAX_LAG_SAMPLES)
+        self.started = time.monotonic()
+        self._mark = (self.started, 0, 0)   # (time, messages, dropped) at the last report
+
+    def on_message(self, kind, symbol, event_ms):
+        with self.lock:
+            self.messages[kind] = self.messages.get(kind, 0) + 1
+            if event_ms is not None:
+                self._last_event[symbol] = event_ms
+
+    def on_applied(self, symbols):
+        now_ms = time.time() * 1000
+        with self.lock:
+            for symbol in symbols:
+                event_ms = self._last_event.pop(symbol, None)
+                if event_ms is not None:
+                    self._lags.append(now_ms - event_ms)
+
+    def report(self):
+        """Rates since the previous report, lag percentiles (ms) over the same span, and ingest queue counters."""
+        queue = ingest_queue.snapshot_stats()
+        now = time.monotonic()
+        with self.lock:
+            total = sum(self.messages.values())
+            by_kind = dict(self.messages)
+            lags = np.fromiter(self._lags, dtype=float, count=len(self._lags))
+            self._lags.clear()
+            then, then_total, then_dropped = self._mark
+            self._mark = (now, total, queue["dropped"])
+        elapsed = max(now - then, 1e-9)
+        out = {
+            "msgs_per_sec": round((total - then_total) / elapsed, 1),
+            "avg_msgs_per_sec": round(total / max(now - self.started, 1e-9), 1),
+            "messages": by_kind,
+            "dropped": queue["dropped"] - then_dropped,
+            "dropped_total": queue["dropped"],
+            "dropped_trades": queue["dropped_trades"],   # {symbol: count} whose candles are incomplete
+            "conflated_total": queue["conflated"],
+            "pending": queue["pending"],
+        }
+        if len(lags):
+            p50, p99 = np.percentile(lags, (50, 99))
+            out.update(lag_p50_ms=round(p50, 1), lag_p99_ms=round(p99, 1), lag_max_ms=round(lags.max(), 1))
+        return out
+
+
+feed_stats = FeedStats()
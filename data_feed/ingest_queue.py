@@ -0,0 +1,109 @@
+import threading, time
+from collections import deque
+from core.config import INGEST_MAX_EVENTS, INGEST_MAX_TRADES, INGEST_PUT_TIMEOUT_MS
+from core.logger import get_logger
+logger = get_logger()
+
+
+class IngestBatch:
+    __slots__ = ("closed", "updates", "trades")
+
+    def __init__(self, closed, updates, trades):
+        self.closed = closed      # [(symbol, candle)] in arrival order, never conflated
+        self.updates = updates    # {symbol: latest in-progress candle}
+        self.trades = trades      # {symbol: [trade, ...]} merged per symbol
+
+    def __len__(self):
+        return len(self.closed) + len(self.updates) + sum(len(t) for t in self.trades.values())
+
+
+class IngestQueue:
+    """
+    Bounded handoff between socket threads and the processing thread.
+
+    In-progress kline updates are conflated per symbol (the latest wins while
+    unprocessed), trades are merged into per-symbol lists, and closed candles
+    go through an ordered lane that is never conflated or dropped: when it is
+    full the producer blocks until the consumer makes room (backpressure on
+    that socket). Partial updates and trades never block; everything else is
+    O(1) under the lock so the sockets keep being read during processing spikes.
+    """
+
+    def __init__(self, max_events=INGEST_MAX_EVENTS, max_trades=INGEST_MAX_TRADES, put_timeout_ms=INGEST_PUT_TIMEOUT_MS):
+        self.cond = threading.Condition()
+        self.max_events = max_events
+        self.max_trades = max_trades
+        self.put_timeout = put_timeout_ms / 1000
+        self._closed = deque()
+        self._updates = {}
+        self._trades = {}
+        self.stats = {"received": 0, "conflated": 0, "merged": 0, "dropped": 0, "delivered": 0, "blocked": 0}
+        self.dropped_trades = {}   # symbol -> trades dropped since the last snapshot_stats
+
+    def put_update(self, symbol, candle):
+        with self.cond:
+            self.stats["received"] += 1
+            if symbol in self._updates:
+                self.stats["conflated"] += 1
+            self._updates[symbol] = candle
+            self.cond.notify()
+
+    def put_closed(self, symbol, candle):
+        with self.cond:
+            self.stats["received"] += 1
+            pending = self._updates.get(symbol)
+            if pending is not None and pending['open_time'] <= candle['open_time']:
+                # The final bar supersedes any unprocessed partial of the same (or an older) bar.
+                del self._updates[symbol]
+                self.stats["conflated"] += 1
+            if len(self._closed) >= self.max_events:
+                self.stats["blocked"] += 1
+                if not self.cond.wait_for(lambda: len(self._closed) < self.max_events, self.put_timeout):
+                    logger.warning(f"Ingest closed lane full, {symbol} socket waiting for the consumer")
+                    self.cond.wait_for(lambda: len(self._closed) < self.max_events)
+            self._closed.append((symbol, candle))
+            self.cond.notify()
+
+    def put_trade(self, symbol, trade):
+        with self.cond:
+            self.stats["received"] += 1
+            trades = self._trades.get(symbol)
+            if trades is None:
+                trades = self._trades[symbol] = []
+            elif len(trades) >= self.max_trades:
+                # The bar built from what is kept will be short on volume and may miss its high/low.
+                dropped = self.dropped_trades.get(symbol, 0)
+                if not dropped:
+                    logger.warning(f"Ingest trade buffer full for {symbol} ({self.max_trades}), dropping trades")
+                self.dropped_trades[symbol] = dropped + 1
+                self.stats["dropped"] += 1
+                return
+            else:
+                self.stats["merged"] += 1
+            trades.append(trade)
+            self.cond.notify()
+
+    def drain(self, timeout=1.0):
+        """Wait up to timeout for work and take everything pending as one IngestBatch (None if idle)."""
+        with self.cond:
+            if not (self._closed or self._updates or self._trades):
+                self.cond.wait(timeout)
+                if not (self._closed or self._updates or self._trades):
+                    return None
+            batch = IngestBatch(list(self._closed), self._updates, self._trades)
+            self._closed.clear()
+            self._updates, self._trades = {}, {}
+            self.stats["delivered"] += len(batch)
+            self.cond.notify_all()
+        return batch
+
+    def snapshot_stats(self):
+        """Counters since start, plus per-symbol trade drops since the previous call (feed_stats.report)."""
+        with self.cond:
+            stats = dict(self.stats)
+            stats["dropped_trades"], self.dropped_trades = self.dropped_trades, {}
+            stats["pending"] = len(self._closed) + len(self._updates) + sum(len(t) for t in self._trades.values())
+        return stats
+
+
+ingest_queue = IngestQueue()
@@ -153,34 +153,204 @@
 
 
 
-import websocket, json, threading
+import websocket, json, threading, time
 from datetime import datetime
-import redis
-from core.config import REDIS_HOST, REDIS_PORT
-from data_feed import candle_store
-
-r = redis.Redis(host=REDIS_HOST, port=REDIS_PORT, db=0)
+from core.config import SPOT_WS_URL, FUTURES_WS_URL, FEED_MODE, PUBLISH_STREAMS
+from core.runtime import runtime
+from core.symbols import registry
+from data_feed import candle_store, order_book
+from data_feed.ingest_queue import ingest_queue
+from data_feed.feed_stats import feed_stats
+from data_feed.watchdog import watchdog
+from storage import redis_handler
+from core.logger import get_logger
+logger = get_logger()
+
+STATS_LOG_SEC = 60
+
+def ws_base_url(market_type):
+    return SPOT_WS_URL if market_type == "spot" else FUTURES_WS_URL
+
+def _run_stream(state, ws_url, on_message, on_open=None):
+    """Keep one stream connected: reconnect with jittered backoff whenever run_forever returns."""
+    def handle_message(ws, message):
+        state.last_event = time.monotonic()
+        on_message(ws, message)
+
+    def handle_open(ws):
+        watchdog.on_open(state)
+        if on_open:
+            on_open(ws)
+
+    def handle_error(ws, error):
+        if not state.stopped:
+            logger.error(f"Stream {state.name} error: {error}")
+
+    def handle_close(ws, code, reason):
+        watchdog.on_close(state, reason or code)
+
+    while not state.stopped:
+        state.ws = websocket.WebSocketApp(ws_url, on_message=handle_message, on_open=handle_open,
+                                          on_error=handle_error, on_close=handle_close)
+        try:
+            state.ws.run_forever(ping_interval=20, ping_timeout=10)
+        except Exception as e:
+            logger.error(f"Stream {state.name} crashed: {e}")
+        watchdog.on_close(state)
+        if state.stopped:
+            break
+        delay = watchdog.backoff(state)
+        logger.info(f"Reconnecting {state.name} in {delay:.1f}s")
+        time.sleep(delay)
+
+def _start_stream(symbol, market_type, kind, ws_url, on_message, on_open=None):
+    state = watchdog.register(symbol, market_type, kind)
+    t = threading.Thread(target=_run_stream, args=(state, ws_url, on_message, on_open), daemon=True)
+    t.start()
+    return t
 
+# Socket callbacks only parse and hand off to ingest_queue; candle building and
+# Redis writes happen on the consumer thread (start_consumer).
 def start_ws(symbol, market_type):
-    if market_type == "spot":
-        ws_url = f"wss://stream.binance.com:9443/ws/{symbol.lower()}@kline_1m"
-    else:
-        ws_url = f"wss://fstream.binance.com/ws/{symbol.lower()}@kline_1m"
+    if FEED_MODE == "aggTrade":
+        return start_trade_ws(symbol, market_type)
+    ws_url = f"{ws_base_url(market_type)}/{registry.register(symbol, market_type).kline_stream}"
 
     def on_message(ws, message):
         data = json.loads(message)
         if 'e' in data and data['e'] == 'kline':
+            feed_stats.on_message("kline", symbol, data.get('E'))
             k = data['k']
-            ts = datetime.fromtimestamp(k['t']/1000)
-            close_price = float(k['c'])
-            volume = float(k['v'])
+            # Kline pushes carry the bar's running totals, so store them as-is instead of accumulating.
+            candle = candle_store.kline_candle(k['t'], k['o'], k['h'], k['l'], k['c'], k['v'], k['q'], k['n'], k['V'])
+            if k['x']:
+                ingest_queue.put_closed(symbol, candle)
+            else:
+                ingest_queue.put_update(symbol, candle)
+
+    return _start_stream(symbol, market_type, "kline", ws_url, on_message)
 
-            tick = {"timestamp": ts, "price": close_price, "volume": volume}
-            candle_store.update_candle(tick, symbol)
-            r.set(f"LTP:{symbol}", close_price)
+def start_trade_ws(symbol, market_type):
+    ws_url = f"{ws_base_url(market_type)}/{registry.register(symbol, market_type).trade_stream}"
 
-    ws = websocket.WebSocketApp(ws_url, on_message=on_message)
-    t = threading.Thread(target=ws.run_forever, kwargs={'ping_interval':20, 'ping_timeout':10})
-    t.daemon = True
+    def on_message(ws, message):
+        data = json.loads(message)
+        if data.get('e') == 'aggTrade':
+            feed_stats.on_message("aggTrade", symbol, data.get('E'))
+            ingest_queue.put_trade(symbol, (data['T'], float(data['p']), float(data['q']), data['m']))
+
+    return _start_stream(symbol, market_type, "aggTrade", ws_url, on_message)
+
+# ---------------- Consumer ----------------
+# Bars closed while processing a batch (from kline finals or trade rollovers), published with it.
+_published_closes = []
+if PUBLISH_STREAMS:
+    candle_store.add_close_listener(lambda symbol, candle: _published_closes.append((symbol, candle)))
+
+def process_batch(batch):
+    metas = registry.by_symbol
+    ltps = {}   # registry id -> last price
+    for symbol, candle in batch.closed:
+        candle_store.close_candle(symbol, candle)
+        ltps[metas[symbol].id] = candle['close']
+    for symbol, candle in batch.updates.items():
+        candle_store.set_candle(symbol, candle)
+        ltps[metas[symbol].id] = candle['close']
+    for symbol, trades in batch.trades.items():
+        candle_store.update_trades(symbol, trades)
+        ltps[metas[symbol].id] = trades[-1][1]
+    if not ltps:
+        return
+    updated = [registry.by_id[i] for i in ltps]
+    feed_stats.on_applied([meta.symbol for meta in updated])
+    pipe = runtime.redis.pipeline(transaction=False)
+    pipe.mset({meta.ltp_key: price for meta, price in zip(updated, ltps.values())})
+    if PUBLISH_STREAMS:
+        ticks = {meta.symbol: candle_store.get_last_candle(meta.symbol) for meta in updated}
+        closed = _published_closes[:]
+        del _published_closes[:len(closed)]
+        redis_handler.publish(pipe, ticks, closed)
+    pipe.execute()
+
+def _consume():
+    last_log = time.monotonic()
+    while True:
+        try:
+            batch = ingest_queue.drain()
+            if batch is not None:
+                process_batch(batch)
+        except Exception as e:
+            logger.error(f"Ingest consumer error: {e}")
+        if time.monotonic() - last_log >= STATS_LOG_SEC:
+            last_log = time.monotonic()
+            stats = feed_stats.report()
+            if stats["dropped"]:
+                logger.warning(f"Feed stats: {stats}")
+            else:
+                logger.info(f"Feed stats: {stats}")
+
+def start_consumer():
+    t = threading.Thread(target=_consume, daemon=True)
     t.start()
     return t
+
+# ---------------- Stream mode (strategy nodes) ----------------
+def _consume_once(consumer):
+    """
+    Apply one read of the streams and ack everything handled. Entries trimmed by MAXLEN
+    while pending come back without fields; they, and entries that fail to decode, are
+    acked and skipped, so one bad entry cannot hold the whole batch (and the recovery
+    read) back.
+    """
+    acks = {}
+    for stream, entries in consumer.read():
+        kind, meta = registry.by_stream[stream]
+        symbol = meta.symbol
+        for entry_id, fields in entries:
+            if not fields:
+                continue
+            try:
+                candle = candle_store.restore_candle(redis_handler.decode_candle(fields))
+                if kind == "candles":
+                    candle_store.close_candle(symbol, candle)
+                else:
+                    candle_store.set_candle(symbol, candle)
+            except Exception as e:
+                logger.error(f"Dropping stream entry {entry_id} on {stream}: {e}")
+                continue
+            watchdog.on_relay(symbol)
+        acks[stream] = [entry_id for entry_id, _ in entries]
+    if acks:
+        consumer.ack(acks)
+
+def _consume_streams(symbols):
+    consumer = redis_handler.StreamConsumer(symbols)
+    watchdog.watch_relay(symbols)
+    while True:
+        try:
+            _consume_once(consumer)
+        except Exception as e:
+            logger.error(f"Stream consumer error: {e}")
+            time.sleep(1)
+
+def start_stream_consumer(symbols):
+    """Feed candle_store from the Redis streams published by a feed node instead of exchange sockets."""
+    t = threading.Thread(target=_consume_streams, args=(symbols,), daemon=True)
+    t.start()
+    return t
+
+def start_depth_ws(symbol, market_type):
+    book = order_book.get_book(symbol, market_type)
+    ws_url = f"{ws_base_url(market_type)}/{registry.register(symbol, market_type).depth_stream}"
+
+    def on_message(ws, message):
+        data = json.loads(message)
+        if data.get('e') == 'depthUpdate':
+            feed_stats.on_message("depth", symbol, None)
+            book.on_diff(data)
+
+    def on_open(ws):
+        # Diffs received from here on are buffered until the snapshot lands.
+        book.resync()
+
+    return _start_stream(symbol, market_type, "depth", ws_url, on_message, on_open)
@@ -0,0 +1,247 @@
+import threading, time
+from bisect import bisect_left
+from core.config import (SPOT_REST_URL, FUTURES_REST_URL, DEPTH_SNAPSHOT_LIMIT, SPOT_DEPTH_WEIGHT,
+                         FUTURES_DEPTH_WEIGHT)
+from utils.helpers import rest_limiter
+from core.logger import get_logger
+logger = get_logger()
+
+MAX_BUFFERED_EVENTS = 10000
+RESYNC_DELAY_SEC = 1
+
+SKIP, APPLY, GAP = 0, 1, 2
+
+
+class OrderBook:
+    """
+    L2 book for one symbol built from a REST snapshot plus @depth diffs.
+
+    Each side is a pair of parallel lists sorted ascending with the best level
+    at the end (asks are keyed by negative price), so best bid/ask is an O(1)
+    read and a level update is a bisect plus a list edit near the touch.
+    """
+
+    def __init__(self, symbol, market_type):
+        self.symbol = symbol
+        self.market_type = market_type
+        self.lock = threading.Lock()
+        self._bid_px, self._bid_qty = [], []
+        self._ask_key, self._ask_qty = [], []
+        self.last_update_id = None
+        self.synced = False
+        self._first_event = True
+        self._buffer = []
+        self._resyncing = False
+
+    # ---------------- Sync ----------------
+    def on_diff(self, event):
+        with self.lock:
+            if not self.synced:
+                if len(self._buffer) >= MAX_BUFFERED_EVENTS:
+                    del self._buffer[:len(self._buffer) // 2]
+                self._buffer.append(event)
+                return
+            if self._apply_event(event) == GAP:
+                logger.warning(f"Depth gap for {self.symbol} at U={event['U']} (last={self.last_update_id}), resyncing")
+                self._reset()
+        if not self.synced:
+            self.resync()
+
+    def resync(self):
+        """Fetch a fresh snapshot in the background and replay buffered diffs on top of it."""
+        with self.lock:
+            if self._resyncing:
+                return
+            self._resyncing = True
+        threading.Thread(target=self._resync_loop, daemon=True).start()
+
+    def _resync_loop(self):
+        try:
+            while True:
+                try:
+                    snapshot = fetch_snapshot(self.symbol, self.market_type)
+                except Exception as e:
+                    logger.error(f"Depth snapshot error for {self.symbol}: {e}")
+                    time.sleep(RESYNC_DELAY_SEC)
+                    continue
+                with self.lock:
+                    if self._load_snapshot(snapshot):
+                        logger.info(f"Order book synced | {self.symbol} @ {self.last_update_id}")
+                        return
+                time.sleep(RESYNC_DELAY_SEC)
+        finally:
+            with self.lock:
+                self._resyncing = False
+
+    def _load_snapshot(self, snapshot):
+        self._bid_px, self._bid_qty = [], []
+        self._ask_key, self._ask_qty = [], []
+        for p, q in reversed(snapshot['bids']):
+            self._bid_px.append(float(p))
+            self._bid_qty.append(float(q))
+        for p, q in reversed(snapshot['asks']):
+            self._ask_key.append(-float(p))
+            self._ask_qty.append(float(q))
+        self.last_update_id = snapshot['lastUpdateId']
+        self._first_event = True
+
+        buffered, self._buffer = self._buffer, []
+        for event in buffered:
+            if self._apply_event(event) == GAP:
+                # Snapshot is older than the stream (or the buffer overflowed); try again.
+                self.synced = False
+                return False
+        self.synced = True
+        return True
+
+    def _reset(self):
+        self.synced = False
+        self._buffer = []
+
+    def _sequence(self, event):
+        U, u, lid = event['U'], event['u'], self.last_update_id
+        spot = self.market_type == "spot"
+        if u < lid or (spot and u == lid):
+            return SKIP
+        if self._first_event:
+            return APPLY if U <= (lid + 1 if spot else lid) else GAP
+        if spot:
+            return APPLY if U == lid + 1 else GAP
+        return APPLY if event.get('pu') == lid else GAP
+
+    def _apply_event(self, event):
+        state = self._sequence(event)
+        if state != APPLY:
+            return state
+        for p, q in event['b']:
+            _set_level(self._bid_px, self._bid_qty, float(p), float(q))
+        for p, q in event['a']:
+            _set_level(self._ask_key, self._ask_qty, -float(p), float(q))
+        self.last_update_id = event['u']
+        self._first_event = False
+        self._trim()
+        return APPLY
+
+    def _trim(self):
+        # Diffs can add levels far from the touch forever; drop the tail beyond twice the snapshot depth.
+        limit = DEPTH_SNAPSHOT_LIMIT
+        if len(self._bid_px) > 2 * limit:
+            del self._bid_px[:-limit], self._bid_qty[:-limit]
+        if len(self._ask_key) > 2 * limit:
+            del self._ask_key[:-limit], self._ask_qty[:-limit]
+
+    # ---------------- Queries ----------------
+    # All reads take the lock: the socket and resync threads edit and replace the sides under it.
+    def _touch(self):
+        """(best bid, best ask) read together; either may be None. Lock held by the caller."""
+        return (self._bid_px[-1] if self._bid_px else None,
+                -self._ask_key[-1] if self._ask_key else None)
+
+    def best_bid(self):
+        with self.lock:
+            return self._touch()[0]
+
+    def best_ask(self):
+        with self.lock:
+            return self._touch()[1]
+
+    def top(self, n=10):
+        """Return ([(price, qty), ...] bids, [(price, qty), ...] asks), best first."""
+        with self.lock:
+            bids = list(zip(self._bid_px[-n:][::-1], self._bid_qty[-n:][::-1]))
+            asks = [(-k, q) for k, q in zip(self._ask_key[-n:][::-1], self._ask_qty[-n:][::-1])]
+        return bids, asks
+
+    def spread(self):
+        with self.lock:
+            bid, ask = self._touch()
+        if bid is None or ask is None:
+            return None
+        return ask - bid
+
+    def mid(self):
+        with self.lock:
+            bid, ask = self._touch()
+        if bid is None or ask is None:
+            return None
+        return (bid + ask) / 2
+
+    def weighted_mid(self, n=5):
+        """
+        Depth-weighted mid over the top n levels: the VWAP of each side weighted
+        by the opposite side's size, so the price leans toward the thinner side.
+        """
+        bids, asks = self.top(n)
+        bid_qty = sum(q for _, q in bids)
+        ask_qty = sum(q for _, q in asks)
+        if not bid_qty or not ask_qty:
+            return None
+        bid_vwap = sum(p * q for p, q in bids) / bid_qty
+        ask_vwap = sum(p * q for p, q in asks) / ask_qty
+        return (bid_vwap * ask_qty + ask_vwap * bid_qty) / (bid_qty + ask_qty)
+
+    def estimate_slippage(self, side, quantity):
+        """
+        Walk the book for a market order of `quantity`.
+        Returns {"avg_price", "worst_price", "filled", "slippage_bps"}, or None if the side is
+        empty, the book has no positive mid or quantity is not positive.
+        slippage_bps is measured against the mid price.
+        """
+        if quantity <= 0:
+            return None
+        with self.lock:
+            if side.upper() == "BUY":
+                keys, qtys, sign = self._ask_key, self._ask_qty, -1
+            else:
+                keys, qtys, sign = self._bid_px, self._bid_qty, 1
+            if not keys or not self._bid_px or not self._ask_key:
+                return None
+            mid = (self._bid_px[-1] - self._ask_key[-1]) / 2
+            if mid <= 0:
+                return None
+            remaining, cost, price = quantity, 0.0, None
+            for i in range(len(keys) - 1, -1, -1):
+                price = sign * keys[i]
+                take = min(remaining, qtys[i])
+                cost += take * price
+                remaining -= take
+                if remaining <= 0:
+                    break
+        filled = quantity - max(remaining, 0)
+        if filled <= 0:
+            return None
+        avg_price = cost / filled
+        slippage_bps = abs(avg_price - mid) / mid * 10000
+        return {"avg_price": avg_price, "worst_price": price, "filled": filled, "slippage_bps": slippage_bps}
+
+
+def _set_level(keys, qtys, key, qty):
+    i = bisect_left(keys, key)
+    if i < len(keys) and keys[i] == key:
+        if qty == 0:
+            del keys[i], qtys[i]
+        else:
+            qtys[i] = qty
+    elif qty != 0:
+        keys.insert(i, key)
+        qtys.insert(i, qty)
+
+
+def fetch_snapshot(symbol, market_type):
+    import requests
+    if market_type == "spot":
+        url = f"{SPOT_REST_URL}/api/v3/depth"
+    else:
+        url = f"{FUTURES_REST_URL}/fapi/v1/depth"
+    rest_limiter(market_type).acquire(SPOT_DEPTH_WEIGHT if market_type == "spot" else FUTURES_DEPTH_WEIGHT)
+    resp = requests.get(url, params={"symbol": symbol, "limit": DEPTH_SNAPSHOT_LIMIT}, timeout=10)
+    resp.raise_for_status()
+    return resp.json()
+
+
+BOOKS = {}
+
+def get_book(symbol, market_type="spot"):
+    if symbol not in BOOKS:
+        BOOKS[symbol] = OrderBook(symbol, market_type)
+    return BOOKS[symbol]
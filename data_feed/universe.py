@@ -0,0 +1,135 @@
+import threading, time
+from core.config import (SYMBOLS, MARKET_TYPES, SPOT_REST_URL, FUTURES_REST_URL, ENABLE_DEPTH, BACKFILL_BARS,
+                         UNIVERSE_TOP_N, UNIVERSE_RANK_BY, UNIVERSE_MARKET_TYPE, UNIVERSE_QUOTE,
+                         UNIVERSE_MIN_QUOTE_VOLUME, UNIVERSE_PINNED, UNIVERSE_REFRESH_SEC)
+from core.symbols import registry
+from data_feed import candle_store, backfill, live_feed, order_book
+from data_feed.watchdog import watchdog
+from trading import symbol_info
+from trading.position_tracker import tracker
+from utils.helpers import rest_limiter
+from core.logger import get_logger
+logger = get_logger()
+
+
+def fetch_tickers(market_type):
+    import requests
+    if market_type == "spot":
+        url, weight = f"{SPOT_REST_URL}/api/v3/ticker/24hr", 80
+    else:
+        url, weight = f"{FUTURES_REST_URL}/fapi/v1/ticker/24hr", 40
+    rest_limiter(market_type).acquire(weight)
+    resp = requests.get(url, timeout=10)
+    resp.raise_for_status()
+    return resp.json()
+
+def rank_symbols(tickers, market_type, top_n, rank_by=UNIVERSE_RANK_BY, quote=UNIVERSE_QUOTE,
+                 min_quote_volume=UNIVERSE_MIN_QUOTE_VOLUME):
+    """
+    Top symbols of a 24h ticker snapshot, by quote volume ("volume") or
+    high-low range over last price ("volatility"). Only pairs quoted in `quote`
+    and, when exchange filters are loaded, currently TRADING are considered.
+    """
+    tradable = symbol_info.TABLES.get(market_type)
+    scored = []
+    for t in tickers:
+        sym = t['symbol']
+        if not sym.endswith(quote) or (tradable is not None and sym not in tradable):
+            continue
+        quote_volume, last = float(t['quoteVolume']), float(t['lastPrice'])
+        if quote_volume < min_quote_volume or last <= 0:
+            continue
+        score = quote_volume if rank_by == "volume" else (float(t['highPrice']) - float(t['lowPrice'])) / last
+        scored.append((score, sym))
+    scored.sort(reverse=True)
+    return [sym for _, sym in scored[:top_n]]
+
+
+class UniverseManager:
+    """
+    Grows and shrinks the traded universe at runtime. config.SYMBOLS and
+    config.MARKET_TYPES are mutated in place, so every module that imported
+    them sees the change. Adding a symbol backfills its candles, creates its
+    strategy instances and opens its streams (new sockets, tracked by the
+    watchdog like the rest). Removing one closes its streams and frees its
+    candles, order book and strategy state. A symbol with open positions is
+    kept until it is flat.
+    """
+
+    def __init__(self, engine, runs_feed=True):
+        self.engine = engine
+        self.runs_feed = runs_feed
+        self.lock = threading.RLock()
+        self.pinned = set(UNIVERSE_PINNED)
+        self.pending_removal = set()
+        self._thread = None
+
+    def add(self, symbol, market_type=UNIVERSE_MARKET_TYPE):
+        with self.lock:
+            if symbol in SYMBOLS:
+                self.pending_removal.discard(symbol)
+                return False
+            if BACKFILL_BARS > 0:
+                try:
+                    candle_store.load_history(symbol, backfill.to_candles(backfill.backfill_symbol(symbol, market_type)))
+                except Exception as e:
+                    logger.error(f"Backfill failed for new symbol {symbol}: {e}")
+            # Strategy state (keyed by registry id) before SYMBOLS, so the engine never sees a
+            # symbol it has no instances for.
+            registry.register(symbol, market_type)
+            self.engine.add_symbol(symbol)
+            SYMBOLS.append(symbol)
+            MARKET_TYPES.append(market_type)
+            if self.runs_feed:
+                live_feed.start_ws(symbol, market_type)
+                if ENABLE_DEPTH:
+                    live_feed.start_depth_ws(symbol, market_type)
+        logger.info(f"Universe: added {symbol} ({market_type})")
+        return True
+
+    def remove(self, symbol):
+        with self.lock:
+            if symbol not in SYMBOLS:
+                return False
+            if tracker.get_open_positions(symbol):
+                if symbol not in self.pending_removal:
+                    logger.info(f"Universe: {symbol} has open positions, removing once flat")
+                self.pending_removal.add(symbol)
+                return False
+            self.pending_removal.discard(symbol)
+            i = SYMBOLS.index(symbol)
+            del SYMBOLS[i]
+            del MARKET_TYPES[i]
+            registry.deactivate(symbol)
+            self.engine.remove_symbol(symbol)
+            watchdog.unregister(symbol)
+            candle_store.CANDLES.pop(symbol, None)
+            candle_store.LAST_CLOSED.pop(symbol, None)
+            order_book.BOOKS.pop(symbol, None)
+        logger.info(f"Universe: removed {symbol}")
+        return True
+
+    def refresh(self, top_n=UNIVERSE_TOP_N, market_type=UNIVERSE_MARKET_TYPE):
+        """Trade the pinned symbols plus the current top N; returns (added, removed)."""
+        ranked = rank_symbols(fetch_tickers(market_type), market_type, top_n)
+        target = self.pinned | set(ranked)
+        added = [sym for sym in sorted(self.pinned) + ranked if sym not in SYMBOLS and self.add(sym, market_type)]
+        # Also retries deferred removals whose positions have since closed.
+        removed = [sym for sym in list(SYMBOLS) if sym not in target and self.remove(sym)]
+        if added or removed:
+            logger.info(f"Universe refresh: +{added} -{removed} | now {len(SYMBOLS)} symbols")
+        return added, removed
+
+    def _run(self):
+        while True:
+            try:
+                self.refresh()
+            except Exception as e:
+                logger.error(f"Universe refresh failed: {e}")
+            time.sleep(UNIVERSE_REFRESH_SEC)
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+        return self._thread
@@ -0,0 +1,186 @@
+import random, socket, threading, time
+from core.config import FEED_STALE_SEC, WATCHDOG_INTERVAL_SEC, WS_RECONNECT_BASE_SEC, WS_RECONNECT_MAX_SEC
+from data_feed import candle_store, backfill
+from data_feed.ingest_queue import ingest_queue
+from core.logger import get_logger
+logger = get_logger()
+
+# Streams whose silence means the symbol's prices are stale (depth only affects the order book).
+PRICE_KINDS = ("kline", "aggTrade")
+
+
+class StreamState:
+    __slots__ = ("name", "symbol", "market_type", "kind", "last_event", "ws", "connected", "connects",
+                 "attempts", "needs_backfill", "stopped")
+
+    def __init__(self, symbol, market_type, kind):
+        self.name = f"{symbol}@{kind}"
+        self.symbol = symbol
+        self.market_type = market_type
+        self.kind = kind
+        self.last_event = time.monotonic()   # receive time of the last message (set by the socket thread)
+        self.ws = None
+        self.connected = False
+        self.connects = 0
+        self.attempts = 0
+        self.needs_backfill = False
+        self.stopped = False         # set when the symbol leaves the universe; ends the reconnect loop
+
+
+class FeedWatchdog:
+    """
+    Tracks every exchange stream and keeps `stale` (a set of symbols) up to
+    date. A price stream is stale while it is disconnected, silent for more
+    than FEED_STALE_SEC, or reconnected but not yet backfilled over the gap.
+    Silent sockets are closed so their reconnect loop (live_feed) dials again
+    with jittered exponential backoff; on reconnect the missed closed klines are
+    fetched over REST and queued through the ordered closed-candle lane before
+    the stream's own messages are processed.
+
+    Strategy nodes have no sockets; there a symbol is stale while its Redis
+    streams from the feed node have been quiet for more than FEED_STALE_SEC
+    (see watch_relay / on_relay).
+    """
+
+    def __init__(self):
+        self.streams = {}
+        self.stale = set()
+        self.relayed = {}            # symbol -> monotonic time of its last Redis stream entry
+        self.lock = threading.Lock()
+        self._thread = None
+
+    def register(self, symbol, market_type, kind):
+        state = StreamState(symbol, market_type, kind)
+        with self.lock:
+            self.streams[state.name] = state
+            if kind in PRICE_KINDS:
+                self.stale.add(symbol)   # nothing live yet
+        return state
+
+    def unregister(self, symbol):
+        """Stop watching (and close) every stream of symbol."""
+        with self.lock:
+            states = [s for s in self.streams.values() if s.symbol == symbol]
+            for state in states:
+                del self.streams[state.name]
+            self.stale.discard(symbol)
+        for state in states:
+            state.stopped = True
+            self._drop(state)
+
+    def watch_relay(self, symbols):
+        """Judge symbols by the feed node's Redis streams (strategy nodes); stale until the first entry."""
+        with self.lock:
+            for symbol in symbols:
+                self.relayed.setdefault(symbol, None)
+                self.stale.add(symbol)
+
+    def on_relay(self, symbol):
+        self.relayed[symbol] = time.monotonic()
+
+    def is_stale(self, symbol):
+        return symbol in self.stale
+
+    # ---------------- Socket lifecycle (called from the stream's thread) ----------------
+    def on_open(self, state):
+        state.connected = True
+        state.attempts = 0
+        state.last_event = time.monotonic()
+        state.connects += 1
+        if state.connects > 1 and state.kind in PRICE_KINDS:
+            logger.info(f"Stream {state.name} reconnected, backfilling gap")
+            state.needs_backfill = True
+            # Runs before this socket's first message is handled, so the gap lands ahead of live data.
+            self._backfill(state)
+
+    def on_close(self, state, reason=None):
+        if state.stopped:
+            return
+        if state.connected:
+            logger.warning(f"Stream {state.name} disconnected{f': {reason}' if reason else ''}")
+        state.connected = False
+        if state.kind in PRICE_KINDS:
+            with self.lock:
+                self.stale.add(state.symbol)
+
+    def backoff(self, state):
+        """Seconds to wait before the next connect attempt (exponential, jittered)."""
+        delay = min(WS_RECONNECT_MAX_SEC, WS_RECONNECT_BASE_SEC * 2 ** state.attempts)
+        state.attempts += 1
+        return delay * random.uniform(0.5, 1.0)
+
+    def _drop(self, state):
+        ws = state.ws
+        if ws is None:
+            return
+        try:
+            # Shutting the raw socket wakes run_forever at once; ws.close() waits out its select timeout.
+            ws.sock.sock.shutdown(socket.SHUT_RDWR)
+        except Exception:
+            ws.close()
+
+    def _backfill(self, state):
+        last = candle_store.get_last_candle(state.symbol)
+        if last is None:
+            state.needs_backfill = False
+            return
+        try:
+            candles = backfill.fill_gap(state.symbol, state.market_type, last['open_time'])
+        except Exception as e:
+            logger.error(f"Gap backfill failed for {state.name}, will retry: {e}")
+            return
+        for candle in candles:
+            ingest_queue.put_closed(state.symbol, candle)
+        state.needs_backfill = False
+        logger.info(f"Backfilled {len(candles)} candles for {state.name}")
+
+    # ---------------- Monitor ----------------
+    def check(self):
+        now = time.monotonic()
+        fresh, stale = set(), set()
+        for state in list(self.streams.values()):
+            age = now - state.last_event
+            if state.connected and age > FEED_STALE_SEC:
+                logger.warning(f"Stream {state.name} silent for {age:.0f}s, forcing reconnect")
+                state.connected = False
+                self._drop(state)
+            if state.needs_backfill and state.connected:
+                self._backfill(state)
+            if state.kind in PRICE_KINDS:
+                if state.connected and age <= FEED_STALE_SEC and not state.needs_backfill:
+                    fresh.add(state.symbol)
+                else:
+                    stale.add(state.symbol)
+        for symbol, last in list(self.relayed.items()):
+            # Nothing to reconnect from here; the feed node's watchdog owns the sockets.
+            if last is not None and now - last <= FEED_STALE_SEC:
+                fresh.add(symbol)
+            else:
+                stale.add(symbol)
+        with self.lock:
+            # A symbol is live only if all of its price streams are.
+            newly_stale = stale - self.stale
+            recovered = (self.stale & fresh) - stale
+            self.stale |= stale
+            self.stale -= recovered
+        if newly_stale:
+            logger.warning(f"Stale feeds: {sorted(newly_stale)}")
+        if recovered:
+            logger.info(f"Feeds live again: {sorted(recovered)}")
+
+    def _run(self):
+        while True:
+            time.sleep(WATCHDOG_INTERVAL_SEC)
+            try:
+                self.check()
+            except Exception as e:
+                logger.error(f"Watchdog error: {e}")
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+        return self._thread
+
+
+watchdog = FeedWatchdog()
@@ -130,23 +130,110 @@
 
 
 
-import threading, time
-from data_feed import live_feed, candle_store
+import time
+_import_started = time.perf_counter()
+import threading
+from core.runtime import runtime
+from core.symbols import registry
+from core.profiler import profiler
+from data_feed import live_feed, candle_store, backfill, archive
+from data_feed.watchdog import watchdog
+from data_feed.universe import UniverseManager
+from storage import snapshot, trade_analytics
 from strategy.strategy_engine import StrategyEngine
 from trading import order_manager
-from core.config import SYMBOLS, MARKET_TYPES
-
-engine = StrategyEngine()
-
-# Start WebSocket for all symbols
-threads = []
-for sym, mtype in zip(SYMBOLS, MARKET_TYPES):
-    t = live_feed.start_ws(sym, mtype)
-    threads.append(t)
+from trading import user_stream, symbol_info
+from core.config import (SYMBOLS, MARKET_TYPES, ENABLE_DEPTH, BACKFILL_BARS, USE_EXCHANGE_BRACKETS,
+                         NODE_ROLE, NODE_INDEX, NODE_COUNT, ARCHIVE_ENABLED, UNIVERSE_TOP_N,
+                         SNAPSHOT_ENABLED, EXECUTION_MODE, TRADE_ROLLUPS)
 from core.logger import get_logger
 logger = get_logger()
+runtime.timings["imports"] = time.perf_counter() - _import_started
 
-logger.info("Starting trading system...")
+logger.info(f"Starting trading system... (role: {NODE_ROLE}, execution: {EXECUTION_MODE})")
+profiler.install()
+runs_feed = NODE_ROLE in ("all", "feed")
+runs_strategy = NODE_ROLE in ("all", "strategy")
+# Strategy nodes only trade their share of the universe; feed nodes serve all of it.
+node_pairs = [(sym, mtype) for i, (sym, mtype) in enumerate(zip(SYMBOLS, MARKET_TYPES))
+              if not runs_strategy or i % NODE_COUNT == NODE_INDEX]
+node_symbols = [sym for sym, _ in node_pairs]
+
+engine = StrategyEngine()
+# Candle timestamp of the last signal acted on, per symbol (snapshotted so a restart doesn't re-fire it)
+LAST_SIGNAL_TIMES = {}
+
+# Connect Redis / Mongo / Binance and load symbol filters in parallel while history is being backfilled
+def warm_up():
+    runtime.warm_up(("redis", "mongo", "binance") if runs_strategy else ("redis",))
+    with runtime.phase("symbol_info"):
+        for mtype in set(MARKET_TYPES):
+            symbol_info.load(mtype)
+    symbol_info.start_refresh(set(MARKET_TYPES))
+    if TRADE_ROLLUPS and runs_strategy:
+        # Here rather than on the first logged exit, which would stall the position monitor
+        with runtime.phase("trade_indexes"):
+            try:
+                trade_analytics.ensure_indexes()
+            except Exception as e:
+                logger.error(f"Trade index creation failed (run `python -m storage.trade_analytics indexes`): {e}")
+
+warm_thread = threading.Thread(target=warm_up, daemon=True)
+warm_thread.start()
+
+# Pick up candles, open positions and signal state from the last snapshot; backfill then bridges the gap
+restored = []
+if SNAPSHOT_ENABLED and runs_strategy:
+    with runtime.phase("restore"):
+        restored = snapshot.restore(LAST_SIGNAL_TIMES)
+
+# Warm candle history from the local cache + REST before going live
+if BACKFILL_BARS > 0 and runs_strategy:
+    with runtime.phase("backfill"):
+        backfill.warm_up(node_symbols, [mtype for _, mtype in node_pairs])
+    engine.warm_up()
+warm_thread.join()
+if restored and USE_EXCHANGE_BRACKETS:
+    # Brackets may have filled or been cancelled while we were down
+    order_manager.reconcile_brackets(restored)
+
+with runtime.phase("start_feeds"):
+    # Follow order fills so exchange-side brackets close positions locally
+    if USE_EXCHANGE_BRACKETS and runs_strategy:
+        for mtype in set(MARKET_TYPES):
+            user_stream.start_user_stream(runtime.binance, mtype, order_manager.on_order_update)
+
+    if ARCHIVE_ENABLED and runs_feed:
+        # Persist every closed candle for research / long lookbacks
+        archive.writer.start()
+
+    if runs_feed:
+        # Start WebSocket for all symbols
+        threads = [live_feed.start_consumer()]
+        for sym, mtype in zip(SYMBOLS, MARKET_TYPES):
+            t = live_feed.start_ws(sym, mtype)
+            threads.append(t)
+            if ENABLE_DEPTH:
+                threads.append(live_feed.start_depth_ws(sym, mtype))
+        # Reconnect silent streams, backfill their gaps and flag stale symbols meanwhile
+        threads.append(watchdog.start())
+    else:
+        # Candles arrive from the feed node's Redis streams
+        threads = [live_feed.start_stream_consumer(node_symbols)]
+        # Flag symbols stale while their streams are quiet (the feed node reconnects the sockets)
+        threads.append(watchdog.start())
+
+runtime.report()
+
+# Follow the most liquid / volatile pairs instead of a fixed list (needs sockets and strategies in this process)
+if UNIVERSE_TOP_N > 0 and runs_feed and runs_strategy:
+    universe = UniverseManager(engine)
+    universe.start()
+
+snapshotter = None
+if SNAPSHOT_ENABLED and runs_strategy:
+    snapshotter = snapshot.Snapshotter(LAST_SIGNAL_TIMES)
+    snapshotter.start()
 
 # logger.error(f"Error placing order: {e}")
 
@@ -154,23 +241,47 @@ logger.info("Starting trading system...")
 
 # Strategy Loop
 def strategy_loop():
-    last_signal_times = {sym: None for sym in SYMBOLS}
+    last_stats_log = time.time()
     while True:
-        signals = engine.run()
+        try:
+            signals = engine.run()
+        except Exception as e:
+            logger.error(f"Strategy engine pass failed: {e}")
+            time.sleep(1)
+            continue
+        if time.time() - last_stats_log >= 300:
+            last_stats_log = time.time()
+            logger.info(f"Strategy stats: {engine.stats_report()}")
+            if EXECUTION_MODE == "paper":
+                logger.info(f"Paper account: {runtime.binance.report()}")
+        # Collect every strategy's signal for the bar first, so they net into one order per symbol
+        batch, fresh = {}, {}
         for (sym, strat), sig in signals.items():
             candle = candle_store.get_last_candle(sym)
-            if candle and last_signal_times[sym] != candle['timestamp']:
-                last_signal_times[sym] = candle['timestamp']
-                if sig in ["BUY", "SELL"]:
+            if candle and LAST_SIGNAL_TIMES.get(sym) != candle['timestamp']:
+                fresh[sym] = candle['timestamp']
+                meta = registry.get(sym)
+                if sig in ["BUY", "SELL"] and meta is not None and meta.active:
                     price = candle['close']
-                    mtype = MARKET_TYPES[SYMBOLS.index(sym)]
-                    logger.info(f"Signal: {sig} | Symbol: {sym} | Candle Close: {price}")
-                    order_manager.place_order(sym, sig, price, mtype, strategy=strat)
+                    logger.info(f"Signal: {sig} | Symbol: {sym} | Strategy: {strat} | Candle Close: {price}")
+                    if sym not in batch:
+                        batch[sym] = (meta.market_type, price, [])
+                    batch[sym][2].append((strat, sig))
+        LAST_SIGNAL_TIMES.update(fresh)
+        if batch:
+            order_manager.place_orders(batch)
         time.sleep(1)
-strategy_thread = threading.Thread(target=strategy_loop)
-strategy_thread.daemon = True
-strategy_thread.start()
+if runs_strategy:
+    strategy_thread = threading.Thread(target=strategy_loop)
+    strategy_thread.daemon = True
+    strategy_thread.start()
 
 # Keep main alive
-while True:
-    time.sleep(10)
+try:
+    while True:
+        time.sleep(10)
+except KeyboardInterrupt:
+    if snapshotter:
+        snapshotter.write()
+        logger.info("Final state snapshot written")
+    raise
@@ -24,14 +24,18 @@
 
 
 
-from pymongo import MongoClient
-from core.config import MONGO_URI, MONGO_DB
 from datetime import datetime
+from core.runtime import runtime
+from core.config import TRADE_ROLLUPS
+from core.logger import get_logger
+logger = get_logger()
 
-client = MongoClient(MONGO_URI)
-db = client[MONGO_DB]
-trades_col = db["trades"]
+def trades_col():
+    return runtime.mongo_db["trades"]
 
 def log_trade(trade_data: dict):
     trade_data["logged_at"] = datetime.now()
-    trades_col.insert_one(trade_data)
+    trades_col().insert_one(trade_data)
+    if TRADE_ROLLUPS:
+        from storage import trade_analytics
+        trade_analytics.record(trade_data)
@@ -1 +1,111 @@
-# TODO: Implement this module
+import socket
+from core.config import (STREAM_MAXLEN, TICK_STREAM_MAXLEN, STREAM_GROUP, STREAM_CONSUMER, STREAM_CLAIM_IDLE_MS,
+                         NODE_INDEX)
+from core.runtime import runtime
+from core.symbols import registry
+from core.logger import get_logger
+logger = get_logger()
+
+# ----------------- Streams -----------------
+# Feed nodes publish per-symbol streams; strategy/execution nodes read them
+# through consumer groups, so a restarted node resumes from its last ack.
+#   ticks:{symbol}    latest in-progress candle + LTP (trimmed hard, lossy by design)
+#   candles:{symbol}  closed candles (trimmed to STREAM_MAXLEN)
+
+CANDLE_FIELDS = ("open_time", "open", "high", "low", "close", "volume", "quote_volume", "buy_volume",
+                 "sell_volume", "trades", "vwap")
+INT_FIELDS = ("open_time", "trades")
+
+def tick_stream(symbol):
+    meta = registry.get(symbol)
+    return meta.tick_stream if meta else f"ticks:{symbol}"
+
+def candle_stream(symbol):
+    meta = registry.get(symbol)
+    return meta.candle_stream if meta else f"candles:{symbol}"
+
+def encode_candle(candle):
+    return {k: candle[k] for k in CANDLE_FIELDS}
+
+def decode_candle(fields):
+    out = {}
+    for k, v in fields.items():
+        k = k.decode() if isinstance(k, bytes) else k
+        out[k] = int(v) if k in INT_FIELDS else float(v)
+    return out
+
+def publish(pipe, ticks, closed):
+    """
+    Queue stream writes on an existing pipeline.
+    ticks: {symbol: current candle}; closed: [(symbol, candle)] in close order.
+    """
+    metas = registry.by_symbol
+    for symbol, candle in closed:
+        pipe.xadd(metas[symbol].candle_stream, encode_candle(candle), maxlen=STREAM_MAXLEN, approximate=True)
+    for symbol, candle in ticks.items():
+        pipe.xadd(metas[symbol].tick_stream, encode_candle(candle), maxlen=TICK_STREAM_MAXLEN, approximate=True)
+
+
+class StreamConsumer:
+    """
+    Consumer-group reader over the tick and candle streams of a set of symbols.
+    On start it claims entries left pending by other consumers for longer than
+    STREAM_CLAIM_IDLE_MS (a node that died, or ran under another name), then
+    re-reads everything delivered to this consumer but never acked, then
+    switches to new entries. The default name is stable across restarts.
+    """
+
+    def __init__(self, symbols, group=STREAM_GROUP, consumer=STREAM_CONSUMER or f"{socket.gethostname()}-node{NODE_INDEX}"):
+        self.group = group
+        self.consumer = consumer
+        self.keys = [candle_stream(s) for s in symbols] + [tick_stream(s) for s in symbols]
+        self._recovering = True
+        r = runtime.redis
+        for key in self.keys:
+            try:
+                r.xgroup_create(key, group, id="$", mkstream=True)
+            except Exception as e:
+                if "BUSYGROUP" not in str(e):
+                    raise
+        self.claim_idle()
+
+    def claim_idle(self, min_idle_ms=STREAM_CLAIM_IDLE_MS):
+        """Take over entries other consumers read but never acked; they are replayed by the recovery read."""
+        r = runtime.redis
+        claimed = 0
+        for key in self.keys:
+            start = "0-0"
+            while True:
+                # Not justid: redis-py then drops the cursor needed to page through the pending list.
+                resp = r.xautoclaim(key, self.group, self.consumer, min_idle_ms, start_id=start, count=500)
+                start = resp[0]
+                claimed += len(resp[1])
+                if start in (b"0-0", "0-0"):
+                    break
+        if claimed:
+            logger.info(f"Stream consumer {self.consumer} claimed {claimed} idle pending entries")
+        return claimed
+
+    def read(self, count=500, block_ms=1000):
+        """Return [(stream, [(entry_id, fields), ...]), ...] with stream names decoded."""
+        r = runtime.redis
+        if self._recovering:
+            resp = r.xreadgroup(self.group, self.consumer, {k: "0" for k in self.keys}, count=count)
+            if any(entries for _, entries in resp or []):
+                return _decode_names(resp)
+            self._recovering = False
+            logger.info(f"Stream consumer {self.consumer} caught up on pending entries")
+        resp = r.xreadgroup(self.group, self.consumer, {k: ">" for k in self.keys}, count=count, block=block_ms)
+        return _decode_names(resp or [])
+
+    def ack(self, acks):
+        """acks: {stream: [entry_id, ...]} acknowledged in one pipeline."""
+        pipe = runtime.redis.pipeline(transaction=False)
+        for stream, ids in acks.items():
+            if ids:
+                pipe.xack(stream, self.group, *ids)
+        pipe.execute()
+
+
+def _decode_names(resp):
+    return [(stream.decode() if isinstance(stream, bytes) else stream, entries) for stream, entries in resp]
@@ -0,0 +1,166 @@
+import json, os, threading, time
+from collections import deque
+from datetime import datetime
+import numpy as np
+from core.config import SNAPSHOT_DIR, SNAPSHOT_INTERVAL_SEC
+from data_feed import candle_store
+from storage.redis_handler import CANDLE_FIELDS, INT_FIELDS
+from core.logger import get_logger
+logger = get_logger()
+
+# ----------------- Layout -----------------
+#   {SNAPSHOT_DIR}/candles/{symbol}.npy   closed bars, float64 rows of CANDLE_FIELDS; rewritten only
+#                                        when the symbol closed a new bar since the last snapshot
+#   {SNAPSHOT_DIR}/live.npy              the in-progress bar of every symbol (one row each)
+#   {SNAPSHOT_DIR}/positions.npy         open positions (structured array)
+#   {SNAPSHOT_DIR}/signals.npy           last signal candle time per symbol
+#   {SNAPSHOT_DIR}/manifest.json         written last; names the symbols the snapshot covers
+# Every file is written to a temp name and renamed into place, so a crash mid-snapshot leaves the
+# previous version of each file intact.
+
+POSITION_DTYPE = np.dtype([("symbol", "U24"), ("side", "U8"), ("market_type", "U8"), ("strategy", "U48"),
+                           ("entry_price", "f8"), ("quantity", "f8"), ("open_time", "f8"), ("orders", "U256")])
+SIGNAL_DTYPE = np.dtype([("symbol", "U24"), ("candle_time", "f8")])
+LIVE_DTYPE = np.dtype([("symbol", "U24"), ("row", "f8", (len(CANDLE_FIELDS),))])
+
+
+def _path(*parts):
+    return os.path.join(SNAPSHOT_DIR, *parts)
+
+def _save(path, array):
+    tmp = f"{path}.tmp"
+    with open(tmp, "wb") as f:
+        np.save(f, array, allow_pickle=False)
+    os.replace(tmp, path)
+
+def _load(path):
+    try:
+        return np.load(path, allow_pickle=False)
+    except (OSError, ValueError):
+        return None
+
+def _row(candle):
+    return [candle[f] for f in CANDLE_FIELDS]
+
+def _candle(row):
+    fields = {f: (int(v) if f in INT_FIELDS else float(v)) for f, v in zip(CANDLE_FIELDS, row)}
+    return candle_store.restore_candle(fields)
+
+def encode_orders(orders):
+    return ";".join(f"{order_id}:{reason}" for order_id, reason in orders.items())
+
+def decode_orders(text):
+    return {int(order_id): reason for order_id, reason in (item.split(":") for item in text.split(";") if item)}
+
+
+class Snapshotter:
+    """
+    Periodic state snapshots for a fast restart. `signal_times` is the strategy
+    loop's {symbol: candle timestamp of the last acted-on signal} dict.
+    Positions and bracket orders are read from the tracker and order manager.
+    """
+
+    def __init__(self, signal_times, interval=SNAPSHOT_INTERVAL_SEC):
+        self.signal_times = signal_times
+        self.interval = interval
+        self._written_closed = {}   # symbol -> last closed open_time already on disk
+        self._thread = None
+
+    def write(self):
+        from trading.position_tracker import tracker
+        from trading import order_manager
+        started = time.perf_counter()
+        os.makedirs(_path("candles"), exist_ok=True)
+
+        live, rewritten = [], 0
+        for symbol in list(candle_store.CANDLES):
+            bars = candle_store.get_window(symbol)
+            if not bars:
+                continue
+            last_closed = candle_store.LAST_CLOSED.get(symbol, -1)
+            if bars[-1]['open_time'] > last_closed:
+                live.append((symbol, _row(bars[-1])))
+                bars = bars[:-1]
+            if bars and self._written_closed.get(symbol) != bars[-1]['open_time']:
+                _save(_path("candles", f"{symbol}.npy"), np.array([_row(c) for c in bars], dtype=np.float64))
+                self._written_closed[symbol] = bars[-1]['open_time']
+                rewritten += 1
+        _save(_path("live.npy"), np.array(live, dtype=LIVE_DTYPE))
+
+        with tracker.book.lock:
+            positions = list(tracker.book.positions.values())
+        with order_manager.bracket_lock:
+            brackets = {slot: dict(b['orders']) for slot, b in order_manager.BRACKETS.items()}
+        _save(_path("positions.npy"), np.array(
+            [(p.symbol, p.side, p.market_type, p.strategy, p.entry_price, p.quantity, p.open_time,
+              encode_orders(brackets.get(p.slot, {}))) for p in positions], dtype=POSITION_DTYPE))
+
+        _save(_path("signals.npy"), np.array(
+            [(sym, ts.timestamp()) for sym, ts in list(self.signal_times.items()) if ts is not None], dtype=SIGNAL_DTYPE))
+
+        symbols = sorted(sym for sym in self._written_closed if sym in candle_store.CANDLES)
+        manifest = {"written_at": time.time(), "symbols": symbols, "positions": len(positions)}
+        with open(_path("manifest.json.tmp"), "w") as f:
+            json.dump(manifest, f)
+        os.replace(_path("manifest.json.tmp"), _path("manifest.json"))
+        logger.debug(f"Snapshot: {rewritten} candle files, {len(live)} live bars, {len(positions)} positions "
+                     f"in {(time.perf_counter() - started) * 1000:.1f}ms")
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            try:
+                self.write()
+            except Exception as e:
+                logger.error(f"Snapshot failed: {e}")
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+        return self._thread
+
+
+def restore(signal_times):
+    """
+    Load the latest snapshot into candle_store, the position tracker and signal_times.
+    Returns [(position, bracket orders)] for reconciliation against the exchange.
+    """
+    from trading.position_tracker import tracker
+    try:
+        with open(_path("manifest.json")) as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        logger.info("No state snapshot to restore")
+        return []
+    started = time.perf_counter()
+
+    live = _load(_path("live.npy"))
+    live = {str(sym): row for sym, row in live.tolist()} if live is not None else {}
+    for symbol in manifest['symbols']:
+        closed = _load(_path("candles", f"{symbol}.npy"))
+        if closed is None or not len(closed):
+            continue
+        candles = [_candle(row) for row in closed.tolist()]
+        candle_store.LAST_CLOSED[symbol] = candles[-1]['open_time']
+        if symbol in live:
+            candles.append(_candle(live.pop(symbol)))
+        candle_store.CANDLES[symbol] = deque(candles, maxlen=candle_store.MAX_CANDLES)
+    for symbol, row in live.items():
+        candle_store.CANDLES[symbol] = deque([_candle(row)], maxlen=candle_store.MAX_CANDLES)
+
+    restored = []
+    positions = _load(_path("positions.npy"))
+    for p in (positions.tolist() if positions is not None else []):
+        symbol, side, market_type, strategy, entry_price, quantity, open_time, orders = p
+        pos = tracker.open_position(symbol, side, entry_price, market_type, strategy, quantity, open_time=open_time)
+        restored.append((pos, decode_orders(orders)))
+
+    signals = _load(_path("signals.npy"))
+    for symbol, candle_time in (signals.tolist() if signals is not None else []):
+        signal_times[symbol] = datetime.fromtimestamp(candle_time)
+
+    age = time.time() - manifest['written_at']
+    logger.info(f"Restored snapshot from {age:.0f}s ago: {len(manifest['symbols'])} symbols, {len(restored)} positions "
+                f"in {(time.perf_counter() - started) * 1000:.1f}ms")
+    return restored
@@ -0,0 +1,239 @@
+import argparse, queue, threading
+from datetime import datetime, timedelta
+from pymongo import ASCENDING, UpdateOne
+from core.runtime import runtime
+from core.logger import get_logger
+logger = get_logger()
+
+# ----------------- Rollups -----------------
+# trade_rollups holds one document per (hour, symbol, strategy, exit reason, live/paper
+# mode), updated in place as each trade is logged:
+#   count, wins, pnl_sum      plain counters
+#   cum_pnl, peak_pnl         running equity (in pnl %) of the bucket, in exit order
+#   max_drawdown              worst peak-to-trough of cum_pnl inside the bucket
+# Dashboard queries read rollups only, so their cost follows the number of hours and
+# keys in range, not the number of trades. Indexes are built at start-up (main) or with
+# the `indexes` command, never on the trade path.
+
+KEY_FIELDS = ("symbol", "strategy", "reason", "mode")
+GROUP_FIELDS = KEY_FIELDS + ("hour", "day")
+
+_indexes_ready = False
+_index_lock = threading.Lock()
+
+
+def trades_col():
+    return runtime.mongo_db["trades"]
+
+def rollups_col():
+    return runtime.mongo_db["trade_rollups"]
+
+def ensure_indexes():
+    """Create the indexes the rollup upserts and ad-hoc trade queries rely on (idempotent)."""
+    global _indexes_ready
+    with _index_lock:
+        if _indexes_ready:
+            return
+        trades = trades_col()
+        trades.create_index([("exit_time", ASCENDING)])
+        for field in KEY_FIELDS:
+            trades.create_index([(field, ASCENDING), ("exit_time", ASCENDING)])
+        rollups = rollups_col()
+        rollups.create_index([("hour", ASCENDING)])
+        for field in KEY_FIELDS:
+            rollups.create_index([(field, ASCENDING), ("hour", ASCENDING)])
+        _indexes_ready = True
+
+def _bucket(trade):
+    hour = trade['exit_time'].replace(minute=0, second=0, microsecond=0)
+    return {"hour": hour, **{field: trade.get(field) for field in KEY_FIELDS}}
+
+def _rollup_update(trade):
+    """Upsert of one trade into its bucket, as an update pipeline so drawdown is computed server-side."""
+    key = _bucket(trade)
+    pnl = float(trade['pnl_percent'])
+    pipeline = [
+        {"$set": {
+            **{field: {"$literal": value} for field, value in key.items()},
+            "count": {"$add": [{"$ifNull": ["$count", 0]}, 1]},
+            "wins": {"$add": [{"$ifNull": ["$wins", 0]}, 1 if pnl > 0 else 0]},
+            "pnl_sum": {"$add": [{"$ifNull": ["$pnl_sum", 0.0]}, pnl]},
+            "cum_pnl": {"$add": [{"$ifNull": ["$cum_pnl", 0.0]}, pnl]},
+        }},
+        {"$set": {"peak_pnl": {"$max": [{"$ifNull": ["$peak_pnl", 0.0]}, "$cum_pnl"]}}},
+        {"$set": {"max_drawdown": {"$max": [{"$ifNull": ["$max_drawdown", 0.0]},
+                                            {"$subtract": ["$peak_pnl", "$cum_pnl"]}]}}},
+    ]
+    _id = "|".join(str(key[f]) for f in KEY_FIELDS) + f"|{key['hour']:%Y%m%d%H}"
+    return {"_id": _id}, pipeline
+
+class RollupWriter:
+    """
+    Background rollup updates. record (called by log_trade on the position
+    monitor thread) only enqueues; a daemon thread sends whatever has queued
+    up as one ordered bulk write, so exits never wait on the rollup round trip.
+    """
+
+    def __init__(self):
+        self.queue = queue.SimpleQueue()
+        self._thread = None
+        self._start_lock = threading.Lock()
+
+    def record(self, trade):
+        self.queue.put(trade)
+        if self._thread is None:
+            self.start()
+
+    def start(self):
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="trade-rollups", daemon=True)
+                self._thread.start()
+        return self._thread
+
+    def _run(self):
+        while True:
+            batch = [self.queue.get()]
+            while True:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                self.flush(batch)
+            except Exception as e:
+                logger.error(f"Trade rollup update failed for {len(batch)} trades (fix with `rebuild`): {e}")
+
+    def flush(self, batch):
+        ops = [UpdateOne(*_rollup_update(trade), upsert=True) for trade in batch]
+        rollups_col().bulk_write(ops, ordered=True)
+
+
+writer = RollupWriter()
+
+def record(trade):
+    """Queue one logged trade to be folded into trade_rollups."""
+    writer.record(trade)
+
+def rebuild(since=None):
+    """
+    Recompute the rollups from the raw trades (e.g. after enabling rollups on an
+    existing history). Trades are replayed in exit order so drawdowns match the
+    live path.
+    """
+    ensure_indexes()
+    match = {}
+    if since:
+        # Whole hours only: a partially replayed first bucket would be double counted.
+        since = since.replace(minute=0, second=0, microsecond=0)
+        match = {"exit_time": {"$gte": since}}
+    rollups_col().delete_many({"hour": {"$gte": since}} if since else {})
+    ops, replayed = [], 0
+    for trade in trades_col().find(match, {f: 1 for f in KEY_FIELDS + ("exit_time", "pnl_percent")}).sort("exit_time", ASCENDING):
+        query, pipeline = _rollup_update(trade)
+        ops.append(UpdateOne(query, pipeline, upsert=True))
+        if len(ops) >= 1000:
+            rollups_col().bulk_write(ops, ordered=True)
+            replayed += len(ops)
+            ops = []
+    if ops:
+        rollups_col().bulk_write(ops, ordered=True)
+        replayed += len(ops)
+    logger.info(f"Rebuilt trade rollups from {replayed} trades")
+    return replayed
+
+
+# ---------------- Queries (pushed down as aggregation pipelines) ----------------
+def _range_match(since, until, filters):
+    match = {field: value for field, value in (filters or {}).items() if value is not None}
+    if since or until:
+        match["hour"] = {**({"$gte": since} if since else {}), **({"$lt": until} if until else {})}
+    return match
+
+def summary(group_by=("strategy",), since=None, until=None, filters=None):
+    """
+    Count, win rate, PnL sum and max drawdown per group, from the rollups.
+    group_by: any of symbol, strategy, reason, mode, hour, day. filters: {field: value}
+    on the key fields. Drawdown is peak-to-trough of the group's cumulative PnL at
+    hourly resolution, or the worst single-hour drawdown if that is larger.
+    """
+    for field in group_by:
+        if field not in GROUP_FIELDS:
+            raise ValueError(f"cannot group by '{field}' (one of {', '.join(GROUP_FIELDS)})")
+    group_key = {field: ("$hour" if field == "hour" else
+                         {"$dateTrunc": {"date": "$hour", "unit": "day"}} if field == "day" else f"${field}")
+                 for field in group_by}
+    series_key = {field: value for field, value in group_key.items() if field not in ("hour", "day")}
+    pipeline = [
+        {"$match": _range_match(since, until, filters)},
+        # One point per group and hour, so the cumulative PnL can be walked in time order.
+        {"$group": {"_id": {"g": group_key, "s": series_key, "hour": "$hour"},
+                    "count": {"$sum": "$count"}, "wins": {"$sum": "$wins"}, "pnl_sum": {"$sum": "$pnl_sum"},
+                    "bucket_dd": {"$max": "$max_drawdown"}}},
+        {"$setWindowFields": {"partitionBy": "$_id.s", "sortBy": {"_id.hour": 1},
+                              "output": {"cum": {"$sum": "$pnl_sum", "window": {"documents": ["unbounded", "current"]}}}}},
+        {"$setWindowFields": {"partitionBy": "$_id.s", "sortBy": {"_id.hour": 1},
+                              "output": {"peak": {"$max": "$cum", "window": {"documents": ["unbounded", "current"]}}}}},
+        {"$group": {"_id": "$_id.g", "count": {"$sum": "$count"}, "wins": {"$sum": "$wins"},
+                    "pnl_sum": {"$sum": "$pnl_sum"},
+                    "series_dd": {"$max": {"$max": [0, {"$subtract": ["$peak", "$cum"]}]}},
+                    "bucket_dd": {"$max": "$bucket_dd"}}},
+        {"$project": {"_id": 0, **{field: f"$_id.{field}" for field in group_by},
+                      "count": 1, "pnl_sum": 1,
+                      "win_rate": {"$cond": [{"$gt": ["$count", 0]}, {"$divide": ["$wins", "$count"]}, None]},
+                      "avg_pnl": {"$cond": [{"$gt": ["$count", 0]}, {"$divide": ["$pnl_sum", "$count"]}, None]},
+                      "max_drawdown": {"$max": ["$series_dd", "$bucket_dd"]}}},
+        {"$sort": {field: 1 for field in group_by} or {"pnl_sum": -1}},
+    ]
+    return list(rollups_col().aggregate(pipeline, allowDiskUse=True))
+
+def trades(since=None, until=None, filters=None, limit=100):
+    """Raw trades in an exit-time range (newest first), served by the (field, exit_time) indexes."""
+    match = {field: value for field, value in (filters or {}).items() if value is not None}
+    if since or until:
+        match["exit_time"] = {**({"$gte": since} if since else {}), **({"$lt": until} if until else {})}
+    return list(trades_col().find(match, {"_id": 0}).sort("exit_time", -1).limit(limit))
+
+
+def _print_table(rows, columns):
+    if not rows:
+        print("no trades in range")
+        return
+    def fmt(value):
+        if isinstance(value, float):
+            return f"{value:.2f}"
+        if isinstance(value, datetime):
+            return f"{value:%Y-%m-%d %H:%M}"
+        return "-" if value is None else str(value)
+    cells = [[fmt(row.get(c)) for c in columns] for row in rows]
+    widths = [max(len(c), *(len(r[i]) for r in cells)) for i, c in enumerate(columns)]
+    print("  ".join(c.ljust(w) for c, w in zip(columns, widths)))
+    for r in cells:
+        print("  ".join(v.ljust(w) for v, w in zip(r, widths)))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Trade analytics over the trade rollups")
+    sub = parser.add_subparsers(dest="command", required=True)
+    report = sub.add_parser("report", help="PnL summary grouped by key fields")
+    report.add_argument("--by", default="strategy", help=f"comma-separated, from {','.join(GROUP_FIELDS)}")
+    report.add_argument("--days", type=float, default=30, help="look-back window (0 = all)")
+    for field in KEY_FIELDS:
+        report.add_argument(f"--{field}", help=f"only this {field}")
+    sub.add_parser("indexes", help="create the indexes")
+    rebuild_cmd = sub.add_parser("rebuild", help="recompute rollups from the raw trades")
+    rebuild_cmd.add_argument("--days", type=float, default=0, help="only the last N days (0 = all)")
+    args = parser.parse_args()
+
+    since = datetime.now() - timedelta(days=args.days) if getattr(args, "days", 0) else None
+    if args.command == "indexes":
+        ensure_indexes()
+        print("indexes ready")
+    elif args.command == "rebuild":
+        print(f"replayed {rebuild(since)} trades")
+    else:
+        group_by = tuple(field.strip() for field in args.by.split(",") if field.strip())
+        if since:
+            since = since.replace(minute=0, second=0, microsecond=0)
+        rows = summary(group_by, since=since, filters={field: getattr(args, field) for field in KEY_FIELDS})
+        _print_table(rows, list(group_by) + ["count", "win_rate", "pnl_sum", "avg_pnl", "max_drawdown"])
@@ -27,6 +27,26 @@
 
 
 
+# Column order of the candle matrix handed to generate_signals.
+BATCH_FIELDS = ("open", "high", "low", "close", "volume")
+SIGNAL_NONE, SIGNAL_BUY, SIGNAL_SELL = 0, 1, -1
+SIGNAL_NAMES = {SIGNAL_NONE: None, SIGNAL_BUY: "BUY", SIGNAL_SELL: "SELL"}
+
 class BaseStrategy:
+    # Batch strategies get a single instance that scores the whole universe per call.
+    supports_batch = False
+
+    def warm_up(self, candles):
+        """Optional: prime rolling state from the symbol's candle history (oldest first)."""
+        pass
+
     def generate_signal(self, candle):
         raise NotImplementedError("Implement in subclass")
+
+    def generate_signals(self, symbols, candles):
+        """
+        symbols: list of N symbols
+        candles: (N, len(BATCH_FIELDS)) float array, row i = latest candle of symbols[i]
+        Returns an int8 array of N signals (SIGNAL_BUY / SIGNAL_SELL / SIGNAL_NONE).
+        """
+        raise NotImplementedError("Implement in subclass")
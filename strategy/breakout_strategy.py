@@ -35,9 +35,17 @@
 
 
 
-from strategy.base_strategy import BaseStrategy
+import numpy as np
+from strategy.base_strategy import BaseStrategy, BATCH_FIELDS
+
+OPEN, CLOSE = BATCH_FIELDS.index("open"), BATCH_FIELDS.index("close")
 
 class BreakoutStrategy(BaseStrategy):
+    supports_batch = True
+
+    def generate_signals(self, symbols, candles):
+        return np.sign(candles[:, CLOSE] - candles[:, OPEN]).astype(np.int8)
+
     def generate_signal(self, candle):
         """
         Simple mock: Buy if close > open, Sell if close < open
@@ -1 +1,149 @@
-# TODO: Implement this module
+import math
+from collections import deque
+from strategy.base_strategy import BaseStrategy
+from core.config import (REVERSAL_RSI_PERIOD, REVERSAL_RSI_OVERSOLD, REVERSAL_RSI_OVERBOUGHT, REVERSAL_BB_PERIOD,
+                         REVERSAL_BB_STD, REVERSAL_PIN_RATIO, REVERSAL_MIN_CONFIRMATIONS)
+
+
+class ReversalStrategy(BaseStrategy):
+    """
+    Mean-reversion detector for one symbol. Counts three confirmations and
+    signals when at least REVERSAL_MIN_CONFIRMATIONS agree:
+    - RSI (Wilder) oversold / overbought
+    - close re-entering the Bollinger band after the previous bar closed outside it
+    - bullish / bearish engulfing or pin bar
+
+    State is rolling: Wilder averages plus a running sum / sum of squares over
+    the band window. A bar is committed once, when a candle with a newer
+    open_time shows up (using the last version seen of the finished bar), and
+    the in-progress candle is scored against the committed state without
+    changing it, so every call is O(1).
+    """
+
+    def __init__(self, rsi_period=REVERSAL_RSI_PERIOD, bb_period=REVERSAL_BB_PERIOD, bb_std=REVERSAL_BB_STD):
+        self.rsi_period = rsi_period
+        self.bb_period = bb_period
+        self.bb_std = bb_std
+        # RSI
+        self.prev_close = None
+        self.avg_gain = self.avg_loss = 0.0
+        self.deltas = 0
+        # Bollinger window
+        self.window = deque()
+        self.sum = self.sum_sq = 0.0
+        # Last committed bar: (open, high, low, close) and where it closed relative to its band
+        self.prev_bar = None
+        self.prev_below = self.prev_above = False
+        # Latest version of the bar in progress: (open_time, open, high, low, close)
+        self.pending = None
+
+    # ---------------- Rolling state ----------------
+    def _commit(self, bar):
+        _, o, h, l, c = bar
+        if self.prev_close is not None:
+            delta = c - self.prev_close
+            gain, loss = (delta, 0.0) if delta > 0 else (0.0, -delta)
+            p = self.rsi_period
+            if self.deltas < p:
+                # Seed with a simple average over the first period, then switch to Wilder smoothing.
+                self.avg_gain += gain / p
+                self.avg_loss += loss / p
+            else:
+                self.avg_gain = (self.avg_gain * (p - 1) + gain) / p
+                self.avg_loss = (self.avg_loss * (p - 1) + loss) / p
+            self.deltas += 1
+        self.prev_close = c
+
+        self.window.append(c)
+        self.sum += c
+        self.sum_sq += c * c
+        if len(self.window) > self.bb_period:
+            old = self.window.popleft()
+            self.sum -= old
+            self.sum_sq -= old * old
+        lower, upper = self._bands(self.sum, self.sum_sq, len(self.window))
+        self.prev_below = lower is not None and c < lower
+        self.prev_above = upper is not None and c > upper
+        self.prev_bar = (o, h, l, c)
+
+    def observe(self, candle):
+        """Track the latest version of the current bar, committing the previous bar when a new one starts."""
+        bar = (candle['open_time'], candle['open'], candle['high'], candle['low'], candle['close'])
+        if self.pending is not None and bar[0] != self.pending[0]:
+            if bar[0] < self.pending[0]:
+                return False   # stale / out-of-order update
+            self._commit(self.pending)
+        self.pending = bar
+        return True
+
+    def warm_up(self, candles):
+        for candle in candles:
+            self.observe(candle)
+
+    # ---------------- Indicators on the in-progress bar ----------------
+    def _bands(self, total, total_sq, n):
+        if n < self.bb_period:
+            return None, None
+        mean = total / n
+        std = math.sqrt(max(total_sq / n - mean * mean, 0.0))
+        return mean - self.bb_std * std, mean + self.bb_std * std
+
+    def _rsi(self, close):
+        if self.deltas < self.rsi_period:
+            return None
+        delta = close - self.prev_close
+        p = self.rsi_period
+        avg_gain = (self.avg_gain * (p - 1) + max(delta, 0.0)) / p
+        avg_loss = (self.avg_loss * (p - 1) + max(-delta, 0.0)) / p
+        if avg_loss == 0:
+            return 100.0
+        return 100.0 - 100.0 / (1.0 + avg_gain / avg_loss)
+
+    def _pattern(self, o, h, l, c):
+        """+1 bullish engulfing / hammer, -1 bearish engulfing / shooting star, 0 otherwise."""
+        if self.prev_bar is not None:
+            po, _, _, pc = self.prev_bar
+            if pc < po and c > o and o <= pc and c >= po:
+                return 1
+            if pc > po and c < o and o >= pc and c <= po:
+                return -1
+        body = abs(c - o)
+        rng = h - l
+        if rng <= 0:
+            return 0
+        lower_wick = min(o, c) - l
+        upper_wick = h - max(o, c)
+        if lower_wick >= REVERSAL_PIN_RATIO * body and lower_wick >= 2 * upper_wick and lower_wick >= rng / 2:
+            return 1
+        if upper_wick >= REVERSAL_PIN_RATIO * body and upper_wick >= 2 * lower_wick and upper_wick >= rng / 2:
+            return -1
+        return 0
+
+    def generate_signal(self, candle):
+        if not self.observe(candle):
+            return None
+        _, o, h, l, c = self.pending
+        bull = bear = 0
+
+        rsi = self._rsi(c)
+        if rsi is not None:
+            bull += rsi <= REVERSAL_RSI_OVERSOLD
+            bear += rsi >= REVERSAL_RSI_OVERBOUGHT
+
+        n = len(self.window)
+        if n >= self.bb_period:
+            # Band as of this bar: the committed window with the oldest close swapped for the current one.
+            old = self.window[0]
+            lower, upper = self._bands(self.sum - old + c, self.sum_sq - old * old + c * c, n)
+            bull += self.prev_below and c > lower
+            bear += self.prev_above and c < upper
+
+        pattern = self._pattern(o, h, l, c)
+        bull += pattern > 0
+        bear += pattern < 0
+
+        if bull >= REVERSAL_MIN_CONFIRMATIONS and bull > bear:
+            return "BUY"
+        if bear >= REVERSAL_MIN_CONFIRMATIONS and bear > bull:
+            return "SELL"
+        return None
@@ -79,21 +79,226 @@
 
 
 
+import time
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, TimeoutError
 from strategy.breakout_strategy import BreakoutStrategy
+from strategy.reversal_strategy import ReversalStrategy
+from strategy.base_strategy import BATCH_FIELDS, SIGNAL_NAMES
 from data_feed import candle_store
-from core.config import SYMBOLS
+from data_feed.watchdog import watchdog
+from core.symbols import registry
+from core.config import (SYMBOLS, STRATEGIES, SYMBOL_STRATEGIES, STRATEGY_EXECUTOR, STRATEGY_WORKERS,
+                         STRATEGY_TIMEOUT_MS)
+from core.logger import get_logger
+logger = get_logger()
+
+STRATEGY_REGISTRY = {
+    "breakout": BreakoutStrategy,
+    "reversal": ReversalStrategy,
+}
+
+def strategy_classes(symbol):
+    """Classes enabled for symbol: its SYMBOL_STRATEGIES entry if any, else STRATEGIES."""
+    names = SYMBOL_STRATEGIES.get(symbol, STRATEGIES)
+    classes = []
+    for name in names:
+        cls = STRATEGY_REGISTRY.get(name.strip().lower())
+        if cls is None:
+            raise ValueError(f"Unknown strategy '{name}' for {symbol} (known: {', '.join(STRATEGY_REGISTRY)})")
+        if cls not in classes:
+            classes.append(cls)
+    return classes
+
+
+class StrategyStats:
+    __slots__ = ("runs", "total_sec", "max_sec", "overruns", "errors", "skipped")
 
-class StrategyEngine:
     def __init__(self):
-        self.strategies = {sym: [BreakoutStrategy()] for sym in SYMBOLS}
+        self.runs = self.overruns = self.errors = self.skipped = 0
+        self.total_sec = self.max_sec = 0.0
+
+    def record(self, elapsed):
+        self.runs += 1
+        self.total_sec += elapsed
+        if elapsed > self.max_sec:
+            self.max_sec = elapsed
+
+    def as_dict(self):
+        avg_ms = self.total_sec / self.runs * 1000 if self.runs else 0.0
+        return {"runs": self.runs, "avg_ms": round(avg_ms, 3), "max_ms": round(self.max_sec * 1000, 3),
+                "overruns": self.overruns, "errors": self.errors, "skipped": self.skipped}
+
+
+def _evaluate(strat, method, args):
+    """Pool entry point; returns the strategy too so process workers can hand back updated state."""
+    started = time.perf_counter()
+    result = getattr(strat, method)(*args)
+    return result, time.perf_counter() - started, strat
+
+
+class StrategyEngine:
+    """
+    Runs the strategies enabled for each symbol (see strategy_classes) on the
+    latest candles. Each strategy class picks where it
+    runs through its `execution` attribute ("inline", "thread" or "process",
+    default STRATEGY_EXECUTOR) and its budget through `time_budget_ms` (default
+    STRATEGY_TIMEOUT_MS). Pooled evaluations that overrun are dropped for this
+    pass and the strategy is skipped until the straggler finishes; exceptions
+    are logged and counted instead of killing the loop.
+    """
+
+    def __init__(self, executor=STRATEGY_EXECUTOR):
+        self.executor = executor
+        # Batch-capable strategies get one instance scoring all of their symbols in one call;
+        # the rest keep one instance per symbol.
+        enabled = {sym: strategy_classes(sym) for sym in SYMBOLS}
+        batch_symbols = {}
+        for sym, classes in enabled.items():
+            for cls in classes:
+                if cls.supports_batch:
+                    batch_symbols.setdefault(cls, []).append(sym)
+        self.batch_strategies = [[cls(), syms] for cls, syms in batch_symbols.items()]
+        self.strategies = []   # per-symbol instances, indexed by registry id ([] = none)
+        for sym, classes in enabled.items():
+            self._set_strategies(sym, [cls() for cls in classes if not cls.supports_batch])
+        self.stats = {}
+        self._pools = {}
+        self._inflight = {}   # id(strategy instance) -> Future still running past its budget
+
+    def _set_strategies(self, sym, strategies):
+        i = registry.get(sym).id
+        if i >= len(self.strategies):
+            self.strategies.extend([] for _ in range(i + 1 - len(self.strategies)))
+        self.strategies[i] = strategies
+
+    def add_symbol(self, sym):
+        """
+        Create strategy state for a symbol joining the universe (primed from its candle
+        history); the symbol must already be registered.
+        """
+        classes = strategy_classes(sym)
+        for cls in classes:
+            if cls.supports_batch:
+                entry = next((e for e in self.batch_strategies if type(e[0]) is cls), None)
+                if entry is None:
+                    self.batch_strategies.append([cls(), [sym]])
+                elif sym not in entry[1]:
+                    # Swap in a new list so a pass already iterating the old one is unaffected.
+                    entry[1] = entry[1] + [sym]
+        strategies = [cls() for cls in classes if not cls.supports_batch]
+        history = candle_store.get_window(sym)
+        for strat in strategies:
+            strat.warm_up(history)
+        self._set_strategies(sym, strategies)
+
+    def remove_symbol(self, sym):
+        meta = registry.get(sym)
+        if meta is not None and meta.id < len(self.strategies):
+            self.strategies[meta.id] = []
+        for entry in self.batch_strategies:
+            if sym in entry[1]:
+                entry[1] = [s for s in entry[1] if s != sym]
+
+    def warm_up(self):
+        """Prime per-symbol strategies from candle_store history (call after the backfill)."""
+        for meta, strategies in zip(registry.by_id, self.strategies):
+            if not strategies:
+                continue
+            history = candle_store.get_window(meta.symbol)
+            for strat in strategies:
+                strat.warm_up(history)
+
+    def _pool(self, kind):
+        pool = self._pools.get(kind)
+        if pool is None:
+            cls = ThreadPoolExecutor if kind == "thread" else ProcessPoolExecutor
+            pool = self._pools[kind] = cls(max_workers=STRATEGY_WORKERS)
+        return pool
+
+    def _stats(self, name):
+        stats = self.stats.get(name)
+        if stats is None:
+            stats = self.stats[name] = StrategyStats()
+        return stats
 
     def run(self):
+        # (strategy, method, args, on_result(result, new_instance))
+        tasks = []
         signals = {}
-        for sym in SYMBOLS:
-            candle = candle_store.get_last_candle(sym)
+        # Symbols whose feed is stale or still being backfilled sit out until the watchdog clears them.
+        stale = watchdog.stale
+        for i, (strat, strat_symbols) in enumerate(self.batch_strategies):
+            if stale:
+                strat_symbols = [sym for sym in strat_symbols if sym not in stale]
+            symbols, matrix = candle_store.latest_matrix(strat_symbols, BATCH_FIELDS)
+            if symbols:
+                tasks.append((strat, "generate_signals", (symbols, matrix), self._batch_handler(signals, symbols, i)))
+        for meta, strategies in zip(registry.by_id, self.strategies):
+            if not strategies or meta.symbol in stale:
+                continue
+            candle = candle_store.get_last_candle(meta.symbol)
             if not candle:
                 continue
-            for strat in self.strategies[sym]:
-                signal = strat.generate_signal(candle)
-                signals[(sym, type(strat).__name__)] = signal
+            for i, strat in enumerate(strategies):
+                tasks.append((strat, "generate_signal", (candle,), self._symbol_handler(signals, meta, i)))
+
+        pending = []
+        for strat, method, args, on_result in tasks:
+            name = type(strat).__name__
+            kind = getattr(strat, "execution", None) or self.executor
+            if id(strat) in self._inflight:
+                self._stats(name).skipped += 1
+                continue
+            if kind == "inline":
+                try:
+                    result, elapsed, _ = _evaluate(strat, method, args)
+                except Exception as e:
+                    self._stats(name).errors += 1
+                    logger.error(f"{name} failed: {e}")
+                    continue
+                self._stats(name).record(elapsed)
+                on_result(result, None)
+            else:
+                # Pooled workers get a copy of mutable per-symbol candles so the feed can keep updating them.
+                if method == "generate_signal":
+                    args = (dict(args[0]),)
+                budget = (getattr(strat, "time_budget_ms", None) or STRATEGY_TIMEOUT_MS) / 1000
+                future = self._pool(kind).submit(_evaluate, strat, method, args)
+                pending.append((future, time.monotonic() + budget, strat, name, on_result, kind))
+
+        for future, deadline, strat, name, on_result, kind in pending:
+            stats = self._stats(name)
+            try:
+                result, elapsed, new_strat = future.result(timeout=max(0.0, deadline - time.monotonic()))
+            except TimeoutError:
+                stats.overruns += 1
+                self._inflight[id(strat)] = future
+                future.add_done_callback(lambda f, key=id(strat): self._inflight.pop(key, None))
+                continue
+            except Exception as e:
+                stats.errors += 1
+                logger.error(f"{name} failed: {e}")
+                continue
+            stats.record(elapsed)
+            on_result(result, new_strat if kind == "process" else None)
         return signals
+
+    def _batch_handler(self, signals, symbols, index):
+        def on_result(codes, new_strat):
+            if new_strat is not None:
+                self.batch_strategies[index][0] = new_strat
+            name = type(self.batch_strategies[index][0]).__name__
+            for sym, code in zip(symbols, codes.tolist()):
+                signals[(sym, name)] = SIGNAL_NAMES[code]
+        return on_result
+
+    def _symbol_handler(self, signals, meta, index):
+        def on_result(signal, new_strat):
+            strategies = self.strategies[meta.id]
+            if new_strat is not None:
+                strategies[index] = new_strat
+            signals[(meta.symbol, type(strategies[index]).__name__)] = signal
+        return on_result
+
+    def stats_report(self):
+        return {name: stats.as_dict() for name, stats in self.stats.items()}
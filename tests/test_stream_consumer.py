@@ -0,0 +1,49 @@
+import os, sys
+
+os.environ.setdefault("SYMBOLS", "BTCUSDT")
+os.environ.setdefault("MARKET_TYPES", "spot")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+
+fakeredis = pytest.importorskip("fakeredis")
+
+from core.runtime import runtime
+from data_feed import candle_store, live_feed
+from storage import redis_handler
+
+CANDLE = {"open_time": 60000, "open": 1.0, "high": 2.0, "low": 0.5, "close": 1.5, "volume": 3.0,
+          "quote_volume": 4.5, "buy_volume": 2.0, "sell_volume": 1.0, "trades": 7, "vwap": 1.5}
+
+
+def publish(ticks=None, closed=()):
+    pipe = runtime.redis.pipeline()
+    redis_handler.publish(pipe, ticks or {}, list(closed))
+    pipe.execute()
+
+
+def test_trimmed_pending_entries_do_not_stall_recovery(monkeypatch):
+    runtime._clients["redis"] = fakeredis.FakeRedis()
+    monkeypatch.setattr(candle_store, "set_candle", lambda symbol, candle: None)
+    closed = []
+    monkeypatch.setattr(candle_store, "close_candle", lambda symbol, candle: closed.append(candle))
+
+    first = redis_handler.StreamConsumer(["BTCUSDT"], consumer="node-a")
+    for _ in range(5):
+        publish(ticks={"BTCUSDT": CANDLE})
+    publish(closed=[("BTCUSDT", CANDLE)])
+    assert first.read()                      # delivered, never acked
+    runtime.redis.xtrim(redis_handler.tick_stream("BTCUSDT"), maxlen=0)
+
+    # Restart under the same name: the pending ticks now come back without fields.
+    restarted = redis_handler.StreamConsumer(["BTCUSDT"], consumer="node-a")
+    for _ in range(3):
+        live_feed._consume_once(restarted)
+    assert not restarted._recovering
+    assert len(closed) == 1
+    for key in restarted.keys:
+        assert runtime.redis.xpending(key, restarted.group)["pending"] == 0
+
+    publish(closed=[("BTCUSDT", {**CANDLE, "open_time": 120000})])
+    live_feed._consume_once(restarted)
+    assert closed[-1]["open_time"] == 120000
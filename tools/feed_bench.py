@@ -0,0 +1,60 @@
+"""
+Run live_feed against the load generator and report what it sustains:
+msgs/sec, socket-to-candle lag (p50/p99/max) and dropped messages.
+
+    python -m tools.load_generator --rate 20 &
+    python -m tools.feed_bench --symbols 500 --duration 120
+
+Needs Redis (REDIS_HOST/REDIS_PORT) like the live feed, since every batch
+ends in the LTP/stream pipeline.
+"""
+import argparse, os, time
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="ws://localhost:8765", help="load generator base URL")
+    parser.add_argument("--symbols", type=int, default=100, help="number of synthetic symbols")
+    parser.add_argument("--market-type", default="spot", choices=("spot", "futures"))
+    parser.add_argument("--mode", default="kline", choices=("kline", "aggTrade"), help="FEED_MODE to run")
+    parser.add_argument("--depth", action="store_true", help="also open depth streams")
+    parser.add_argument("--duration", type=float, default=60, help="seconds to run")
+    parser.add_argument("--interval", type=float, default=5, help="seconds between reports")
+    args = parser.parse_args()
+
+    # The feed reads its endpoints from config at import time.
+    http_url = args.url.replace("ws://", "http://").replace("wss://", "https://")
+    os.environ.update(SPOT_WS_URL=f"{args.url}/ws", FUTURES_WS_URL=f"{args.url}/ws",
+                      SPOT_REST_URL=http_url, FUTURES_REST_URL=http_url, FEED_MODE=args.mode)
+    from data_feed import live_feed
+    from data_feed.feed_stats import feed_stats
+
+    symbols = [f"LOAD{i:04d}USDT" for i in range(args.symbols)]
+    live_feed.start_consumer()
+    for sym in symbols:
+        live_feed.start_ws(sym, args.market_type)
+        if args.depth:
+            live_feed.start_depth_ws(sym, args.market_type)
+
+    feed_stats.report()   # reset the window so the first line covers only the run
+    started = time.monotonic()
+    peak, worst_p99, dropped = 0.0, 0.0, 0
+    while time.monotonic() - started < args.duration:
+        time.sleep(args.interval)
+        stats = feed_stats.report()
+        peak = max(peak, stats["msgs_per_sec"])
+        worst_p99 = max(worst_p99, stats.get("lag_p99_ms", 0.0))
+        dropped += stats["dropped"]
+        print(f"{stats['msgs_per_sec']:>10,.0f} msgs/s | lag p50 {stats.get('lag_p50_ms', '-')} ms "
+              f"p99 {stats.get('lag_p99_ms', '-')} ms max {stats.get('lag_max_ms', '-')} ms | "
+              f"dropped {stats['dropped']} | pending {stats['pending']}", flush=True)
+
+    total = feed_stats.report()
+    print(f"\n{args.symbols} symbols, {args.mode}{' + depth' if args.depth else ''}, {args.duration:.0f}s")
+    print(f"  sustained  {total['avg_msgs_per_sec']:,.0f} msgs/s (peak {peak:,.0f})")
+    print(f"  worst p99  {worst_p99} ms socket-to-candle lag")
+    print(f"  dropped    {dropped} (conflated {total['conflated_total']:,}) | messages {total['messages']}")
+
+
+if __name__ == "__main__":
+    main()
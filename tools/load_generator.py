@@ -0,0 +1,197 @@
+"""
+Synthetic Binance-format market data server for stress-testing live_feed.
+
+Serves any stream the feed asks for on ws://HOST:PORT/ws/<symbol>@kline_1m,
+<symbol>@aggTrade and <symbol>@depth@100ms, plus the REST depth snapshot
+(/api/v3/depth, /fapi/v1/depth) the order book syncs from and flat klines
+(/api/v3/klines, /fapi/v1/klines) for gap backfills. Point the bot at it with
+    SPOT_WS_URL=ws://localhost:8765/ws FUTURES_WS_URL=ws://localhost:8765/ws
+    SPOT_REST_URL=http://localhost:8765 FUTURES_REST_URL=http://localhost:8765
+
+    python -m tools.load_generator --rate 20 --burst-every 30 --burst-secs 5 --burst-factor 10
+"""
+import argparse, asyncio, json, random, time
+from http import HTTPStatus
+
+BAR_MS = 60_000
+
+
+def _fmt(bar):
+    """Kline fields as Binance sends them: prices and volumes as strings."""
+    return {k: (f"{v:.8f}" if isinstance(v, float) else v) for k, v in bar.items()}
+
+
+class Market:
+    """Random-walk prices, running klines and depth sequence numbers per symbol."""
+
+    def __init__(self, args):
+        self.args = args
+        self.start_ms = int(time.time() * 1000) // BAR_MS * BAR_MS
+        self.started = time.monotonic()
+        self.price = {}
+        self.bars = {}
+        self.depth_id = {}
+        self.trade_id = 0
+        self.sent = 0
+
+    def bar_open_time(self):
+        # --bar-secs shorter than 60 fast-forwards bar closes; open_time still steps by one minute.
+        elapsed = time.monotonic() - self.started
+        return self.start_ms + int(elapsed / self.args.bar_secs) * BAR_MS
+
+    def tick(self, symbol):
+        p = self.price.get(symbol) or random.uniform(1, 50000)
+        p *= 1 + random.gauss(0, self.args.volatility)
+        self.price[symbol] = p
+        return p
+
+    def multiplier(self):
+        a = self.args
+        if a.burst_every and (time.monotonic() - self.started) % a.burst_every < a.burst_secs:
+            return a.burst_factor
+        return 1.0
+
+    def _pad(self, msg):
+        if self.args.pad:
+            msg["_pad"] = "x" * self.args.pad
+        return json.dumps(msg)
+
+    def kline_messages(self, symbol):
+        now = int(time.time() * 1000)
+        open_time = self.bar_open_time()
+        price = self.tick(symbol)
+        qty = random.uniform(0.001, 2)
+        out = []
+        bar = self.bars.get(symbol)
+        if bar is not None and bar["t"] != open_time:
+            bar["x"] = True
+            out.append(self._pad({"e": "kline", "E": now, "s": symbol.upper(), "k": _fmt(bar)}))
+            bar = None
+        if bar is None:
+            bar = self.bars[symbol] = {"t": open_time, "T": open_time + BAR_MS - 1, "s": symbol.upper(), "i": "1m",
+                                       "o": price, "h": price, "l": price, "c": price, "v": 0.0, "q": 0.0,
+                                       "n": 0, "V": 0.0, "Q": 0.0, "x": False}
+        bar["h"], bar["l"], bar["c"] = max(bar["h"], price), min(bar["l"], price), price
+        bar["v"] += qty
+        bar["q"] += qty * price
+        bar["n"] += 1
+        if random.random() < 0.5:
+            bar["V"] += qty
+            bar["Q"] += qty * price
+        out.append(self._pad({"e": "kline", "E": now, "s": symbol.upper(), "k": _fmt(bar)}))
+        return out
+
+    def trade_messages(self, symbol):
+        now = int(time.time() * 1000)
+        self.trade_id += 1
+        return [self._pad({"e": "aggTrade", "E": now, "s": symbol.upper(), "a": self.trade_id,
+                           "p": f"{self.tick(symbol):.8f}", "q": f"{random.uniform(0.001, 2):.8f}",
+                           "f": self.trade_id, "l": self.trade_id, "T": now, "m": random.random() < 0.5})]
+
+    def _levels(self, symbol, sign):
+        p = self.price.get(symbol) or self.tick(symbol)
+        return [[f"{p * (1 + sign * 0.0001 * (i + 1)):.8f}", f"{random.uniform(0, 5):.8f}"]
+                for i in range(self.args.depth_levels)]
+
+    def depth_messages(self, symbol):
+        now = int(time.time() * 1000)
+        prev = self.depth_id.get(symbol, 1000)
+        last = prev + random.randint(1, 5)
+        self.depth_id[symbol] = last
+        self.tick(symbol)
+        return [self._pad({"e": "depthUpdate", "E": now, "T": now, "s": symbol.upper(), "U": prev + 1, "u": last,
+                           "pu": prev, "b": self._levels(symbol, -1), "a": self._levels(symbol, 1)})]
+
+    def klines(self, symbol, start_ms, limit):
+        """REST kline rows from start_ms up to the current bar, flat at the symbol's last price."""
+        p = f"{self.price.get(symbol) or self.tick(symbol):.8f}"
+        end = self.bar_open_time()
+        start = max(int(start_ms) // BAR_MS * BAR_MS, end - limit * BAR_MS)
+        return [[t, p, p, p, p, "0", t + BAR_MS - 1, "0", 0, "0", "0", "0"]
+                for t in range(start, end + BAR_MS, BAR_MS)][:limit]
+
+    def depth_snapshot(self, symbol):
+        return {"lastUpdateId": self.depth_id.setdefault(symbol, 1000),
+                "bids": self._levels(symbol, -1), "asks": self._levels(symbol, 1)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="localhost")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--rate", type=float, default=10, help="messages/sec per stream outside bursts")
+    parser.add_argument("--burst-every", type=float, default=0, help="seconds between bursts (0 = no bursts)")
+    parser.add_argument("--burst-secs", type=float, default=5, help="length of each burst")
+    parser.add_argument("--burst-factor", type=float, default=10, help="rate multiplier during a burst")
+    parser.add_argument("--bar-secs", type=float, default=60, help="real seconds per 1m bar (lower = more closes)")
+    parser.add_argument("--pad", type=int, default=0, help="extra payload bytes per message")
+    parser.add_argument("--depth-levels", type=int, default=10, help="levels per side in depth messages")
+    parser.add_argument("--volatility", type=float, default=0.0005, help="per-tick relative price stdev")
+    args = parser.parse_args()
+
+    from websockets.asyncio.server import serve
+    from websockets.exceptions import ConnectionClosed
+    market = Market(args)
+    producers = {"kline_1m": market.kline_messages, "aggTrade": market.trade_messages,
+                 "depth@100ms": market.depth_messages, "depth": market.depth_messages}
+
+    def process_request(connection, request):
+        # Plain HTTP GETs are REST depth snapshots / klines; everything else is a WebSocket upgrade.
+        path, _, query = request.path.partition("?")
+        params = dict(p.split("=", 1) for p in query.split("&") if "=" in p)
+        symbol = params.get("symbol", "").lower()
+        if path in ("/api/v3/depth", "/fapi/v1/depth", "/api/v3/klines", "/fapi/v1/klines"):
+            if path.endswith("klines"):
+                body = json.dumps(market.klines(symbol, params.get("startTime", 0), int(params.get("limit", 500))))
+            else:
+                body = json.dumps(market.depth_snapshot(symbol))
+            response = connection.respond(HTTPStatus.OK, body)
+            response.headers["Content-Type"] = "application/json"
+            return response
+        return None
+
+    async def stream(connection):
+        name = connection.request.path.rsplit("/", 1)[-1]
+        symbol, _, kind = name.partition("@")
+        produce = producers.get(kind)
+        if produce is None:
+            await connection.close(1008, f"unknown stream {name}")
+            return
+        # Send in 10ms ticks, carrying fractional messages over, so high rates don't need a sleep per message.
+        owed = 0.0
+        last = time.monotonic()
+        try:
+            while True:
+                await asyncio.sleep(0.01)
+                now = time.monotonic()
+                owed += (now - last) * args.rate * market.multiplier()
+                last = now
+                while owed >= 1:
+                    owed -= 1
+                    for msg in produce(symbol):
+                        await connection.send(msg)
+                        market.sent += 1
+        except ConnectionClosed:
+            pass
+
+    async def report():
+        last_sent, last = 0, time.monotonic()
+        while True:
+            await asyncio.sleep(5)
+            now = time.monotonic()
+            # Sends await the socket, so a feed that can't keep up shows here as sent < target.
+            print(f"sent {(market.sent - last_sent) / (now - last):,.0f} msgs/sec "
+                  f"(x{market.multiplier():g}) | total {market.sent:,}", flush=True)
+            last_sent, last = market.sent, now
+
+    async def run():
+        async with serve(stream, args.host, args.port, process_request=process_request, max_queue=None,
+                         ping_interval=None):
+            print(f"Load generator on ws://{args.host}:{args.port}/ws", flush=True)
+            await report()
+
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    main()
@@ -47,40 +47,407 @@
 
 
 
+import threading
 from trading.position_tracker import tracker
-from core.config import BINANCE_API_KEY, BINANCE_API_SECRET,USE_TESTNET
-from binance.enums import SIDE_BUY, SIDE_SELL, ORDER_TYPE_MARKET
-from binance.client import Client
+from core.config import (ENABLE_DEPTH, MAX_SLIPPAGE_BPS, USE_EXCHANGE_BRACKETS, STOP_LIMIT_OFFSET_PERCENT,
+                         TARGET_PERCENT, STOPLOSS_PERCENT, ORDER_QUANTITY, ORDER_NOTIONAL, RISK_PER_TRADE,
+                         EXECUTION_MODE, PAPER_LATENCY_MS, PAPER_LATENCY_JITTER_MS)
+from core.runtime import runtime
+from core.symbols import registry
+from trading import symbol_info
+from data_feed import order_book
 from core.logger import get_logger
 logger = get_logger()
 
+def check_liquidity(symbol, side, quantity):
+    """Return False if the synced book says a market order would slip more than MAX_SLIPPAGE_BPS."""
+    book = order_book.BOOKS.get(symbol)
+    if not ENABLE_DEPTH or book is None or not book.synced:
+        return True
+    est = book.estimate_slippage(side, quantity)
+    if est is None:
+        return True
+    if est['filled'] < quantity or est['slippage_bps'] > MAX_SLIPPAGE_BPS:
+        logger.warning(f"Skipping {side.upper()} {symbol}: est. slippage {est['slippage_bps']:.1f} bps, "
+                       f"book fills {est['filled']}/{quantity}")
+        return False
+    return True
 
+def order_quantity(symbol, market_type, price):
+    """
+    Size from ORDER_NOTIONAL or RISK_PER_TRADE (risk over the stop-loss distance) using the
+    cached exchange filters; falls back to the fixed ORDER_QUANTITY. None if not tradable.
+    """
+    if ORDER_NOTIONAL > 0 or RISK_PER_TRADE > 0:
+        sized = symbol_info.size_order(symbol, market_type, price, notional=ORDER_NOTIONAL,
+                                       risk_amount=RISK_PER_TRADE, stop_distance=price * STOPLOSS_PERCENT / 100)
+        return sized[0] if sized else None
+    f = _filters(symbol, market_type)
+    if f is None:
+        return ORDER_QUANTITY
+    quantity = f.round_qty(ORDER_QUANTITY)
+    return quantity if quantity >= f.min_qty and quantity * price >= f.min_notional else None
 
-client = Client(BINANCE_API_KEY, BINANCE_API_SECRET)
-if USE_TESTNET:
-    client.FUTURES_URL = 'https://testnet.binancefuture.com/fapi'
 def place_order(symbol, side, price, market_type, strategy="Breakout"):
-    logger.info(f"Placing {market_type.upper()} {side.upper()} order | {symbol} @ {price}")
-    tracker.open_position(symbol, side, price, market_type, strategy)
+    """Single signal; same path as a netted batch of one."""
+    return place_orders({symbol: (market_type, price, [(strategy, side.upper())])}).get(symbol)
+
+
+# ---------------- Signal netting / batched submission ----------------
+# Every strategy that fires on a symbol in the same bar gets its own position in the
+# tracker, but the exchange only sees the net: opposing legs cross internally at the
+# candle close and one market order carries the remainder. Futures orders go out
+# FUTURES_BATCH_SIZE at a time through batchOrders; spot has no batch endpoint.
+FUTURES_BATCH_SIZE = 5   # exchange limit per batchOrders call
+
+def net_signals(legs):
+    """[(strategy, "BUY"/"SELL")] -> signed net count (+ when buys outnumber sells)."""
+    return sum(1 if side == "BUY" else -1 for _, side in legs)
+
+def _filters(symbol, market_type):
+    """Exchange filters, from the symbol's registry record when it trades on market_type."""
+    meta = registry.get(symbol)
+    if meta is not None and meta.market_type == market_type:
+        return meta.filters
+    return symbol_info.get(symbol, market_type)
+
+def _qty_str(symbol, market_type, qty):
+    f = _filters(symbol, market_type)
+    return f.fmt_qty(f.round_qty(qty)) if f else f"{qty:.8f}".rstrip('0').rstrip('.')
+
+def _plan(symbol, market_type, price, legs):
+    """
+    Risk-check and open the legs one at a time (so each counts against the limits for
+    the next) and return the net order {"symbol", "market_type", "side", "quantity",
+    "price", "positions"} (positions = the legs the exchange order backs), or None
+    when nothing is left to send.
+    """
+    quantity = order_quantity(symbol, market_type, price)
+    if not quantity:
+        logger.warning(f"Skipping {symbol} signals: no valid order size at {price} (filters loaded?)")
+        return None
+    opened, net = [], 0
+    for strategy, side in legs:
+        direction = 1 if side == "BUY" else -1
+        # Only a leg that grows the net exchange order needs the book to absorb more.
+        if abs(net + direction) > abs(net) and not check_liquidity(symbol, side, quantity * abs(net + direction)):
+            continue
+        breached = tracker.check_risk(symbol, strategy, price * quantity, direction)
+        if breached:
+            logger.warning(f"Skipping {side} {symbol} ({strategy}): {breached} reached")
+            continue
+        opened.append(tracker.open_position(symbol, side, price, market_type, strategy, quantity))
+        net += direction
+    net_side = "BUY" if net > 0 else "SELL"
+    backed, crossed = [], []
+    for pos in opened:
+        (backed if (pos.direction > 0) == (net > 0) and len(backed) < abs(net) else crossed).append(pos)
+    for pos in crossed:
+        pos.entry_order = 0
+    if crossed:
+        logger.info(f"{symbol}: crossed {len(crossed)} opposing legs internally "
+                    f"({', '.join(f'{p.strategy} {p.side}' for p in crossed)})")
+    if not net:
+        return None
+    logger.info(f"Placing {market_type.upper()} {net_side} order | {symbol} x{abs(net)} @ {price} "
+                f"for {', '.join(p.strategy for p in backed)}")
+    return {"symbol": symbol, "market_type": market_type, "side": net_side, "quantity": quantity * abs(net),
+            "price": price, "positions": backed}
+
+def _submit(plans):
+    """Send the net orders; returns [(plan, response or None)]."""
+    results = []
+    for plan in plans:
+        if plan['market_type'] != "spot":
+            continue
+        try:
+            order = runtime.binance.create_order(symbol=plan['symbol'], side=plan['side'], type="MARKET",
+                                                 quantity=_qty_str(plan['symbol'], "spot", plan['quantity']))
+        except Exception as e:
+            logger.error(f" Binance Order Error ({plan['symbol']}): {e}")
+            order = None
+        results.append((plan, order))
+    futures = [plan for plan in plans if plan['market_type'] != "spot"]
+    for i in range(0, len(futures), FUTURES_BATCH_SIZE):
+        chunk = futures[i:i + FUTURES_BATCH_SIZE]
+        orders = [{"symbol": p['symbol'], "side": p['side'], "type": "MARKET",
+                   "quantity": _qty_str(p['symbol'], p['market_type'], p['quantity'])} for p in chunk]
+        try:
+            if len(chunk) == 1:
+                responses = [runtime.binance.futures_create_order(**orders[0])]
+            else:
+                responses = runtime.binance.futures_place_batch_order(batchOrders=orders)
+        except Exception as e:
+            logger.error(f" Binance Order Error ({', '.join(p['symbol'] for p in chunk)}): {e}")
+            responses = [None] * len(chunk)
+        # batchOrders answers per order, in request order: the order or {"code", "msg"}.
+        for plan, resp in zip(chunk, responses):
+            if resp is not None and 'orderId' not in resp:
+                logger.error(f" Binance Order Error ({plan['symbol']}): {resp.get('msg', resp)}")
+                resp = None
+            results.append((plan, resp))
+    return results
+
+def place_orders(batch):
+    """
+    Net and send one bar's signals. batch: {symbol: (market_type, price, [(strategy, side)])}.
+    Returns {symbol: exchange response or None}; symbols that netted to zero are absent.
+    """
+    plans = []
+    for symbol, (market_type, price, legs) in batch.items():
+        plan = _plan(symbol, market_type, price, legs)
+        if plan:
+            plans.append(plan)
+    results = {}
+    for plan, order in _submit(plans):
+        results[plan['symbol']] = order
+        if order is None:
+            continue
+        logger.info(f" Binance Order Executed: {plan['symbol']} {plan['side']} {order.get('executedQty')} "
+                    f"(order {order['orderId']}, {order.get('status')})")
+        for pos in plan['positions']:
+            pos.entry_order = order['orderId']
+        if USE_EXCHANGE_BRACKETS:
+            entry = fill_price(order, plan['price'])
+            for pos in plan['positions']:
+                attach_bracket(pos, entry)
+    return results
+
+
+# ---------------- Exchange-side brackets ----------------
+# slot -> {"symbol", "market_type", "orders": {orderId: "TARGET"/"STOPLOSS"}}
+BRACKETS = {}
+ORDER_SLOTS = {}   # protective orderId -> position slot
+# Fills that raced ahead of bracket registration, replayed once the bracket is recorded.
+EARLY_FILLS = {}
+MAX_EARLY_FILLS = 1000
+bracket_lock = threading.Lock()
+
+def fill_price(order, fallback):
+    """Average fill price from a MARKET order response (spot `fills`, futures `avgPrice`)."""
+    fills = order.get('fills') or []
+    qty = sum(float(f['qty']) for f in fills)
+    if qty:
+        return sum(float(f['price']) * float(f['qty']) for f in fills) / qty
+    avg = float(order.get('avgPrice') or 0)
+    return avg or fallback
+
+def _fmt_qty(pos, qty):
+    return _qty_str(pos.symbol, pos.market_type, qty)
+
+def _fmt_price(pos, price):
+    f = _filters(pos.symbol, pos.market_type)
+    return f.fmt_price(f.round_price(price)) if f else f"{price:.8f}".rstrip('0').rstrip('.')
+
+def attach_bracket(pos, entry_price):
+    """
+    Rest target and stop on the exchange: an OCO on spot, STOP_MARKET + TAKE_PROFIT_MARKET
+    (reduceOnly) on futures. Fills are reconciled from the user-data stream via on_order_update.
+    """
+    d = pos.direction
+    exit_side = "SELL" if d > 0 else "BUY"
+    target = entry_price * (1 + d * TARGET_PERCENT / 100)
+    stop = entry_price * (1 - d * STOPLOSS_PERCENT / 100)
     try:
-        if market_type == "spot":
-            order = client.create_order(
-                symbol=symbol,
-                side=side.upper(),
-                type="MARKET",
-                quantity=0.001
+        if pos.market_type == "spot":
+            resp = runtime.binance.create_oco_order(
+                symbol=pos.symbol,
+                side=exit_side,
+                quantity=_fmt_qty(pos, pos.quantity),
+                price=_fmt_price(pos, target),
+                stopPrice=_fmt_price(pos, stop),
+                stopLimitPrice=_fmt_price(pos, stop * (1 - d * STOP_LIMIT_OFFSET_PERCENT / 100)),
+                stopLimitTimeInForce="GTC"
             )
+            orders = {o['orderId']: "TARGET" if o['type'] in ("LIMIT_MAKER", "TAKE_PROFIT_LIMIT") else "STOPLOSS"
+                      for o in resp['orderReports']}
         else:
-            order = client.futures_create_order(
-                symbol=symbol,
-                side=side.upper(),
-                type="MARKET",
-                quantity=0.001
-            )
-        logger.info(f" Binance Order Executed: {order}")
-        logger.info(f" Binance Order Executed: ")
+            orders = {}
+            for order_type, trigger, reason in (("TAKE_PROFIT_MARKET", target, "TARGET"), ("STOP_MARKET", stop, "STOPLOSS")):
+                resp = runtime.binance.futures_create_order(
+                    symbol=pos.symbol,
+                    side=exit_side,
+                    type=order_type,
+                    stopPrice=_fmt_price(pos, trigger),
+                    quantity=_fmt_qty(pos, pos.quantity),
+                    reduceOnly="true"
+                )
+                orders[resp['orderId']] = reason
+    except Exception as e:
+        logger.error(f"Bracket placement failed for {pos.symbol}, falling back to local exits: {e}")
+        return False
+    with bracket_lock:
+        BRACKETS[pos.slot] = {"symbol": pos.symbol, "market_type": pos.market_type, "orders": orders}
+        for order_id in orders:
+            ORDER_SLOTS[order_id] = pos.slot
+        early = [(order_id, EARLY_FILLS.pop(order_id)) for order_id in orders if order_id in EARLY_FILLS]
+    tracker.mark_exchange_managed(pos)
+    logger.info(f"Bracket attached | {pos.symbol} TP {target:.6g} SL {stop:.6g}")
+    for order_id, avg_price in early:
+        on_order_update(order_id, "FILLED", avg_price)
+    return True
+
+def _pop_bracket(slot):
+    with bracket_lock:
+        bracket = BRACKETS.pop(slot, None)
+        if bracket:
+            for order_id in bracket['orders']:
+                ORDER_SLOTS.pop(order_id, None)
+    return bracket
+
+def on_order_update(order_id, status, avg_price):
+    """User-data stream hook: close the position whose protective order filled."""
+    if status != "FILLED":
+        return
+    with bracket_lock:
+        slot = ORDER_SLOTS.get(order_id)
+        if slot is None:
+            if len(EARLY_FILLS) >= MAX_EARLY_FILLS:
+                EARLY_FILLS.pop(next(iter(EARLY_FILLS)))
+            EARLY_FILLS[order_id] = avg_price
+            return
+    bracket = _pop_bracket(slot)
+    if bracket is None:
+        return
+    reason = bracket['orders'][order_id]
+    pos = tracker.book.positions.get(slot)
+    if pos is not None:
+        pnl = (avg_price - pos.entry_price) / pos.entry_price * 100 * pos.direction
+        tracker.close_position(slot, avg_price, pnl, reason)
+    if bracket['market_type'] != "spot":
+        # Spot OCO legs cancel each other on the exchange; futures siblings must be cancelled by us.
+        for other_id in bracket['orders']:
+            if other_id != order_id:
+                _cancel(bracket, other_id)
+
+def _cancel(bracket, order_id):
+    try:
+        if bracket['market_type'] == "spot":
+            runtime.binance.cancel_order(symbol=bracket['symbol'], orderId=order_id)
+        else:
+            runtime.binance.futures_cancel_order(symbol=bracket['symbol'], orderId=order_id)
+    except Exception as e:
+        logger.error(f"Cancel failed for {bracket['symbol']} order {order_id}: {e}")
+
+def _on_local_exit(pos, exit_price, reason):
+    """A bracketed position left locally (time exit): pull its protective orders and flatten at market."""
+    bracket = _pop_bracket(pos.slot)
+    if bracket is None:
+        return
+    if bracket['market_type'] == "spot":
+        _cancel(bracket, next(iter(bracket['orders'])))  # cancelling one OCO leg cancels the list
+    else:
+        for order_id in bracket['orders']:
+            _cancel(bracket, order_id)
+    exit_side = "SELL" if pos.direction > 0 else "BUY"
+    try:
+        if pos.market_type == "spot":
+            runtime.binance.create_order(symbol=pos.symbol, side=exit_side, type="MARKET", quantity=_fmt_qty(pos, pos.quantity))
+        else:
+            runtime.binance.futures_create_order(symbol=pos.symbol, side=exit_side, type="MARKET",
+                                        quantity=_fmt_qty(pos, pos.quantity), reduceOnly="true")
+    except Exception as e:
+        logger.error(f"{reason} close order failed for {pos.symbol}: {e}")
+
+tracker.exit_listeners.append(_on_local_exit)
+
+
+# ---------------- Paper execution ----------------
+# Paper runs have no exchange brackets, so every exit is sent to the paper exchange
+# here and the logged trade carries its fills and fees instead of the trigger prices.
+PAPER_FILL_TIMEOUT = (PAPER_LATENCY_MS + PAPER_LATENCY_JITTER_MS) / 1000 + 1.0
+
+def _paper_exit(pos, exit_price, reason):
+    """tracker.exit_fill in paper mode: flatten the leg at market and return the simulated round trip."""
+    if pos.entry_order is None:
+        return None
+    paper = runtime.binance
+    entry_price, fees = pos.entry_price, 0.0
+    try:
+        if pos.entry_order:
+            status, price, fee, qty = paper.fill_of(pos.entry_order, PAPER_FILL_TIMEOUT)
+            if status == "NEW":
+                paper.cancel_order(symbol=pos.symbol, orderId=pos.entry_order)
+            if status != "FILLED":
+                logger.warning(f"{pos.symbol} paper entry {pos.entry_order} {status}, nothing to close")
+                return None
+            # One net order can back several legs; each carries its share of the fee.
+            entry_price, fees = price, fee * pos.quantity / qty
+        exit_side = "SELL" if pos.direction > 0 else "BUY"
+        # Not reduceOnly: closing a crossed leg is a real order against the exchange's net position.
+        if pos.market_type == "spot":
+            resp = paper.create_order(symbol=pos.symbol, side=exit_side, type="MARKET", quantity=_fmt_qty(pos, pos.quantity))
+        else:
+            resp = paper.futures_create_order(symbol=pos.symbol, side=exit_side, type="MARKET",
+                                              quantity=_fmt_qty(pos, pos.quantity))
+        status, price, fee, _ = paper.fill_of(resp['orderId'], PAPER_FILL_TIMEOUT)
     except Exception as e:
-        logger.error(f" Binance Order Error: {e}")
+        logger.error(f"{reason} paper close failed for {pos.symbol}: {e}")
+        return None
+    if status != "FILLED":
+        logger.warning(f"{reason} paper close for {pos.symbol} {status}, logging trigger prices")
+        return None
+    return {"entry_price": entry_price, "exit_price": price, "fees": fees + fee}
+
+if EXECUTION_MODE == "paper":
+    tracker.exit_fill = _paper_exit
+
+def _order_fill(market_type, symbol, order_id):
+    """(status, average fill price) of one order."""
+    if market_type == "spot":
+        o = runtime.binance.get_order(symbol=symbol, orderId=order_id)
+        qty = float(o['executedQty'])
+        return o['status'], float(o['cummulativeQuoteQty']) / qty if qty else 0.0
+    o = runtime.binance.futures_get_order(symbol=symbol, orderId=order_id)
+    return o['status'], float(o.get('avgPrice') or 0)
+
+def reconcile_brackets(restored):
+    """
+    After a restart, match restored positions with their protective orders on the exchange:
+    still resting -> re-register them; filled while we were down -> close the position at the
+    fill; gone otherwise (cancelled/expired) -> place a fresh bracket.
+    """
+    open_ids = {}
+    for pos, orders in restored:
+        if not orders:
+            continue
+        key = (pos.symbol, pos.market_type)
+        try:
+            if key not in open_ids:
+                resting = (runtime.binance.get_open_orders(symbol=pos.symbol) if pos.market_type == "spot"
+                           else runtime.binance.futures_get_open_orders(symbol=pos.symbol))
+                open_ids[key] = {o['orderId'] for o in resting}
+            missing = [order_id for order_id in orders if order_id not in open_ids[key]]
+            if not missing:
+                with bracket_lock:
+                    BRACKETS[pos.slot] = {"symbol": pos.symbol, "market_type": pos.market_type, "orders": orders}
+                    for order_id in orders:
+                        ORDER_SLOTS[order_id] = pos.slot
+                tracker.mark_exchange_managed(pos)
+                logger.info(f"Reconciled bracket for {pos.symbol}: {len(orders)} orders still resting")
+                continue
+            filled = None
+            for order_id in missing:
+                status, avg_price = _order_fill(pos.market_type, pos.symbol, order_id)
+                if status == "FILLED":
+                    filled = (order_id, avg_price)
+                    break
+        except Exception as e:
+            logger.error(f"Bracket reconciliation failed for {pos.symbol}, leaving exits local: {e}")
+            continue
+        if filled:
+            order_id, avg_price = filled
+            pnl = (avg_price - pos.entry_price) / pos.entry_price * 100 * pos.direction
+            logger.info(f"{pos.symbol} bracket {orders[order_id]} filled while offline @ {avg_price}")
+            tracker.close_position(pos.slot, avg_price, pnl, orders[order_id])
+            if pos.market_type != "spot":
+                bracket = {"symbol": pos.symbol, "market_type": pos.market_type}
+                for other_id in orders:
+                    if other_id != order_id and other_id in open_ids[(pos.symbol, pos.market_type)]:
+                        _cancel(bracket, other_id)
+        else:
+            logger.warning(f"{pos.symbol} bracket orders no longer open, placing a new bracket")
+            attach_bracket(pos, pos.entry_price)
 
 
 
@@ -0,0 +1,283 @@
+import heapq, itertools, random, threading, time
+from core.config import (PAPER_BALANCES, PAPER_FEE_BPS, PAPER_SLIPPAGE_BPS, PAPER_LATENCY_MS,
+                         PAPER_LATENCY_JITTER_MS, PAPER_SEED, ENABLE_DEPTH)
+from data_feed import candle_store, order_book
+from trading import symbol_info
+from core.logger import get_logger
+logger = get_logger()
+
+QUOTE_ASSETS = ("USDT", "USDC", "FDUSD", "BUSD", "BTC", "ETH", "BNB")
+
+
+class PaperOrderError(Exception):
+    """Rejected paper order (the live client would raise BinanceAPIException)."""
+
+
+def parse_balances(text):
+    """"USDT:10000,BTC:0.5" -> {"USDT": 10000.0, "BTC": 0.5}"""
+    balances = {}
+    for item in text.split(","):
+        if ":" in item:
+            asset, amount = item.split(":", 1)
+            balances[asset.strip().upper()] = float(amount)
+    return balances
+
+def split_symbol(symbol):
+    f = symbol_info.get(symbol, "spot")
+    if f is not None:
+        return f.base_asset, f.quote_asset
+    for quote in QUOTE_ASSETS:
+        if symbol.endswith(quote) and len(symbol) > len(quote):
+            return symbol[:-len(quote)], quote
+    raise PaperOrderError(f"cannot split {symbol} into base/quote")
+
+
+class PaperExchange:
+    """
+    In-process stand-in for binance.client.Client's order calls, selected with
+    EXECUTION_MODE=paper (see core.runtime). MARKET orders fill against the
+    synced order book when depth is on, else the last candle close, moved
+    against the taker by PAPER_SLIPPAGE_BPS and charged PAPER_FEE_BPS. With
+    PAPER_LATENCY_MS the order is acknowledged as NEW and filled by a timer
+    thread after the (seeded, jittered) delay, at the price of that moment.
+
+    Spot keeps per-asset balances and rejects orders the account could not
+    pay for; futures keeps one quote wallet plus a net position per symbol and
+    realizes PnL as positions shrink or flip. Responses mirror the exchange's
+    fields so order_manager's parsing works unchanged.
+    """
+
+    def __init__(self, balances=None, fee_bps=PAPER_FEE_BPS, slippage_bps=PAPER_SLIPPAGE_BPS,
+                 latency_ms=PAPER_LATENCY_MS, jitter_ms=PAPER_LATENCY_JITTER_MS, seed=PAPER_SEED):
+        self.lock = threading.Lock()
+        self.balances = dict(parse_balances(PAPER_BALANCES) if balances is None else balances)
+        self.futures_wallet = self.balances.get("USDT", 0.0)
+        self.futures_positions = {}   # symbol -> [signed qty, avg entry price]
+        self.fee_bps = fee_bps
+        self.slippage_bps = slippage_bps
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.rng = random.Random(seed)
+        self.orders = {}
+        self.fees_paid = 0.0
+        self.filled = 0
+        self.rejected = 0
+        self._ids = itertools.count(1)
+        self._pending = []            # heap of (due monotonic time, orderId)
+        self._wake = threading.Condition(self.lock)
+        self._thread = None
+
+    # ---------------- Pricing ----------------
+    def _reference_price(self, symbol, side, quantity):
+        book = order_book.BOOKS.get(symbol) if ENABLE_DEPTH else None
+        if book is not None and book.synced:
+            est = book.estimate_slippage(side, quantity)
+            if est is not None:
+                # Whatever the visible book cannot fill is assumed to go at its worst level.
+                unfilled = quantity - est['filled']
+                return (est['avg_price'] * est['filled'] + est['worst_price'] * unfilled) / quantity
+        candle = candle_store.get_last_candle(symbol)
+        return candle['close'] if candle else None
+
+    def _fill_price(self, symbol, side, quantity):
+        price = self._reference_price(symbol, side, quantity)
+        if price is None:
+            return None
+        sign = 1 if side == "BUY" else -1
+        return price * (1 + sign * self.slippage_bps / 10000)
+
+    # ---------------- Accounting (lock held) ----------------
+    def _settle_spot(self, order, price):
+        base, quote = split_symbol(order['symbol'])
+        qty = order['qty']
+        notional = qty * price
+        fee = notional * self.fee_bps / 10000
+        if order['side'] == "BUY":
+            if self.balances.get(quote, 0.0) < notional + fee:
+                raise PaperOrderError(f"insufficient {quote} balance for {qty} {order['symbol']}")
+            self.balances[quote] -= notional + fee
+            self.balances[base] = self.balances.get(base, 0.0) + qty
+        else:
+            if self.balances.get(base, 0.0) < qty:
+                raise PaperOrderError(f"insufficient {base} balance for {qty} {order['symbol']}")
+            self.balances[base] -= qty
+            self.balances[quote] = self.balances.get(quote, 0.0) + notional - fee
+        return fee, quote
+
+    def _settle_futures(self, order, price):
+        qty = order['qty'] if order['side'] == "BUY" else -order['qty']
+        position = self.futures_positions.get(order['symbol'], [0.0, 0.0])
+        held, entry = position
+        if order['reduce_only'] and (held == 0 or (held > 0) == (qty > 0)):
+            raise PaperOrderError(f"reduceOnly order would increase the {order['symbol']} position")
+        if order['reduce_only']:
+            qty = max(-abs(held), min(abs(held), qty))
+        fee = abs(qty) * price * self.fee_bps / 10000
+        realized = 0.0
+        if held and (held > 0) != (qty > 0):
+            closing = min(abs(qty), abs(held))
+            realized = closing * (price - entry) * (1 if held > 0 else -1)
+        new = held + qty
+        if new == 0:
+            self.futures_positions.pop(order['symbol'], None)
+        else:
+            if held == 0 or (held > 0) != (new > 0):
+                entry = price                                  # opened or flipped
+            elif (held > 0) == (qty > 0):
+                entry = (held * entry + qty * price) / new     # added to
+            self.futures_positions[order['symbol']] = [new, entry]
+        self.futures_wallet += realized - fee
+        order['qty'] = abs(qty)
+        return fee, "USDT"
+
+    def _fill(self, order):
+        price = self._fill_price(order['symbol'], order['side'], order['qty'])
+        if price is None:
+            raise PaperOrderError(f"no market data for {order['symbol']}")
+        settle = self._settle_spot if order['market_type'] == "spot" else self._settle_futures
+        fee, fee_asset = settle(order, price)
+        order.update(status="FILLED", price=price, fee=fee, fee_asset=fee_asset, update_time=int(time.time() * 1000))
+        self.fees_paid += fee
+        self.filled += 1
+
+    # ---------------- Order entry ----------------
+    def _submit(self, market_type, symbol, side, type, quantity, reduce_only=False):
+        if type != "MARKET":
+            raise PaperOrderError(f"paper exchange only simulates MARKET orders, got {type}")
+        qty = float(quantity)
+        if qty <= 0:
+            raise PaperOrderError(f"invalid quantity {quantity}")
+        order = {"orderId": next(self._ids), "symbol": symbol, "side": side.upper(), "qty": qty,
+                 "market_type": market_type, "reduce_only": reduce_only, "status": "NEW",
+                 "time": int(time.time() * 1000)}
+        with self.lock:
+            self.orders[order['orderId']] = order
+            delay = self.latency_ms + (self.rng.uniform(0, self.jitter_ms) if self.jitter_ms else 0)
+            if delay > 0:
+                heapq.heappush(self._pending, (time.monotonic() + delay / 1000, order['orderId']))
+                self._wake.notify_all()
+            else:
+                try:
+                    self._fill(order)
+                except PaperOrderError:
+                    order['status'] = "REJECTED"
+                    self.rejected += 1
+                    raise
+        if delay > 0:
+            self._start()
+        return self._response(order)
+
+    def _response(self, order):
+        qty = order['qty'] if order['status'] == "FILLED" else 0.0
+        price = order.get('price', 0.0)
+        resp = {"symbol": order['symbol'], "orderId": order['orderId'], "status": order['status'],
+                "side": order['side'], "type": "MARKET", "origQty": str(order['qty']),
+                "executedQty": str(qty), "transactTime": order['time']}
+        if order['market_type'] == "spot":
+            resp["cummulativeQuoteQty"] = str(qty * price)
+            resp["fills"] = ([{"price": str(price), "qty": str(qty), "commission": str(order['fee']),
+                               "commissionAsset": order['fee_asset']}] if qty else [])
+        else:
+            resp["avgPrice"] = str(price)
+            resp["reduceOnly"] = order['reduce_only']
+        return resp
+
+    def create_order(self, symbol, side, type, quantity, **kwargs):
+        return self._submit("spot", symbol, side, type, quantity)
+
+    def futures_create_order(self, symbol, side, type, quantity, reduceOnly=False, **kwargs):
+        return self._submit("futures", symbol, side, type, quantity, str(reduceOnly).lower() == "true")
+
+    def futures_place_batch_order(self, batchOrders, **kwargs):
+        """Per-order results like batchOrders: the order, or {"code", "msg"} for a rejected one."""
+        results = []
+        for o in batchOrders:
+            try:
+                results.append(self.futures_create_order(**o))
+            except PaperOrderError as e:
+                results.append({"code": -2010, "msg": str(e)})
+        return results
+
+    def create_oco_order(self, **kwargs):
+        raise PaperOrderError("exchange brackets are not simulated; exits stay local in paper mode")
+
+    # ---------------- Order queries ----------------
+    def _get(self, symbol, orderId):
+        order = self.orders.get(orderId)
+        if order is None or order['symbol'] != symbol:
+            raise PaperOrderError(f"unknown order {orderId} for {symbol}")
+        return self._response(order)
+
+    def get_order(self, symbol, orderId, **kwargs):
+        return self._get(symbol, orderId)
+
+    def futures_get_order(self, symbol, orderId, **kwargs):
+        return self._get(symbol, orderId)
+
+    def fill_of(self, order_id, timeout=0.0):
+        """(status, price, fee, filled qty) of an order, waiting up to timeout seconds while it is NEW."""
+        deadline = time.monotonic() + timeout
+        with self.lock:
+            order = self.orders[order_id]
+            while order['status'] == "NEW" and time.monotonic() < deadline:
+                self._wake.wait(deadline - time.monotonic())
+            return order['status'], order.get('price', 0.0), order.get('fee', 0.0), order['qty']
+
+    def get_open_orders(self, symbol=None, **kwargs):
+        return [self._response(o) for o in list(self.orders.values())
+                if o['status'] == "NEW" and o['market_type'] == "spot" and symbol in (None, o['symbol'])]
+
+    def futures_get_open_orders(self, symbol=None, **kwargs):
+        return [self._response(o) for o in list(self.orders.values())
+                if o['status'] == "NEW" and o['market_type'] == "futures" and symbol in (None, o['symbol'])]
+
+    def cancel_order(self, symbol, orderId, **kwargs):
+        with self.lock:
+            order = self.orders.get(orderId)
+            if order is None or order['status'] != "NEW":
+                raise PaperOrderError(f"order {orderId} is not open")
+            order['status'] = "CANCELED"
+        return self._response(order)
+
+    futures_cancel_order = cancel_order
+
+    # ---------------- Delayed fills ----------------
+    def _run(self):
+        with self.lock:
+            while True:
+                while not self._pending or self._pending[0][0] > time.monotonic():
+                    self._wake.wait(self._pending[0][0] - time.monotonic() if self._pending else None)
+                _, order_id = heapq.heappop(self._pending)
+                order = self.orders[order_id]
+                if order['status'] != "NEW":
+                    continue
+                try:
+                    self._fill(order)
+                except PaperOrderError as e:
+                    order['status'] = "REJECTED"
+                    self.rejected += 1
+                    logger.warning(f"Paper order {order_id} rejected: {e}")
+                self._wake.notify_all()    # fill_of waiters
+
+    def _start(self):
+        with self.lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="paper-exchange", daemon=True)
+                self._thread.start()
+
+    # ---------------- Reporting ----------------
+    def report(self):
+        """Balances, futures positions marked to the last close, fees and order counts."""
+        with self.lock:
+            positions = {sym: list(p) for sym, p in self.futures_positions.items()}
+            report = {"balances": {a: round(v, 8) for a, v in self.balances.items() if v},
+                      "futures_wallet": round(self.futures_wallet, 8), "fees_paid": round(self.fees_paid, 8),
+                      "orders": len(self.orders), "filled": self.filled, "rejected": self.rejected}
+        unrealized = 0.0
+        for sym, (qty, entry) in positions.items():
+            candle = candle_store.get_last_candle(sym)
+            if candle:
+                unrealized += qty * (candle['close'] - entry)
+        report["futures_positions"] = {sym: {"qty": qty, "entry": entry} for sym, (qty, entry) in positions.items()}
+        report["futures_unrealized"] = round(unrealized, 8)
+        return report
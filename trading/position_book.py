@@ -0,0 +1,219 @@
+import threading, time
+import numpy as np
+from core.symbols import registry
+
+INITIAL_CAPACITY = 64
+
+
+class Position:
+    __slots__ = ("slot", "symbol", "side", "entry_price", "quantity", "market_type", "strategy", "open_time", "closed",
+                 "entry_order")
+
+    def __init__(self, slot, symbol, side, entry_price, quantity, market_type, strategy, open_time):
+        self.slot = slot
+        self.symbol = symbol
+        self.side = side
+        self.entry_price = entry_price
+        self.quantity = quantity
+        self.market_type = market_type
+        self.strategy = strategy
+        self.open_time = open_time
+        self.closed = False
+        # Paper mode: orderId of the exchange order that backs this leg, 0 if it was crossed
+        # internally against an opposing leg, None if it never reached the exchange.
+        self.entry_order = None
+
+    @property
+    def direction(self):
+        return -1 if self.side.lower() in ("sell", "short") else 1
+
+
+class PositionBook:
+    """
+    Open positions only, stored column-wise in NumPy arrays indexed by slot.
+
+    Closed slots go back on a free list, so memory is bounded by the peak number
+    of simultaneously open positions. Exposure and unrealised PnL aggregates per
+    symbol, per strategy and in total are maintained incrementally on open, close
+    and price updates, so reading them is O(1).
+    """
+
+    def __init__(self, capacity=INITIAL_CAPACITY):
+        self.lock = threading.RLock()
+        self.positions = {}            # slot -> Position
+        self.by_key = {}               # (symbol, strategy) -> set(slot)
+        self._free = []
+        self._grow_to(capacity)
+
+        self.prices = np.full(max(16, len(registry)), np.nan)   # last price, indexed by registry id
+
+        self.symbol_exposure = {}      # symbol -> entry notional
+        self.symbol_net_exposure = {}  # symbol -> signed entry notional (longs +, shorts -)
+        self.strategy_exposure = {}    # strategy -> entry notional
+        self.total_exposure = 0.0
+        self._symbol_net = {}          # registry id -> {strategy: signed qty}
+        self._strategy_count = {}      # strategy -> open positions
+        self.symbol_pnl = {}           # symbol -> unrealised PnL (quote)
+        self.strategy_pnl = {}         # strategy -> unrealised PnL (quote)
+        self.total_pnl = 0.0
+
+    def _grow_to(self, capacity):
+        old = getattr(self, "entry", None)
+        n = 0 if old is None else len(old)
+        for name, dtype in (("entry", np.float64), ("qty", np.float64), ("direction", np.float64),
+                            ("open_ts", np.float64), ("sym", np.int32), ("active", bool)):
+            arr = np.zeros(capacity, dtype=dtype)
+            if old is not None:
+                arr[:n] = getattr(self, name)
+            setattr(self, name, arr)
+        self._free.extend(range(capacity - 1, n - 1, -1))
+
+    def _symbol_row(self, symbol, market_type):
+        """The symbol's registry id, which is its row in self.prices (grown as the registry grows)."""
+        meta = registry.get(symbol) or registry.register(symbol, market_type)
+        if meta.id >= len(self.prices):
+            grow = max(len(self.prices), meta.id + 1 - len(self.prices))
+            self.prices = np.concatenate((self.prices, np.full(grow, np.nan)))
+        return meta.id
+
+    # ---------------- Open / close ----------------
+    def open(self, symbol, side, entry_price, quantity, market_type, strategy, open_time=None):
+        with self.lock:
+            if not self._free:
+                self._grow_to(len(self.entry) * 2)
+            slot = self._free.pop()
+            pos = Position(slot, symbol, side, entry_price, quantity, market_type, strategy,
+                           open_time if open_time is not None else time.time())
+            row = self._symbol_row(symbol, market_type)
+            self.entry[slot] = entry_price
+            self.qty[slot] = quantity
+            self.direction[slot] = pos.direction
+            self.open_ts[slot] = pos.open_time
+            self.sym[slot] = row
+            self.active[slot] = True
+            self.positions[slot] = pos
+            self.by_key.setdefault((symbol, strategy), set()).add(slot)
+
+            mark = self.prices[row]
+            if np.isnan(mark):
+                mark = self.prices[row] = entry_price
+            self._apply(pos, +1, mark)
+            return pos
+
+    def close(self, slot):
+        with self.lock:
+            pos = self.positions.pop(slot, None)
+            if pos is None:
+                return None
+            self._apply(pos, -1, self.prices[self.sym[slot]])
+            self.active[slot] = False
+            self._free.append(slot)
+            key = (pos.symbol, pos.strategy)
+            slots = self.by_key[key]
+            slots.discard(slot)
+            # Drop idle keys (and their float residue) so the aggregates only cover open positions.
+            if not slots:
+                del self.by_key[key]
+                row = int(self.sym[slot])
+                net = self._symbol_net[row]
+                del net[pos.strategy]
+                if not net:
+                    del self._symbol_net[row]
+                    for d in (self.symbol_exposure, self.symbol_net_exposure, self.symbol_pnl):
+                        del d[pos.symbol]
+            self._strategy_count[pos.strategy] -= 1
+            if not self._strategy_count[pos.strategy]:
+                for d in (self._strategy_count, self.strategy_exposure, self.strategy_pnl):
+                    del d[pos.strategy]
+            if not self.positions:
+                self.total_exposure = self.total_pnl = 0.0
+            pos.closed = True
+            return pos
+
+    def _apply(self, pos, sign, mark):
+        notional = sign * pos.entry_price * pos.quantity
+        signed_qty = sign * pos.direction * pos.quantity
+        pnl = signed_qty * (mark - pos.entry_price)
+        self.symbol_exposure[pos.symbol] = self.symbol_exposure.get(pos.symbol, 0.0) + notional
+        self.symbol_net_exposure[pos.symbol] = self.symbol_net_exposure.get(pos.symbol, 0.0) + pos.direction * notional
+        self.strategy_exposure[pos.strategy] = self.strategy_exposure.get(pos.strategy, 0.0) + notional
+        self.total_exposure += notional
+        net = self._symbol_net.setdefault(int(self.sym[pos.slot]), {})
+        net[pos.strategy] = net.get(pos.strategy, 0.0) + signed_qty
+        self._strategy_count[pos.strategy] = self._strategy_count.get(pos.strategy, 0) + (sign > 0)
+        self.symbol_pnl[pos.symbol] = self.symbol_pnl.get(pos.symbol, 0.0) + pnl
+        self.strategy_pnl[pos.strategy] = self.strategy_pnl.get(pos.strategy, 0.0) + pnl
+        self.total_pnl += pnl
+
+    # ---------------- Marking ----------------
+    def update_prices(self, prices):
+        """prices: {registry id: last price}. Updates the mark and the PnL aggregates by delta."""
+        with self.lock:
+            for row, price in prices.items():
+                if row >= len(self.prices):
+                    continue
+                old = self.prices[row]
+                self.prices[row] = price
+                net = self._symbol_net.get(row)
+                if not net or np.isnan(old):
+                    continue
+                delta = price - old
+                symbol = registry.by_id[row].symbol
+                for strategy, qty in net.items():
+                    self.strategy_pnl[strategy] += qty * delta
+                    self.symbol_pnl[symbol] += qty * delta
+                    self.total_pnl += qty * delta
+
+    def mark(self):
+        """Vectorized mark of every open position: (slots, last prices, PnL %)."""
+        with self.lock:
+            slots = np.flatnonzero(self.active)
+            last = self.prices[self.sym[slots]]
+            entry = self.entry[slots]
+            pnl_pct = (last - entry) / entry * 100 * self.direction[slots]
+        return slots, last, pnl_pct
+
+    def check_exits(self, target_pct, stop_pct, max_hold_sec, now=None, time_only=(), skip_symbols=()):
+        """
+        Return [(Position, price, pnl_pct, reason)] for positions that hit target, stop or max
+        hold time. Slots in time_only only get the time check (their target/stop live on the
+        exchange); positions in skip_symbols (e.g. stale prices) are not checked at all.
+        time_only is copied under the lock, so its writers must hold it too. The caller should
+        act only on a Position that still holds its slot (not closed, not reused since).
+        """
+        now = time.time() if now is None else now
+        with self.lock:
+            slots, last, pnl_pct = self.mark()
+            if not len(slots):
+                return []
+            held = now - self.open_ts[slots]
+            skip_rows = [meta.id for meta in map(registry.get, skip_symbols) if meta is not None]
+            checked = ~np.isin(self.sym[slots], skip_rows) if skip_rows else np.ones(len(slots), dtype=bool)
+            priced = checked & ~np.isnan(last)
+            managed = list(time_only)
+            if managed:
+                priced &= ~np.isin(slots, managed)
+            target = priced & (pnl_pct >= target_pct)
+            stop = priced & (pnl_pct <= -stop_pct)
+            timed = checked & (held >= max_hold_sec)
+            exits = []
+            for i in np.flatnonzero(target | stop | timed).tolist():
+                reason = "TARGET" if target[i] else "STOPLOSS" if stop[i] else "TIME EXIT"
+                exits.append((self.positions[int(slots[i])], float(last[i]), float(pnl_pct[i]), reason))
+        return exits
+
+    # ---------------- Queries ----------------
+    def open_positions(self, symbol=None, strategy=None):
+        with self.lock:
+            if symbol is not None and strategy is not None:
+                return [self.positions[s] for s in self.by_key.get((symbol, strategy), ())]
+            return [p for p in self.positions.values()
+                    if (symbol is None or p.symbol == symbol) and (strategy is None or p.strategy == strategy)]
+
+    def open_ids(self):
+        """Registry ids of the symbols with open positions."""
+        with self.lock:
+            return list(self._symbol_net)
+
+    def __len__(self):
+        return len(self.positions)
@@ -4,7 +4,6 @@ import time
 from datetime import datetime
 from core.config import TARGET_PERCENT, STOPLOSS_PERCENT, MAX_HOLD_TIME_SEC, REFRESH_INTERVAL
 import random  # For mock live price
-import redis
 # from core.config import REDIS_HOST, REDIS_PORT, REFRESH_INTERVAL, TARGET_PERCENT, STOPLOSS_PERCENT, MAX_HOLD_TIME_SEC
 
 # r = redis.Redis(host=REDIS_HOST, port=REDIS_PORT, db=0)
@@ -175,75 +174,158 @@ import redis
 
 
 
-import redis, threading, time
+import threading, time
 from datetime import datetime
-from core.config import REDIS_HOST, REDIS_PORT, REFRESH_INTERVAL, TARGET_PERCENT, STOPLOSS_PERCENT, MAX_HOLD_TIME_SEC
+from core.config import (REFRESH_INTERVAL, TARGET_PERCENT, STOPLOSS_PERCENT, MAX_HOLD_TIME_SEC,
+                         MAX_OPEN_POSITIONS, MAX_SYMBOL_EXPOSURE, MAX_STRATEGY_EXPOSURE, MAX_TOTAL_EXPOSURE,
+                         MAX_CORRELATED_EXPOSURE, CORR_THRESHOLD, EXECUTION_MODE)
+from data_feed.correlation import correlations
+from core.symbols import registry
+from data_feed.watchdog import watchdog
 from storage.mongo_handler import log_trade
+from trading.position_book import PositionBook
+from core.runtime import runtime
 from core.logger import get_logger
 logger = get_logger()
-r = redis.Redis(host=REDIS_HOST, port=REDIS_PORT, db=0)
-
-class Position:
-    def __init__(self, symbol, side, entry_price, market_type, strategy="Breakout"):
-        self.symbol = symbol
-        self.side = side
-        self.entry_price = entry_price
-        self.market_type = market_type
-        self.strategy = strategy
-        self.open_time = datetime.now()
-        self.closed = False
 
 class PositionTracker:
+    """
+    Open positions live in a PositionBook; one monitor thread marks them all to
+    market each REFRESH_INTERVAL and closes those that hit an exit rule, moving
+    them to the Mongo trade log.
+    """
+
     def __init__(self):
-        self.positions = []
-
-    def open_position(self, symbol, side, price, market_type, strategy="Breakout"):
-        pos = Position(symbol, side, price, market_type, strategy)
-        self.positions.append(pos)
-        t = threading.Thread(target=self.monitor_position, args=(pos,))
-        t.daemon = True
-        t.start()
-
-    def monitor_position(self, pos):
-        while not pos.closed:
-            ltp = r.get(f"LTP:{pos.symbol}")
-            if ltp is None:
-                time.sleep(REFRESH_INTERVAL)
-                continue
-            live_price = float(ltp)
-
-            pnl = ((live_price - pos.entry_price)/pos.entry_price)*100
-            if pos.side.lower() == "sell" or (pos.market_type=="futures" and pos.side=="short"):
-                pnl *= -1
-
-            elapsed = (datetime.now() - pos.open_time).seconds
-
-            exit_reason = None
-            if pnl >= TARGET_PERCENT:
-                exit_reason = "TARGET"
-            elif pnl <= -STOPLOSS_PERCENT:
-                exit_reason = "STOPLOSS"
-            elif elapsed >= MAX_HOLD_TIME_SEC:
-                exit_reason = "TIME EXIT"
-
-            if exit_reason:
-                print(f"{exit_reason} | {pos.symbol} @ {live_price:.2f} | PnL: {pnl:.2f}%")
-                logger.info(f"{exit_reason} | {pos.symbol} @ {live_price:.2f} | PnL: {pnl:.2f}%")
-
-                pos.closed = True
-
-                trade_data = {
-                    "symbol": pos.symbol,
-                    "market_type": pos.market_type,
-                    "side": pos.side,
-                    "entry_price": pos.entry_price,
-                    "exit_price": live_price,
-                    "entry_time": pos.open_time,
-                    "exit_time": datetime.now(),
-                    "pnl_percent": pnl,
-                    "reason": exit_reason,
-                    "strategy": pos.strategy
-                }
-                log_trade(trade_data)
+        self.book = PositionBook()
+        self._monitor = None
+        self._monitor_lock = threading.Lock()
+        # Slots whose target/stop are resting on the exchange; only the time exit is checked locally.
+        # Changed under book.lock only (check_exits copies it there).
+        self.exchange_managed = set()
+        # Called as fn(pos, exit_price, reason) after a position is closed.
+        self.exit_listeners = []
+        # Paper mode: fn(pos, exit_price, reason) -> {"entry_price", "exit_price", "fees"} of the
+        # simulated round trip (or None), run before the trade is logged.
+        self.exit_fill = None
+
+    def check_risk(self, symbol, strategy, notional, direction=1):
+        """Return the name of the first risk limit a new position would breach, or None. Limits <= 0 are disabled."""
+        book = self.book
+        with book.lock:
+            if MAX_OPEN_POSITIONS > 0 and len(book) >= MAX_OPEN_POSITIONS:
+                return "MAX_OPEN_POSITIONS"
+            if MAX_SYMBOL_EXPOSURE > 0 and book.symbol_exposure.get(symbol, 0.0) + notional > MAX_SYMBOL_EXPOSURE:
+                return "MAX_SYMBOL_EXPOSURE"
+            if MAX_STRATEGY_EXPOSURE > 0 and book.strategy_exposure.get(strategy, 0.0) + notional > MAX_STRATEGY_EXPOSURE:
+                return "MAX_STRATEGY_EXPOSURE"
+            if MAX_TOTAL_EXPOSURE > 0 and book.total_exposure + notional > MAX_TOTAL_EXPOSURE:
+                return "MAX_TOTAL_EXPOSURE"
+            net_exposure = dict(book.symbol_net_exposure)
+        if MAX_CORRELATED_EXPOSURE > 0 and self.correlated_exposure(symbol, net_exposure, direction * notional) > MAX_CORRELATED_EXPOSURE:
+            return "MAX_CORRELATED_EXPOSURE"
+        return None
+
+    def correlated_exposure(self, symbol, net_exposure, signed_notional):
+        """
+        Exposure in the new position's direction once it is added: signed exposure of every open
+        symbol correlated with `symbol` above CORR_THRESHOLD (in absolute value), weighted by the
+        correlation, so correlated longs stack up and hedges offset. Only `symbol` itself counts
+        until the correlation matrix has enough bars.
+        """
+        corr = correlations.correlations(symbol)
+        total = signed_notional + net_exposure.get(symbol, 0.0)
+        for other, exposure in net_exposure.items():
+            rho = corr.get(other)
+            if other != symbol and rho is not None and abs(rho) >= CORR_THRESHOLD:
+                total += rho * exposure
+        return total if signed_notional >= 0 else -total
+
+    def open_position(self, symbol, side, price, market_type, strategy="Breakout", quantity=0.001, open_time=None):
+        pos = self.book.open(symbol, side, price, quantity, market_type, strategy, open_time)
+        self._ensure_monitor()
+        return pos
+
+    def get_open_positions(self, symbol=None, strategy=None):
+        return self.book.open_positions(symbol, strategy)
+
+    def _ensure_monitor(self):
+        with self._monitor_lock:
+            if self._monitor is None:
+                self._monitor = threading.Thread(target=self.monitor_positions, daemon=True)
+                self._monitor.start()
+
+    def monitor_positions(self):
+        while True:
+            try:
+                self.refresh()
+            except Exception as e:
+                logger.error(f"Position monitor error: {e}")
+            time.sleep(REFRESH_INTERVAL)
+
+    def refresh(self):
+        # Positions on stale feeds keep their last mark and are not exited until the feed is live again.
+        stale = set(watchdog.stale)
+        metas = registry.by_id
+        ids = [i for i in self.book.open_ids() if metas[i].symbol not in stale]
+        if ids:
+            ltps = runtime.redis.mget([metas[i].ltp_key for i in ids])
+            self.book.update_prices({i: float(ltp) for i, ltp in zip(ids, ltps) if ltp is not None})
+        elif not len(self.book):
+            return
+        exits = self.book.check_exits(TARGET_PERCENT, STOPLOSS_PERCENT, MAX_HOLD_TIME_SEC,
+                                      time_only=self.exchange_managed, skip_symbols=stale)
+        for pos, live_price, pnl, exit_reason in exits:
+            self.close_position(pos.slot, live_price, pnl, exit_reason, expected=pos)
+
+    def mark_exchange_managed(self, pos):
+        """Leave the target/stop of pos to the exchange; only its time exit is checked locally."""
+        with self.book.lock:
+            if not pos.closed:
+                self.exchange_managed.add(pos.slot)
+
+    def close_position(self, slot, live_price, pnl, exit_reason, expected=None):
+        """Close the position in slot; with expected, only if that Position still holds the slot."""
+        with self.book.lock:
+            if expected is not None and self.book.positions.get(slot) is not expected:
+                return None   # closed elsewhere (and the slot maybe reused) since the exit was found
+            pos = self.book.close(slot)
+            if pos is None:
+                return None
+            self.exchange_managed.discard(slot)
+        print(f"{exit_reason} | {pos.symbol} @ {live_price:.2f} | PnL: {pnl:.2f}%")
+        logger.info(f"{exit_reason} | {pos.symbol} @ {live_price:.2f} | PnL: {pnl:.2f}%")
+
+        trade_data = {
+            "symbol": pos.symbol,
+            "market_type": pos.market_type,
+            "side": pos.side,
+            "quantity": pos.quantity,
+            "entry_price": pos.entry_price,
+            "exit_price": live_price,
+            "entry_time": datetime.fromtimestamp(pos.open_time),
+            "exit_time": datetime.now(),
+            "pnl_percent": pnl,
+            "reason": exit_reason,
+            "strategy": pos.strategy,
+            "mode": EXECUTION_MODE
+        }
+        fill = None
+        if self.exit_fill is not None:
+            try:
+                fill = self.exit_fill(pos, live_price, exit_reason)
+            except Exception as e:
+                logger.error(f"Simulated exit failed for {pos.symbol}: {e}")
+        if fill:
+            # Log what the paper exchange filled, net of its fees; keep the trigger prices alongside.
+            gross = (fill['exit_price'] - fill['entry_price']) * pos.quantity * pos.direction
+            trade_data.update(signal_entry_price=pos.entry_price, signal_exit_price=live_price, **fill,
+                              pnl_percent=(gross - fill['fees']) / (fill['entry_price'] * pos.quantity) * 100)
+        log_trade(trade_data)
+        for listener in self.exit_listeners:
+            try:
+                listener(pos, live_price, exit_reason)
+            except Exception as e:
+                logger.error(f"Exit listener error for {pos.symbol}: {e}")
+        return pos
 
 tracker = PositionTracker()
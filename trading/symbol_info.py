@@ -0,0 +1,149 @@
+import json, os, threading, time
+from core.config import SPOT_REST_URL, FUTURES_REST_URL, SYMBOL_INFO_CACHE_DIR, SYMBOL_INFO_TTL_SEC
+from core.symbols import registry
+from utils.helpers import rest_limiter
+from core.logger import get_logger
+logger = get_logger()
+
+
+def _decimals(step):
+    """Number of decimals in a filter step string such as "0.00100000"."""
+    step = step.rstrip('0')
+    return len(step.split('.')[1]) if '.' in step else 0
+
+
+class SymbolFilters:
+    """Exchange filters for one symbol, pre-digested so sizing is plain float arithmetic."""
+    __slots__ = ("symbol", "base_asset", "quote_asset", "step", "inv_step", "min_qty", "max_qty", "qty_decimals",
+                 "tick", "inv_tick", "price_decimals", "min_notional")
+
+    def __init__(self, symbol, base_asset, quote_asset, step, min_qty, max_qty, tick, min_notional):
+        self.symbol = symbol
+        self.base_asset = base_asset
+        self.quote_asset = quote_asset
+        self.step = float(step)
+        self.inv_step = 1 / self.step
+        self.min_qty = float(min_qty)
+        self.max_qty = float(max_qty)
+        self.qty_decimals = _decimals(step)
+        self.tick = float(tick)
+        self.inv_tick = 1 / self.tick
+        self.price_decimals = _decimals(tick)
+        self.min_notional = float(min_notional)
+
+    def round_qty(self, qty):
+        """Floor qty to the lot step (never rounds up past what was asked for)."""
+        return round(int(qty * self.inv_step + 1e-9) * self.step, self.qty_decimals)
+
+    def round_price(self, price):
+        """Round price to the nearest tick."""
+        return round(round(price * self.inv_tick) * self.tick, self.price_decimals)
+
+    def fmt_qty(self, qty):
+        return f"{qty:.{self.qty_decimals}f}"
+
+    def fmt_price(self, price):
+        return f"{price:.{self.price_decimals}f}"
+
+
+def parse_exchange_info(info):
+    """Reduce an exchangeInfo payload to {symbol: [constructor args]} (what the file cache stores)."""
+    table = {}
+    for s in info['symbols']:
+        if s.get('status') != "TRADING":
+            continue
+        f = {flt['filterType']: flt for flt in s['filters']}
+        lot, price = f.get('LOT_SIZE'), f.get('PRICE_FILTER')
+        if not lot or not price:
+            continue
+        notional = f.get('NOTIONAL') or f.get('MIN_NOTIONAL') or {}
+        min_notional = notional.get('minNotional') or notional.get('notional') or "0"
+        table[s['symbol']] = [s['symbol'], s['baseAsset'], s['quoteAsset'], lot['stepSize'], lot['minQty'],
+                              lot['maxQty'], price['tickSize'], min_notional]
+    return table
+
+
+# market_type -> {symbol: SymbolFilters}
+TABLES = {}
+_loaded_at = {}
+
+def _cache_path(market_type):
+    return os.path.join(SYMBOL_INFO_CACHE_DIR, f"exchange_info_{market_type}.json")
+
+def fetch_exchange_info(market_type):
+    import requests
+    if market_type == "spot":
+        url, weight = f"{SPOT_REST_URL}/api/v3/exchangeInfo", 20
+    else:
+        url, weight = f"{FUTURES_REST_URL}/fapi/v1/exchangeInfo", 1
+    rest_limiter(market_type).acquire(weight)
+    resp = requests.get(url, timeout=10)
+    resp.raise_for_status()
+    return resp.json()
+
+def load(market_type, force=False):
+    """Load filters from the file cache if fresh, else from REST (falling back to a stale cache on error)."""
+    path = _cache_path(market_type)
+    cached = None
+    try:
+        with open(path) as f:
+            cached = json.load(f)
+    except (OSError, ValueError):
+        pass
+
+    if cached and not force and time.time() - cached['fetched_at'] < SYMBOL_INFO_TTL_SEC:
+        raw, fetched_at = cached['symbols'], cached['fetched_at']
+    else:
+        try:
+            raw, fetched_at = parse_exchange_info(fetch_exchange_info(market_type)), time.time()
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(f"{path}.tmp", "w") as f:
+                json.dump({"fetched_at": fetched_at, "symbols": raw}, f)
+            os.replace(f"{path}.tmp", path)
+        except Exception as e:
+            if not cached:
+                logger.error(f"exchangeInfo load failed for {market_type}: {e}")
+                return False
+            logger.warning(f"exchangeInfo refresh failed for {market_type}, using cache from "
+                           f"{time.ctime(cached['fetched_at'])}: {e}")
+            raw, fetched_at = cached['symbols'], cached['fetched_at']
+
+    TABLES[market_type] = {sym: SymbolFilters(*args) for sym, args in raw.items()}
+    _loaded_at[market_type] = fetched_at
+    registry.apply_filters(market_type, TABLES[market_type])
+    logger.info(f"Loaded {len(raw)} {market_type} symbol filters")
+    return True
+
+def start_refresh(market_types):
+    def loop():
+        while True:
+            time.sleep(SYMBOL_INFO_TTL_SEC)
+            for market_type in market_types:
+                load(market_type, force=True)
+
+    t = threading.Thread(target=loop, daemon=True)
+    t.start()
+    return t
+
+def get(symbol, market_type):
+    table = TABLES.get(market_type)
+    return table.get(symbol) if table else None
+
+def size_order(symbol, market_type, price, notional=0.0, risk_amount=0.0, stop_distance=0.0):
+    """
+    Turn a quote notional, or a quote amount risked over a stop distance, into a
+    valid (quantity, rounded price). Returns None if the result falls below the
+    symbol's minimum quantity or notional, or if no filters are loaded.
+    """
+    f = get(symbol, market_type)
+    if f is None:
+        return None
+    if risk_amount and stop_distance:
+        qty = risk_amount / stop_distance
+    else:
+        qty = notional / price
+    qty = f.round_qty(min(qty, f.max_qty))
+    price = f.round_price(price)
+    if qty < f.min_qty or qty * price < f.min_notional:
+        return None
+    return qty, price
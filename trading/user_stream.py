@@ -0,0 +1,67 @@
+import websocket, json, threading, time
+from core.config import SPOT_WS_URL, FUTURES_WS_URL
+from core.logger import get_logger
+logger = get_logger()
+
+KEEPALIVE_SEC = 30 * 60
+RECONNECT_DELAY_SEC = 5
+
+def parse_order_update(data):
+    """Return (orderId, status, avg_fill_price) from a spot executionReport or futures ORDER_TRADE_UPDATE, else None."""
+    event = data.get('e')
+    if event == 'executionReport':
+        filled, quote = float(data['z']), float(data['Z'])
+        return data['i'], data['X'], quote / filled if filled else float(data['L'])
+    if event == 'ORDER_TRADE_UPDATE':
+        o = data['o']
+        return o['i'], o['X'], float(o['ap']) or float(o['L'])
+    return None
+
+def start_user_stream(client, market_type, on_order_update):
+    """
+    Follow the account's user-data stream for market_type and call
+    on_order_update(orderId, status, avg_price) for every order event.
+    """
+    spot = market_type == "spot"
+    state = {"key": None, "ws": None}
+
+    def new_listen_key():
+        return client.stream_get_listen_key() if spot else client.futures_stream_get_listen_key()
+
+    def on_message(ws, message):
+        data = json.loads(message)
+        if data.get('e') == 'listenKeyExpired':
+            logger.warning(f"{market_type} listen key expired, reconnecting user stream")
+            ws.close()
+            return
+        update = parse_order_update(data)
+        if update:
+            on_order_update(*update)
+
+    def keepalive():
+        while True:
+            time.sleep(KEEPALIVE_SEC)
+            try:
+                if state["key"]:
+                    if spot:
+                        client.stream_keepalive(state["key"])
+                    else:
+                        client.futures_stream_keepalive(state["key"])
+            except Exception as e:
+                logger.error(f"{market_type} listen key keepalive failed: {e}")
+
+    def run():
+        base = SPOT_WS_URL if spot else FUTURES_WS_URL
+        while True:
+            try:
+                state["key"] = new_listen_key()
+                state["ws"] = websocket.WebSocketApp(f"{base}/{state['key']}", on_message=on_message)
+                state["ws"].run_forever(ping_interval=20, ping_timeout=10)
+            except Exception as e:
+                logger.error(f"{market_type} user stream error: {e}")
+            time.sleep(RECONNECT_DELAY_SEC)
+
+    threading.Thread(target=keepalive, daemon=True).start()
+    t = threading.Thread(target=run, daemon=True)
+    t.start()
+    return t
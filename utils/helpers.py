@@ -1 +1,38 @@
-# TODO: Implement this module
+import threading, time
+from core.config import SPOT_WEIGHT_PER_MIN, FUTURES_WEIGHT_PER_MIN
+
+
+class RateLimiter:
+    """Token bucket over request weight (Binance limits REST usage as weight per minute)."""
+
+    def __init__(self, weight_per_minute):
+        self.capacity = weight_per_minute
+        self.rate = weight_per_minute / 60.0
+        self.tokens = float(weight_per_minute)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self, weight=1):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= weight:
+                    self.tokens -= weight
+                    return
+                wait = (weight - self.tokens) / self.rate
+            time.sleep(wait)
+
+    def pause(self, seconds):
+        """Block all callers for `seconds` (e.g. after a 429 with Retry-After)."""
+        with self.lock:
+            self.tokens = 0.0
+            self.updated = max(self.updated, time.monotonic() + seconds)
+
+
+SPOT_LIMITER = RateLimiter(SPOT_WEIGHT_PER_MIN)
+FUTURES_LIMITER = RateLimiter(FUTURES_WEIGHT_PER_MIN)
+
+def rest_limiter(market_type):
+    return SPOT_LIMITER if market_type == "spot" else FUTURES_LIMITER